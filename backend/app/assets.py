@@ -0,0 +1,286 @@
+# app/assets.py
+# Recursos estáticos del frontend. El build extrae el CSS y el JS de index.html, los minifica, pone el hash
+# del contenido en el nombre (app.3f2a9c1d0b4e.js) y genera las variantes .gz y .br; StaticAssets los sirve
+# ya comprimidos, con ETag y caché inmutable (index.html se revalida en cada carga y responde 304).
+#
+#   python -m app.assets    # en el build de la imagen (Dockerfile): genera app/static/dist/
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+from app.responses import accepted_encoding, etag_matches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+INDEX = "index.html"
+
+# Los nombres con hash no cambian de contenido: el navegador no vuelve a pedirlos
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# index.html apunta a los nombres con hash del despliegue actual: se revalida siempre (304 si no cambió)
+INDEX_CACHE = "no-cache"
+
+_LINK_RE = re.compile(r'<link rel="stylesheet" href="/static/([\w.-]+)"\s*/?>\s*')
+_STYLE_RE = re.compile(r"<style>(.*?)</style>\s*", re.S)
+_SCRIPT_RE = re.compile(r"<script>(.*?)</script>", re.S)
+_PRESERVE_RE = re.compile(r"(<(pre|textarea)\b.*?</\2>)", re.S | re.I)
+
+
+def minify_css(source):
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    source = re.sub(r":\s+", ":", source)
+    return source.replace(";}", "}").strip()
+
+
+# Antes de "/" con alguno de estos caracteres o palabras empieza una expresión regular, no una división
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw"}
+_WORD = re.compile(r"[\w$]")
+_WORDS = re.compile(r"[\w$]+")
+# Saltos de línea que se pueden quitar sin cambiar dónde termina cada sentencia: tras un token que exige
+# continuación o antes de uno que no puede empezar una sentencia (++, --, / y los literales no se tocan)
+_NEWLINE_AFTER = set("{;,([=:&|?*<>!")
+_NEWLINE_BEFORE = set("}),;]:?.&|=*<>")
+
+
+def _string_end(source, i):
+    # Índice tras el literal que empieza en i ('...', "..." o `...` con ${...} anidados)
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if quote == "`" and source.startswith("${", i):
+            depth = 1
+            i += 2
+            while i < len(source) and depth:
+                c = source[i]
+                if c in "'\"`":
+                    i = _string_end(source, i)
+                    continue
+                depth += {"{": 1, "}": -1}.get(c, 0)
+                i += 1
+            continue
+        i += 1
+    return i
+
+
+def _regex_end(source, i):
+    in_class = False
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < len(source) and _WORD.match(source[i]):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def minify_js(source):
+    # Conservador, sin parser: quita comentarios, sangría, líneas vacías y los espacios que no separan tokens.
+    # Conserva los saltos de línea tras los que podría insertarse un ";" automático
+    out = []
+    state = {"pending": "", "last": "", "word": ""}
+
+    def emit(token, word=""):
+        pending = state["pending"]
+        if pending and out:
+            prev, c = out[-1][-1], token[0]
+            if pending == "\n" and prev not in _NEWLINE_AFTER and c not in _NEWLINE_BEFORE:
+                out.append("\n")
+            elif (_WORD.match(prev) and _WORD.match(c)) or (prev == c and c in "+-/"):
+                out.append(" ")
+        out.append(token)
+        state.update(pending="", last=token[-1], word=word)
+
+    def space(newline):
+        state["pending"] = "\n" if newline or state["pending"] == "\n" else " "
+
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in "'\"`":
+            j = _string_end(source, i)
+            emit(source[i:j])
+        elif source.startswith("//", i):
+            j = source.find("\n", i)
+            j = n if j == -1 else j
+            space(True)
+        elif source.startswith("/*", i):
+            j = source.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            space("\n" in source[i:j])
+        elif c == "/" and (not state["last"] or state["last"] in _REGEX_AFTER or state["word"] in _REGEX_KEYWORDS):
+            j = _regex_end(source, i)
+            emit(source[i:j])
+        elif c.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            space("\n" in source[i:j])
+        elif _WORD.match(c):
+            j = _WORDS.match(source, i).end()
+            emit(source[i:j], word=source[i:j])
+        else:
+            j = i + 1
+            emit(c)
+        i = j
+    return "".join(out)
+
+
+def minify_html(source):
+    # Sangría y líneas vacías fuera de <pre>/<textarea>, donde el espacio es contenido; y comentarios HTML
+    parts = _PRESERVE_RE.split(source)
+    result = []
+    for index, part in enumerate(parts):
+        if index % 3 == 2:
+            continue  # nombre de la etiqueta capturado por el grupo interno
+        if index % 3 == 1:
+            result.append(part)
+            continue
+        part = re.sub(r"<!--(?!\[).*?-->", "", part, flags=re.S)
+        result.append(re.sub(r"\n\s*", "\n", part))
+    return "".join(result).strip() + "\n"
+
+
+def _fingerprinted(name, content):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _write(directory, name, content):
+    # Cada fichero con sus variantes comprimidas al máximo nivel: se comprimen una vez, en el build
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(content)
+    with open(os.path.join(directory, f"{name}.gz"), "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(os.path.join(directory, f"{name}.br"), "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    with open(os.path.join(static_dir, INDEX), encoding="utf-8") as f:
+        html = f.read()
+
+    # Hojas de estilo enlazadas e inline, en el orden del documento, en un solo CSS donde estaba la primera
+    styles = []
+    for match in sorted([*_LINK_RE.finditer(html), *_STYLE_RE.finditer(html)], key=lambda m: m.start()):
+        if match.re is _LINK_RE:
+            with open(os.path.join(static_dir, match.group(1)), encoding="utf-8") as f:
+                styles.append(f.read())
+        else:
+            styles.append(match.group(1))
+    files = {}
+    if styles:
+        css = minify_css("\n".join(styles)).encode()
+        files[_fingerprinted("app.css", css)] = css
+        first = min(m.start() for m in [*_LINK_RE.finditer(html), *_STYLE_RE.finditer(html)])
+        html = html[:first] + "\x00CSS\x00" + html[first:]
+        html = _STYLE_RE.sub("", _LINK_RE.sub("", html))
+        html = html.replace("\x00CSS\x00", f'<link rel="stylesheet" href="/static/dist/{next(iter(files))}" />\n  ')
+
+    # Cada script inline en su propio fichero y en su sitio: el orden de ejecución no cambia
+    def extract_script(match):
+        js = minify_js(match.group(1)).encode()
+        name = _fingerprinted("app.js", js)
+        files[name] = js
+        return f'<script src="/static/dist/{name}"></script>'
+    html = _SCRIPT_RE.sub(extract_script, html)
+
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+    for name, content in files.items():
+        _write(dist_dir, name, content)
+    _write(dist_dir, INDEX, minify_html(html).encode())
+    logger.info(f"Recursos estáticos en {dist_dir}: {', '.join([INDEX, *files])}")
+    return [INDEX, *files]
+
+
+class StaticAssets:
+    # Aplicación ASGI montada en /static/dist. Todo en memoria (unas decenas de KB): sin leer disco por petición
+    def __init__(self, directory=DIST_DIR):
+        self.assets = {}
+        if not os.path.exists(os.path.join(directory, INDEX)):
+            return
+        if os.path.getmtime(os.path.join(STATIC_DIR, INDEX)) > os.path.getmtime(os.path.join(directory, INDEX)):
+            logger.warning("app/static/index.html es más reciente que el build: python -m app.assets")
+        for name in os.listdir(directory):
+            if name.endswith((".gz", ".br")):
+                continue
+            variants = {}
+            for encoding, suffix in (("identity", ""), ("gzip", ".gz"), ("br", ".br")):
+                path = os.path.join(directory, name + suffix)
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        variants[encoding] = f.read()
+            self.assets[name] = {
+                "variants": variants,
+                "etag": f'"{hashlib.sha256(variants["identity"]).hexdigest()[:16]}"',
+                "media_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                "cache_control": INDEX_CACHE if name == INDEX else IMMUTABLE_CACHE,
+            }
+
+    def response(self, name, request_headers):
+        # None si el build no generó ese fichero
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+        headers = {"ETag": asset["etag"], "Cache-Control": asset["cache_control"], "Vary": "Accept-Encoding"}
+        if etag_matches(request_headers.get("if-none-match", ""), asset["etag"]):
+            return Response(status_code=304, headers=headers)
+        encoding = accepted_encoding(
+            request_headers.get("accept-encoding", ""), [e for e in ("br", "gzip") if e in asset["variants"]]
+        )
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        media_type = asset["media_type"]
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        return Response(asset["variants"][encoding or "identity"], media_type=media_type, headers=headers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response(status_code=405, headers={"Allow": "GET, HEAD"})
+        else:
+            name = scope["path"].rsplit("/", 1)[-1]
+            response = self.response(name, Headers(scope=scope)) or Response("Not Found", status_code=404)
+        await response(scope, receive, send)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    build()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# app/audit.py
+import asyncio
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+
+from app.database import engine
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+# Eventos de login en memoria antes de volcarlos a disco en lugar de encolarlos
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+# Filas por INSERT multi-fila y segundos máximos que un evento espera en la cola
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+# Ficheros JSON Lines con los eventos que no se pudieron escribir; se reintentan tras la siguiente escritura correcta
+AUDIT_SPILL_DIR = os.getenv("AUDIT_SPILL_DIR", "audit_spill")
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _insert(events):
+    with engine.begin() as conn:
+        conn.execute(insert(models.LoginLog), events)
+
+
+class AuditWriter:
+    def __init__(self):
+        self.queue = None
+        self._task = None
+        self._batch = []
+        self._inflight = None
+        # Eventos que no cupieron en la cola, pendientes de volcar a disco desde un hilo
+        self._overflow = []
+        self._spill_task = None
+        self._spill_lock = threading.Lock()
+        # Al arrancar puede haber eventos volcados por una ejecución anterior
+        self._replay_needed = True
+        self.written = 0
+        self.spilled = 0
+        self.failures = 0
+        # Eventos que no se pudieron escribir ni volcar a disco
+        self.lost = 0
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight is not None:
+            await self._inflight
+        # Vaciar lo pendiente antes de cerrar; si la base de datos no responde, queda en disco
+        pending, self._batch = self._batch, []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        if pending:
+            await self._flush(pending)
+        if self._spill_task is not None:
+            await self._spill_task
+        logger.info(f"Auditoría de logins detenida: {self.written} escritos, {self.spilled} volcados a disco")
+
+    def record(self, username, role, ip_address):
+        # No bloquea la petición: el INSERT lo hace la tarea en segundo plano
+        event = {
+            "username": username,
+            "role": role,
+            "timestamp": datetime.now(),
+            "ip_address": ip_address,
+        }
+        if self.queue is None:
+            self._spill([event])
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Cola de auditoría llena, volcando evento a disco")
+            # open + fsync fuera del event loop: cuando la cola se llena el disco suele ir lento también
+            self._overflow.append(event)
+            if self._spill_task is None or self._spill_task.done():
+                self._spill_task = asyncio.ensure_future(self._spill_overflow())
+
+    async def _spill_overflow(self):
+        while self._overflow:
+            events, self._overflow = self._overflow, []
+            await self._spill_or_drop(events)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self._batch.append(await self.queue.get())
+                deadline = loop.time() + AUDIT_FLUSH_INTERVAL
+                while len(self._batch) < AUDIT_BATCH_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        self._batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                batch, self._batch = self._batch, []
+                # Protegido de la cancelación: al parar se espera a que termine en lugar de perder el lote
+                self._inflight = asyncio.ensure_future(self._flush(batch))
+                try:
+                    await asyncio.shield(self._inflight)
+                finally:
+                    if self._inflight.done():
+                        self._inflight = None
+            except Exception:
+                # Un fallo inesperado no puede parar la tarea: la cola dejaría de vaciarse
+                logger.exception("Error en la escritura de eventos de login")
+
+    async def _flush(self, events):
+        try:
+            await run_in_threadpool(_insert, events)
+        except Exception:
+            logger.exception(f"No se pudieron escribir {len(events)} eventos de login, volcando a disco")
+            self.failures += 1
+            await self._spill_or_drop(events)
+            return
+        self.written += len(events)
+        if self._replay_needed:
+            self._replay_needed = False
+            try:
+                await run_in_threadpool(self._replay)
+            except Exception:
+                # Fichero ilegible o disco con errores: se vuelve a intentar tras el próximo volcado o al reiniciar
+                logger.exception("No se pudieron reintentar los eventos de login volcados a disco")
+
+    async def _spill_or_drop(self, events):
+        try:
+            await run_in_threadpool(self._spill, events)
+        except Exception:
+            self.lost += len(events)
+            logger.exception(f"No se pudieron volcar a disco {len(events)} eventos de login, se pierden")
+
+    def _spill(self, events):
+        os.makedirs(AUDIT_SPILL_DIR, exist_ok=True)
+        path = os.path.join(AUDIT_SPILL_DIR, f"login_logs-{os.getpid()}.jsonl")
+        # El desbordamiento de la cola y los lotes fallidos se vuelcan desde hilos distintos al mismo fichero
+        with self._spill_lock:
+            with open(path, "a") as f:
+                f.writelines(json.dumps({**event, "timestamp": event["timestamp"].isoformat()}) + "\n" for event in events)
+                f.flush()
+                os.fsync(f.fileno())
+            self.spilled += len(events)
+        self._replay_needed = True
+
+    def _spill_files(self):
+        # (fichero, nombre original): los volcados y los reclamados por un proceso que terminó antes de
+        # reintentarlos (se reintentan otra vez, aunque parte ya se hubiera escrito)
+        for path in sorted(glob.glob(os.path.join(AUDIT_SPILL_DIR, "login_logs-*.jsonl"))):
+            yield path, path
+        for claimed in sorted(glob.glob(os.path.join(AUDIT_SPILL_DIR, "login_logs-*.jsonl.*.claimed"))):
+            original, pid, _ = claimed.rsplit(".", 2)
+            try:
+                pid = int(pid)
+            except ValueError:
+                continue
+            # Con nuestro pid es de un proceso anterior que lo reutilizó: este no deja reclamados en curso
+            if pid == os.getpid() or not process_alive(pid):
+                yield claimed, original
+
+    def _replay(self):
+        for source, path in self._spill_files():
+            # Renombrar reclama el fichero: otro worker no lo reintentará a la vez
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(source, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            for event in events:
+                event["timestamp"] = datetime.fromisoformat(event["timestamp"])
+            try:
+                for i in range(0, len(events), AUDIT_BATCH_SIZE):
+                    _insert(events[i:i + AUDIT_BATCH_SIZE])
+            except Exception:
+                # Se conserva con un nombre nuevo para el próximo intento (puede duplicar filas ya escritas)
+                os.rename(claimed, os.path.join(AUDIT_SPILL_DIR, f"login_logs-{os.getpid()}-{time.time_ns()}.jsonl"))
+                self._replay_needed = True
+                logger.exception(f"No se pudieron reintentar los eventos de {path}")
+                return
+            os.remove(claimed)
+            self.written += len(events)
+            logger.info(f"Reintentados {len(events)} eventos de login desde {path}")
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "queue_limit": AUDIT_QUEUE_SIZE,
+            "written": self.written,
+            "spilled": self.spilled,
+            "failures": self.failures,
+            "lost": self.lost,
+        }
+
+
+audit_writer = AuditWriter()
@@ -1,30 +1,55 @@
 # app/auth.py
+import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
+from app.cache import TTLCache
+from app.database import get_db
+from app.hashing import pwd_context, check_capacity, verify_password_async
 import app.models as models
 
 SECRET_KEY = "secreto_super_seguro"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# "db": consulta users en cada petición; "cache": caché de principals por username;
+# "claims": confía en sub/role/uid firmados en el token (sin consulta)
+AUTH_MODE = os.getenv("AUTH_MODE", "cache")
+# La caché se invalida solo en este proceso: con varios workers, un cambio de rol o un borrado tarda hasta
+# AUTH_CACHE_TTL segundos en verse en los demás (app/serve.py lo baja a 5 con más de un worker)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    role: str
+
+
+principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+def invalidate_user(username: str):
+    principal_cache.pop(username)
+
+
+@event.listens_for(models.User, "after_insert")
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target):
+    invalidate_user(target.username)
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -43,8 +68,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def get_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
 def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = get_user_by_username(db, username)
 
     if not user:
         return None
@@ -55,7 +84,41 @@ def authenticate_user(db: Session, username: str, password: str):
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def fetch_user(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    # pbkdf2 va al pool de hashing acotado (503 si está saturado)
+    check_capacity()
+    user = await fetch_user(db, username)
+    # Devolver la conexión al pool antes de esperar a pbkdf2
+    await db.close()
+
+    if not user:
+        return None
+
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+
+    return user
+
+
+async def _load_principal(db: AsyncSession, username: str):
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    user = await fetch_user(db, username)
+    if user is None:
+        return None
+
+    principal = Principal(id=user.id, username=user.username, role=user.role)
+    principal_cache.set(username, principal)
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -63,7 +126,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         if username is None:
             raise HTTPException(status_code=401, detail="Token inválido")
 
-        user = db.query(models.User).filter(models.User.username == username).first()
+        if AUTH_MODE == "claims" and payload.get("uid") is not None and payload.get("role"):
+            return Principal(id=payload["uid"], username=username, role=payload["role"])
+
+        if AUTH_MODE == "db":
+            user = await fetch_user(db, username)
+        else:
+            # Tokens sin uid (emitidos antes del modo claims) pasan por la caché
+            user = await _load_principal(db, username)
 
         if user is None:
             raise HTTPException(status_code=401, detail="Usuario no encontrado")
@@ -75,7 +145,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 
 
 def get_current_user_with_role(required_role: str):
-    def role_checker(user: models.User = Depends(get_current_user)):
+    async def role_checker(user: models.User = Depends(get_current_user)):
         if user.role != required_role:
             raise HTTPException(status_code=403, detail="No tienes permisos para esta acción")
         return user
@@ -0,0 +1,153 @@
+# app/bootstrap.py
+# Preparación de la base de datos, separada del arranque de la aplicación: esquema, conversiones,
+# índices de búsqueda, particiones, distribución en Citus y usuarios por defecto. Idempotente.
+#
+#   python -m app.bootstrap    # initContainer/job antes de arrancar la aplicación (BOOTSTRAP_ON_STARTUP=false)
+import fcntl
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from app import compression
+from app.citus import distribute_tables
+from app.database import Base, engine
+from app.hashing import pwd_context
+from app.login_logs import setup_login_logs
+from app.search import setup_search
+from app.section_compression import setup_compression
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+# (usuario, contraseña, rol) creados si no existen; los existentes no se tocan
+DEFAULT_USERS = [
+    ("gabriel", "medico123", "medico"),
+    ("admision", "admision123", "admisionista"),
+]
+# Clave del advisory lock de PostgreSQL: un solo bootstrap a la vez entre réplicas y workers
+BOOTSTRAP_LOCK_ID = 7301
+
+
+def create_default_users(bind=engine):
+    # Solo se hashea (pbkdf2) lo que hay que crear: con los usuarios ya creados es una consulta
+    usernames = [username for username, _, _ in DEFAULT_USERS]
+    with Session(bind) as db:
+        existing = set(db.scalars(select(models.User.username).where(models.User.username.in_(usernames))))
+        for username, password, role in DEFAULT_USERS:
+            if username in existing:
+                continue
+            db.add(models.User(username=username, hashed_password=pwd_context.hash(password), role=role))
+            logger.info(f"Usuario {role} por defecto creado: {username} / {password}")
+        db.commit()
+
+
+def _convert_admission_dates(conn):
+    # SQLite guarda DateTime como texto "AAAA-MM-DD HH:MM:SS.ffffff" y compara cadenas: las fechas se reescriben
+    # con el mismo formato que los parámetros del cursor
+    admissions = models.Admission.__table__
+    rows = []
+    for admission_id, value in conn.execute(text("SELECT id, fecha_ingreso FROM admissions")):
+        try:
+            rows.append({"admission_id": admission_id, "fecha": datetime.fromisoformat(value)})
+        except (TypeError, ValueError):
+            logger.warning(f"Admisión {admission_id} con fecha_ingreso no ISO 8601 sin convertir: {value!r}")
+    if rows:
+        conn.execute(
+            update(admissions).where(admissions.c.id == bindparam("admission_id")).values(fecha_ingreso=bindparam("fecha")),
+            rows,
+        )
+
+
+def migrate_schema(bind=engine):
+    # Idempotente: columnas, tipos e índices que cambiaron después de crear la base de datos (create_all no toca
+    # las tablas existentes)
+    with bind.begin() as conn:
+        columns = {column["name"] for column in inspect(conn).get_columns("patients")}
+        if "version" not in columns:
+            # Versión del contenido para el ETag de /exportar_pdf
+            conn.execute(text("ALTER TABLE patients ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            logger.info("Columna patients.version añadida")
+
+        # admissions.fecha_ingreso era texto ISO ("2024-03-05T10:30"): pasa a timestamp con el índice del cursor
+        if bind.dialect.name == "sqlite":
+            if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'ix_admissions_documento_fecha_id'")).first() is None:
+                _convert_admission_dates(conn)
+        elif bind.dialect.name == "postgresql":
+            data_type = conn.execute(text(
+                "SELECT data_type FROM information_schema.columns WHERE table_name = 'admissions' AND column_name = 'fecha_ingreso'"
+            )).scalar()
+            if not data_type.startswith("timestamp"):
+                conn.execute(text("ALTER TABLE admissions ALTER COLUMN fecha_ingreso TYPE timestamp USING fecha_ingreso::timestamp"))
+                logger.info("admissions.fecha_ingreso convertida a timestamp")
+        for index in models.Admission.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+
+# En este orden: login_logs se particiona antes de distribuirla en Citus
+STEPS = [
+    ("esquema", lambda bind: Base.metadata.create_all(bind=bind)),
+    ("migraciones", migrate_schema),
+    # Secciones clínicas comprimidas: convierte el esquema anterior y carga los diccionarios
+    ("compresion", setup_compression),
+    ("busqueda", setup_search),
+    # login_logs particionada por mes en PostgreSQL
+    ("login_logs", setup_login_logs),
+    # En Citus: users como tabla de referencia, patients/admissions distribuidas por documento_id
+    ("citus", distribute_tables),
+    ("usuarios", create_default_users),
+]
+
+
+@contextmanager
+def _exclusive(bind):
+    # Réplicas o workers que arrancan a la vez: uno prepara la base de datos y el resto espera y la encuentra lista
+    if bind.dialect.name == "postgresql":
+        with bind.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+                conn.commit()
+    elif bind.dialect.name == "sqlite" and bind.url.database not in (None, "", ":memory:"):
+        with open(f"{bind.url.database}.bootstrap.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+    else:
+        yield
+
+
+def bootstrap(bind=engine):
+    # Devuelve la duración de cada paso en segundos
+    timings = {}
+    start = time.perf_counter()
+    with _exclusive(bind):
+        timings["espera"] = time.perf_counter() - start
+        for name, step in STEPS:
+            t0 = time.perf_counter()
+            step(bind)
+            timings[name] = time.perf_counter() - t0
+    logger.info(
+        f"Base de datos preparada en {(time.perf_counter() - start) * 1000:.0f} ms ("
+        + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()) + ")"
+    )
+    return timings
+
+
+def prepare_process(bind=engine):
+    # Lo que cada proceso necesita cuando el bootstrap lo hizo otro: los diccionarios de compresión
+    compression.load_dictionaries(bind)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    bootstrap()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# app/bulk_import.py
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import compression
+from app.database import engine
+from app.hashing import pwd_context
+from app.jobs import JobStore
+from app.search import index_patients
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(os.cpu_count() or 1)))
+# Filas validadas, hasheadas e insertadas por transacción
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", "5000"))
+# Errores detallados que se guardan en memoria; el fichero de errores los contiene todos
+IMPORT_MAX_ERRORS = 1000
+# Segundos que espera el worker al parar a que las importaciones en curso registren que se interrumpen
+IMPORT_SHUTDOWN_TIMEOUT = float(os.getenv("IMPORT_SHUTDOWN_TIMEOUT", "10"))
+
+REQUIRED_FIELDS = ["documento_id", "nombre", "apellido", "fecha_nacimiento"]
+PATIENT_COLUMNS = REQUIRED_FIELDS + ["fecha_creacion"] + models.PATIENT_SECTIONS + ["version"]
+USER_COLUMNS = ["username", "hashed_password", "role"]
+
+_executor = None
+_executor_lock = threading.Lock()
+# Hilos de las importaciones de este proceso y señal para que paren al detener el worker
+_threads = set()
+_stopping = threading.Event()
+
+jobs = JobStore("importacion", maxsize=100, ttl=24 * 3600)
+
+
+class ImportJob:
+    def __init__(self, owner, path, fmt):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.path = path
+        self.format = fmt
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_path = os.path.join(tempfile.gettempdir(), f"importacion_{self.id}_errores.csv")
+        self.status = "pendiente"
+        self.started_at = None
+        self.finished_at = None
+
+    def error(self, line, documento_id, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"linea": line, "documento_id": documento_id, "error": message})
+        self._errors_writer.writerow([line, documento_id, message])
+
+    def progress(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed else 0,
+            "elapsed_seconds": round(elapsed, 2),
+            "errors": self.errors[:50],
+        }
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=IMPORT_WORKERS)
+                logger.info(f"Pool de importación iniciado con {IMPORT_WORKERS} procesos")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def stop_imports(timeout=IMPORT_SHUTDOWN_TIMEOUT):
+    # Al reciclar o detener el worker los hilos (daemon) morirían con el proceso dejando la instantánea
+    # "en_progreso": se interrumpen entre filas y se espera a que publiquen el error. Las filas ya
+    # importadas se conservan; si no terminan a tiempo, JobStore lo detecta por el pid
+    _stopping.set()
+    shutdown_executor()
+    deadline = time.monotonic() + timeout
+    for thread in list(_threads):
+        thread.join(max(0, deadline - time.monotonic()))
+
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def iter_rows(path, fmt):
+    # Lectura incremental: (número de línea, dict) sin cargar el fichero en memoria
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "ndjson":
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield line_number, None
+                    continue
+                yield line_number, row if isinstance(row, dict) else None
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def validate(row):
+    if row is None:
+        return "Fila mal formada"
+    # En NDJSON pueden llegar como objeto o lista, que str() convertiría en texto sin error
+    invalid = [f for f in REQUIRED_FIELDS
+               if row.get(f) is not None and (isinstance(row[f], bool) or not isinstance(row[f], (str, int)))]
+    if invalid:
+        return f"Campos requeridos que no son texto: {', '.join(invalid)}"
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+    if missing:
+        return f"Campos requeridos vacíos: {', '.join(missing)}"
+    if not str(row["documento_id"]).strip().isdigit():
+        return "Documento ID debe ser numérico"
+    try:
+        datetime.strptime(str(row["fecha_nacimiento"]).strip(), "%Y-%m-%d")
+    except ValueError:
+        return "Fecha de nacimiento inválida, se espera AAAA-MM-DD"
+    # En NDJSON una sección puede llegar como número, lista u objeto: se rechaza la fila, no la importación
+    invalid = [s for s in models.PATIENT_SECTIONS if row.get(s) is not None and not isinstance(row[s], str)]
+    if invalid:
+        return f"Secciones que no son texto: {', '.join(invalid)}"
+    return None
+
+
+def _patient_values(row, now):
+    values = {field: str(row[field]).strip() for field in REQUIRED_FIELDS}
+    values["fecha_creacion"] = now
+    for section in models.PATIENT_SECTIONS:
+        values[section] = row.get(section) or ""
+    values["version"] = 1
+    return values
+
+
+def _copy(conn, table, columns, rows):
+    # COPY FROM STDIN: mucho más rápido que INSERT para miles de filas
+    buffer = io.StringIO()
+    # Todo entre comillas: en COPY csv un campo vacío sin comillas sería NULL en lugar de ""
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for row in rows:
+        # bytea (secciones comprimidas) en formato hexadecimal
+        writer.writerow(["\\x" + row[c].hex() if isinstance(row[c], bytes) else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_rows(conn, users, patients):
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        _copy(conn, "users", USER_COLUMNS, users)
+        # COPY no pasa por el tipo de la columna: las secciones se comprimen aquí
+        _copy(conn, "patients", PATIENT_COLUMNS, [
+            {**p, **{s: compression.compress(p[s]) for s in models.PATIENT_SECTIONS}} for p in patients
+        ])
+    else:
+        conn.execute(insert(models.User), users)
+        conn.execute(insert(models.Patient), patients)
+    index_patients(conn, patients)
+
+
+def _write_chunk(job, chunk):
+    # chunk: [(línea, valores de patient, hash)]; usuario y paciente en la misma transacción
+    users = [{"username": p["documento_id"], "hashed_password": h, "role": "paciente"} for _, p, h in chunk]
+    patients = [p for _, p, _ in chunk]
+    try:
+        with engine.begin() as conn:
+            _insert_rows(conn, users, patients)
+        job.imported += len(chunk)
+        return
+    except IntegrityError:
+        # Otro proceso creó alguno de estos documentos entretanto: se reintenta fila a fila
+        logger.warning(f"Importación {job.id}: conflicto en bloque, reintentando fila a fila")
+
+    for (line, patient, _), user in zip(chunk, users):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(models.User), [user])
+                conn.execute(insert(models.Patient), [patient])
+                index_patients(conn, [patient])
+            job.imported += 1
+        except IntegrityError:
+            job.error(line, patient["documento_id"], "Ya existe un usuario o paciente con este documento")
+
+
+def _process_chunk(job, chunk):
+    # chunk: [(línea, fila validada)]
+    documento_ids = [row["documento_id"] for _, row in chunk]
+    with engine.connect() as conn:
+        existing = set(conn.execute(select(models.User.username).where(models.User.username.in_(documento_ids))).scalars())
+        existing |= set(conn.execute(select(models.Patient.documento_id).where(models.Patient.documento_id.in_(documento_ids))).scalars())
+
+    now = datetime.now().isoformat()
+    pending = []
+    seen = set()
+    for line, row in chunk:
+        documento_id = row["documento_id"]
+        if documento_id in existing:
+            job.error(line, documento_id, "Ya existe un usuario o paciente con este documento")
+        elif documento_id in seen:
+            job.error(line, documento_id, "Documento repetido en el fichero")
+        else:
+            seen.add(documento_id)
+            pending.append((line, _patient_values(row, now)))
+    if not pending:
+        return
+
+    # Para pacientes, la contraseña inicial es el documento_id (como en POST /users)
+    chunksize = max(1, len(pending) // (IMPORT_WORKERS * 4))
+    hashes = get_executor().map(_hash, [p["documento_id"] for _, p in pending], chunksize=chunksize)
+    _write_chunk(job, [(line, p, h) for (line, p), h in zip(pending, hashes)])
+
+
+def run_import(job):
+    job.status = "en_progreso"
+    job.started_at = time.time()
+    jobs.publish(job, force=True)
+    try:
+        with open(job.errors_path, "w", newline="") as errors_file:
+            job._errors_writer = csv.writer(errors_file)
+            job._errors_writer.writerow(["linea", "documento_id", "error"])
+            chunk = []
+            for line, row in iter_rows(job.path, job.format):
+                if _stopping.is_set():
+                    raise RuntimeError("Importación interrumpida al detener el worker; las filas anteriores ya están importadas")
+                job.rows += 1
+                message = validate(row)
+                if message:
+                    job.error(line, (row or {}).get("documento_id"), message)
+                    continue
+                row["documento_id"] = str(row["documento_id"]).strip()
+                chunk.append((line, row))
+                if len(chunk) >= IMPORT_CHUNK:
+                    _process_chunk(job, chunk)
+                    chunk = []
+                    jobs.publish(job)
+            if chunk:
+                _process_chunk(job, chunk)
+        job.status = "completado"
+    except Exception as e:
+        logger.exception(f"Importación {job.id} interrumpida")
+        job.status = "error"
+        job.errors.append({"linea": None, "documento_id": None, "error": str(e)})
+    finally:
+        job.finished_at = time.time()
+        jobs.publish(job, force=True)
+        os.remove(job.path)
+        _threads.discard(threading.current_thread())
+        logger.info(f"Importación {job.id}: {job.imported} pacientes importados, {job.failed} filas con error de {job.rows}")
+
+
+def start_import(job):
+    # Hilo propio: el parseo y las escrituras son síncronos y duran minutos
+    jobs.set(job.id, job)
+    thread = threading.Thread(target=run_import, args=(job,), name=f"import-{job.id[:8]}", daemon=True)
+    _threads.add(thread)
+    thread.start()
@@ -0,0 +1,77 @@
+# app/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    # LRU en memoria con expiración por entrada, seguro entre hilos
+    def __init__(self, maxsize=1024, ttl=60.0, maxweight=None, weigh=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Límite opcional por peso total (p. ej. bytes), además del número de entradas
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=_MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.maxweight is not None:
+                size = self.weigh(value)
+                if size > self.maxweight:
+                    return
+                self.weight += size
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.maxsize or (self.maxweight is not None and self.weight > self.maxweight):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        value, _ = self._data.pop(key)
+        if self.maxweight is not None:
+            self.weight -= self.weigh(value)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        stats = {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+        if self.maxweight is not None:
+            stats.update({"weight": self.weight, "maxweight": self.maxweight})
+        return stats
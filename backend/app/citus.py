@@ -0,0 +1,93 @@
+# app/citus.py
+import logging
+import os
+
+from sqlalchemy import text
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Workers "host:puerto" separados por comas; se registran en el coordinador si aún no lo están
+CITUS_WORKERS = [w.strip() for w in os.getenv("CITUS_WORKERS", "").split(",") if w.strip()]
+# Nombre con el que los workers alcanzan al coordinador (necesario para sincronizar metadatos)
+CITUS_COORDINATOR_HOST = os.getenv("CITUS_COORDINATOR_HOST")
+CITUS_SHARD_COUNT = int(os.getenv("CITUS_SHARD_COUNT", "32"))
+
+# Tablas replicadas completas en cada nodo: pequeñas y leídas en cada petición autenticada (o al descomprimir)
+REFERENCE_TABLES = ["users", "compression_dictionaries"]
+# (tabla, columna de distribución, colocar con, clave primaria): admisiones y entradas de historial en el mismo shard que su paciente.
+# La clave primaria debe contener la columna de distribución (y la de partición en login_logs)
+DISTRIBUTED_TABLES = [
+    ("patients", "documento_id", "default", 'documento_id, id'),
+    ("admissions", "documento_id", "patients", 'documento_id, id'),
+    ("section_entries", "documento_id", "patients", 'documento_id, id'),
+    ("login_logs", "username", "none", 'username, id, "timestamp"'),
+]
+
+
+def is_citus(conn):
+    return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'citus'")).first() is not None
+
+
+def _register_nodes(conn):
+    if CITUS_COORDINATOR_HOST:
+        conn.execute(text("SELECT citus_set_coordinator_host(:host)"), {"host": CITUS_COORDINATOR_HOST})
+
+    password = engine.url.password
+    if password:
+        # Credenciales para las conexiones coordinador -> workers (nodeid 0 = todos los nodos)
+        conn.execute(text(
+            "INSERT INTO pg_dist_authinfo (nodeid, rolename, authinfo) VALUES (0, :role, :info) "
+            "ON CONFLICT (nodeid, rolename) DO UPDATE SET authinfo = EXCLUDED.authinfo"
+        ), {"role": engine.url.username, "info": f"password={password}"})
+
+    registered = {(row.nodename, row.nodeport) for row in conn.execute(
+        text("SELECT nodename, nodeport FROM pg_dist_node WHERE noderole = 'primary'")
+    )}
+    for worker in CITUS_WORKERS:
+        host, _, port = worker.partition(":")
+        port = int(port or 5432)
+        if (host, port) not in registered:
+            conn.execute(text("SELECT citus_add_node(:host, :port)"), {"host": host, "port": port})
+            logger.info(f"Worker Citus registrado: {host}:{port}")
+
+
+def _distributed_tables(conn):
+    return {row[0] for row in conn.execute(text("SELECT logicalrelid::regclass::text FROM pg_dist_partition"))}
+
+
+def _replace_primary_key(conn, table, columns):
+    # Citus exige que las claves únicas contengan la columna de distribución
+    conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_pkey"))
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY ({columns})"))
+
+
+def distribute_tables(bind=engine):
+    # Idempotente: en PostgreSQL sin la extensión citus (o en SQLite) no hace nada
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        if not is_citus(conn):
+            return
+        _register_nodes(conn)
+        done = _distributed_tables(conn)
+
+    for table in REFERENCE_TABLES:
+        if table not in done:
+            with bind.begin() as conn:
+                conn.execute(text("SELECT create_reference_table(:table)"), {"table": table})
+            logger.info(f"Tabla de referencia Citus: {table}")
+
+    # Una transacción por tabla: create_distributed_table copia los datos existentes a los shards
+    for table, column, colocate_with, primary_key in DISTRIBUTED_TABLES:
+        if table in done:
+            continue
+        with bind.begin() as conn:
+            _replace_primary_key(conn, table, primary_key)
+            conn.execute(text(f"SET LOCAL citus.shard_count = {CITUS_SHARD_COUNT}"))
+            conn.execute(
+                text("SELECT create_distributed_table(:table, :column, colocate_with => :colocate_with)"),
+                {"table": table, "column": column, "colocate_with": colocate_with},
+            )
+        logger.info(f"Tabla distribuida Citus: {table} por {column}")
@@ -0,0 +1,163 @@
+# app/compression.py
+# Compresión de las secciones clínicas: deflate con un diccionario compartido entrenado con el propio
+# texto de las historias (frases y giros que se repiten entre pacientes). Con textos de 0,5-2 KB el
+# diccionario es lo que marca la diferencia: sin él, cada valor se comprime solo contra sí mismo.
+#
+# Formato de cada valor: b"\x00" + id del diccionario (2 bytes, 0 = sin diccionario) + deflate sin cabecera.
+# Lo que no empieza por \x00 es UTF-8 sin comprimir (valores que no ganan nada y filas sin recomprimir);
+# SQLite devuelve además como str las filas escritas antes, cuando la columna era texto.
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+
+from sqlalchemy import LargeBinary, event, text
+from sqlalchemy.types import TypeDecorator
+
+from app.database import async_engine, engine
+
+logger = logging.getLogger(__name__)
+
+# false: las secciones se guardan como UTF-8 sin comprimir (se siguen leyendo las ya comprimidas)
+TEXT_COMPRESSION = os.getenv("TEXT_COMPRESSION", "true").lower() in ("1", "true", "yes")
+TEXT_COMPRESSION_LEVEL = 6
+# deflate no usa más de 32 KB de diccionario
+DICTIONARY_SIZE = 32 * 1024
+
+_HEADER = struct.Struct(">cH")
+_MARKER = b"\x00"
+
+_dictionaries = {}
+# (id, compresor ya cargado con el diccionario): copiarlo evita procesar los 32 KB en cada valor
+_current = (0, None)
+_lock = threading.Lock()
+
+
+def _primed_compressor(zdict=None):
+    options = {"zdict": zdict} if zdict else {}
+    return zlib.compressobj(TEXT_COMPRESSION_LEVEL, zlib.DEFLATED, -15, **options)
+
+
+def load_dictionaries(bind=engine):
+    # Todos los diccionarios (para leer) y el más reciente (para escribir)
+    global _current
+    with bind.connect() as conn:
+        rows = conn.execute(text("SELECT id, data FROM compression_dictionaries ORDER BY id")).all()
+    with _lock:
+        for row in rows:
+            _dictionaries[row.id] = bytes(row.data)
+        if rows:
+            _current = (rows[-1].id, _primed_compressor(_dictionaries[rows[-1].id]))
+    return _current[0]
+
+
+def _dictionary(dictionary_id):
+    zdict = _dictionaries.get(dictionary_id)
+    if zdict is None:
+        # Entrenado por otro proceso después de arrancar este
+        with engine.connect() as conn:
+            data = conn.execute(
+                text("SELECT data FROM compression_dictionaries WHERE id = :id"), {"id": dictionary_id}
+            ).scalar()
+        if data is None:
+            raise ValueError(f"Diccionario de compresión {dictionary_id} desconocido")
+        zdict = _dictionaries[dictionary_id] = bytes(data)
+    return zdict
+
+
+def current_dictionary():
+    return _current[0]
+
+
+def compress(value):
+    if value is None:
+        return None
+    raw = value.encode("utf-8")
+    # Un texto que empezara por \x00 se confundiría con un valor comprimido: se comprime siempre
+    if not TEXT_COMPRESSION and not raw.startswith(_MARKER):
+        return raw
+    dictionary_id, primed = _current
+    compressor = primed.copy() if primed is not None else _primed_compressor()
+    data = _HEADER.pack(_MARKER, dictionary_id) + compressor.compress(raw) + compressor.flush()
+    return data if len(data) < len(raw) or raw.startswith(_MARKER) else raw
+
+
+def decompress(value):
+    if value is None or isinstance(value, str):
+        return value
+    # psycopg2 devuelve memoryview
+    value = bytes(value)
+    if not value.startswith(_MARKER):
+        return value.decode("utf-8")
+    _, dictionary_id = _HEADER.unpack_from(value)
+    options = {"zdict": _dictionary(dictionary_id)} if dictionary_id else {}
+    decompressor = zlib.decompressobj(-15, **options)
+    return (decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()).decode("utf-8")
+
+
+class _RawBinary(LargeBinary):
+    # Sin conversión al leer: la hace CompressedText (memoryview, bytes o str de filas anteriores)
+    def result_processor(self, dialect, coltype):
+        return None
+
+
+class CompressedText(TypeDecorator):
+    # Texto en la aplicación, comprimido en la base de datos (bytea / BLOB). Solo se descomprimen las
+    # columnas que aparecen en la consulta: las lecturas por columnas no pagan las secciones no pedidas
+    impl = _RawBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress(value)
+
+
+def _fragments(sample):
+    # Frases completas y secuencias de 1 a 6 palabras (fármacos, pautas, giros de la exploración)
+    for sentence in re.split(r"(?<=[.;:])\s+", sample):
+        yield sentence
+        words = sentence.split()
+        for n in range(1, 7):
+            for i in range(len(words) - n + 1):
+                yield " ".join(words[i:i + n])
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    # Fragmentos ordenados por bytes que ahorrarían (apariciones en distintas muestras x longitud).
+    # deflate codifica más barato las distancias cortas: lo más útil va al final del diccionario
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(_fragments(sample)))
+    min_count = max(2, len(samples) // 500)
+    candidates = sorted(
+        ((count * len(fragment), fragment) for fragment, count in counts.items() if count >= min_count and len(fragment) > 4),
+        reverse=True,
+    )
+    chosen = []
+    used = 0
+    joined = ""
+    for _, fragment in candidates:
+        if used >= size:
+            break
+        # Un fragmento contenido en otro ya elegido no aporta nada
+        if fragment in joined:
+            continue
+        chosen.append(fragment)
+        joined += fragment + " "
+        used += len(fragment.encode("utf-8")) + 1
+    return " ".join(reversed(chosen)).encode("utf-8")[-size:]
+
+
+def _register_sqlite_function(dbapi_connection, connection_record):
+    # Los triggers e índices FTS5 de SQLite leen el texto con descomprimir(columna)
+    dbapi_connection.create_function("descomprimir", 1, decompress, deterministic=True)
+
+
+for _engine in (engine, async_engine.sync_engine if async_engine is not None else None):
+    if _engine is not None and _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _register_sqlite_function)
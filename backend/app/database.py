@@ -1,12 +1,174 @@
 # app/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import CursorResult
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from fastapi.concurrency import run_in_threadpool
 import os
+import threading
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./clinical.db")
 
-engine = create_engine(DATABASE_URL)
+# Pool de conexiones (ajustar según max_connections del coordinador Citus y el número de réplicas)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Motor asíncrono (asyncpg para PostgreSQL/Citus, aiosqlite para SQLite) en lugar del threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+wait_stats = PoolWaitStats()
+
+
+class _MeteredPoolMixin:
+    # Mide cuánto espera cada petición por una conexión libre
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _async_url(url):
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+def _engine_kwargs(url, poolclass=MeteredQueuePool):
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite:/")):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(_async_url(DATABASE_URL), **_engine_kwargs(DATABASE_URL, MeteredAsyncQueuePool))
+    # Sin expirar tras commit: en modo asíncrono no hay carga perezosa de atributos
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+class ThreadedSession:
+    # Misma interfaz que AsyncSession sobre una Session síncrona que se ejecuta en el threadpool
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None):
+        def run():
+            # Los resultados se leen completos dentro del hilo, como hace AsyncSession.
+            # Sin filas (UPDATE sin RETURNING) no hay nada que leer: se devuelve tal cual
+            result = self.sync_session.execute(statement, params)
+            return result if isinstance(result, CursorResult) and not result.returns_rows else result.freeze()
+        result = await run_in_threadpool(run)
+        return result() if callable(result) else result
+
+    async def scalar(self, statement, params=None):
+        return (await self.execute(statement, params)).scalar()
+
+    async def scalars(self, statement, params=None):
+        return (await self.execute(statement, params)).scalars()
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadedSession(SessionLocal(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+def pool_stats():
+    pool = async_engine.pool if async_engine is not None else engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": DB_MAX_OVERFLOW,
+        })
+    stats.update({
+        "checkouts": wait_stats.checkouts,
+        "timeouts": wait_stats.timeouts,
+        "wait_seconds_total": round(wait_stats.wait_seconds_total, 6),
+        "wait_seconds_max": round(wait_stats.wait_seconds_max, 6),
+    })
+    return stats
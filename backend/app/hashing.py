@@ -0,0 +1,117 @@
+# app/hashing.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.metrics import PASSWORD_HASH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+# Pool dedicado para pbkdf2: "thread" (hashlib libera el GIL) o "process"
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Máximo de verificaciones en curso + en cola antes de responder 503
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 8)))
+HASH_RETRY_AFTER = os.getenv("HASH_RETRY_AFTER", "1")
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _verify(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if HASH_EXECUTOR == "process":
+                    _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+                logger.info(f"Pool de hashing iniciado: {HASH_EXECUTOR} x {HASH_WORKERS}, cola máxima {HASH_QUEUE_LIMIT}")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def pending():
+    return _pending
+
+
+def _overloaded():
+    logger.warning("Pool de hashing saturado, rechazando petición")
+    return HTTPException(
+        status_code=503,
+        detail="Servidor ocupado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": HASH_RETRY_AFTER},
+    )
+
+
+def check_capacity():
+    # Comprobación barata antes de tocar la base de datos
+    if _pending >= HASH_QUEUE_LIMIT:
+        raise _overloaded()
+
+
+def _acquire_slot():
+    global _pending
+    with _pending_lock:
+        if _pending >= HASH_QUEUE_LIMIT:
+            return False
+        _pending += 1
+        return True
+
+
+def _release_slot(_future=None):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _submit(fn, *args):
+    # Rechazo inmediato si el pool está saturado, en lugar de encolar sin límite
+    if not _acquire_slot():
+        raise _overloaded()
+    start = time.perf_counter()
+    try:
+        future = get_executor().submit(fn, *args)
+    except Exception:
+        _release_slot()
+        raise
+    # El slot se libera cuando termina el trabajo, aunque el cliente se desconecte
+    future.add_done_callback(_release_slot)
+    try:
+        return await asyncio.wrap_future(future)
+    finally:
+        PASSWORD_HASH_SECONDS.labels(fn.__name__.lstrip("_")).observe(time.perf_counter() - start)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _submit(_verify, plain_password, hashed_password)
+
+
+async def hash_password_async(password):
+    return await _submit(_hash, password)
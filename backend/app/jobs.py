@@ -0,0 +1,92 @@
+# app/jobs.py
+# Progreso de los trabajos en segundo plano (importaciones, lotes de PDF) visible desde cualquier worker del
+# pod: el proceso que ejecuta el trabajo guarda una instantánea JSON en JOBS_DIR y los demás la leen.
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from types import SimpleNamespace
+
+from app.audit import process_alive
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Directorio compartido por los workers del pod (no entre réplicas: cada réplica ve sus trabajos)
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "historias_jobs"))
+# Como mucho una escritura por trabajo en este intervalo, salvo al empezar y al terminar
+JOBS_PUBLISH_SECONDS = 0.5
+
+_JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class JobStore:
+    def __init__(self, kind, maxsize, ttl):
+        self.kind = kind
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _path(self, job_id):
+        return os.path.join(JOBS_DIR, f"{self.kind}_{job_id}.json")
+
+    def set(self, job_id, job):
+        self.local.set(job_id, job)
+        self._expire()
+        self.publish(job, force=True)
+
+    def publish(self, job, force=False):
+        now = time.monotonic()
+        if not force and now - getattr(job, "_published_at", 0) < JOBS_PUBLISH_SECONDS:
+            return
+        job._published_at = now
+        snapshot = {"id": job.id, "owner": job.owner, "pid": os.getpid(), "progress": job.progress(),
+                    "errors_path": getattr(job, "errors_path", None)}
+        path = self._path(job.id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(JOBS_DIR, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            # Sin instantánea el progreso solo se ve desde el worker que ejecuta el trabajo
+            logger.warning(f"No se pudo guardar el progreso de {self.kind} {job.id}: {e}")
+
+    def get(self, job_id):
+        job = self.local.get(job_id)
+        if job is not None or not _JOB_ID_RE.fullmatch(job_id):
+            return job
+        # Trabajo de otro worker: su última instantánea
+        path = self._path(job_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        progress = snapshot.pop("progress")
+        pid = snapshot.pop("pid", None)
+        if progress.get("status") in ("pendiente", "en_progreso") and pid is not None and not process_alive(pid):
+            # El worker que lo ejecutaba terminó (reciclado, reinicio o caída) sin publicar el final
+            progress["status"] = "error"
+            progress["error"] = "Interrumpido: el worker que lo ejecutaba terminó"
+        return SimpleNamespace(**snapshot, progress=lambda: progress)
+
+    def _expire(self):
+        # Instantáneas de trabajos más antiguos que ttl, de este o de otros workers
+        try:
+            names = os.listdir(JOBS_DIR)
+        except OSError:
+            return
+        limit = time.time() - self.ttl
+        for name in names:
+            if name.startswith(f"{self.kind}_"):
+                path = os.path.join(JOBS_DIR, name)
+                try:
+                    if os.path.getmtime(path) < limit:
+                        os.remove(path)
+                except OSError:
+                    pass
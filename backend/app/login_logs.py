@@ -0,0 +1,192 @@
+# app/login_logs.py
+# Particiones mensuales de login_logs (PostgreSQL/Citus) y archivado de los meses fuera de retención.
+#
+#   python -m app.login_logs --months 12 --archive-dir /archive
+import argparse
+import csv
+import gzip
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, text
+
+from app.database import engine
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+LOGIN_LOGS_RETENTION_MONTHS = int(os.getenv("LOGIN_LOGS_RETENTION_MONTHS", "12"))
+LOGIN_LOGS_ARCHIVE_DIR = os.getenv("LOGIN_LOGS_ARCHIVE_DIR", "archive")
+# Particiones futuras creadas por adelantado en cada arranque y en cada ejecución del archivado
+LOGIN_LOGS_PREMAKE_MONTHS = int(os.getenv("LOGIN_LOGS_PREMAKE_MONTHS", "3"))
+
+LoginLog = models.LoginLog
+COLUMNS = ["id", "username", "role", "timestamp", "ip_address"]
+
+
+def month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt, months):
+    years, month = divmod(dt.month - 1 + months, 12)
+    return datetime(dt.year + years, month + 1, 1)
+
+
+def partition_name(month):
+    return f"login_logs_p{month:%Y_%m}"
+
+
+def ensure_partitions(conn, start, end):
+    month = month_start(start)
+    while month <= end:
+        name = partition_name(month)
+        try:
+            with conn.begin_nested():
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF login_logs "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                ))
+        except Exception:
+            # Pasa si la partición por defecto ya tiene filas de ese mes
+            logger.exception(f"No se pudo crear la partición {name}")
+        month = add_months(month, 1)
+
+
+def _convert_to_partitioned(conn):
+    # Tabla creada por create_all (o por versiones anteriores, con timestamp como texto ISO):
+    # se recrea particionada por mes y se copian las filas
+    data_type = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = 'login_logs' AND column_name = 'timestamp'"
+    )).scalar()
+    if not data_type.startswith("timestamp"):
+        conn.execute(text('ALTER TABLE login_logs ALTER COLUMN "timestamp" TYPE timestamp USING "timestamp"::timestamp'))
+
+    conn.execute(text("ALTER TABLE login_logs RENAME TO login_logs_plain"))
+    conn.execute(text("ALTER TABLE login_logs_plain RENAME CONSTRAINT login_logs_pkey TO login_logs_plain_pkey"))
+    for (index,) in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'login_logs_plain' AND indexname <> 'login_logs_plain_pkey'"
+    )).all():
+        conn.execute(text(f"DROP INDEX {index}"))
+    conn.execute(text("ALTER SEQUENCE login_logs_id_seq OWNED BY NONE"))
+
+    # La clave primaria de una tabla particionada debe incluir la columna de partición
+    conn.execute(text("""
+        CREATE TABLE login_logs (
+            id integer NOT NULL DEFAULT nextval('login_logs_id_seq'),
+            username varchar NOT NULL,
+            role varchar NOT NULL,
+            "timestamp" timestamp without time zone NOT NULL,
+            ip_address varchar,
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """))
+    conn.execute(text("ALTER SEQUENCE login_logs_id_seq OWNED BY login_logs.id"))
+    for index in LoginLog.__table__.indexes:
+        index.create(conn)
+
+    now = datetime.now()
+    first = conn.execute(text('SELECT min("timestamp") FROM login_logs_plain')).scalar() or now
+    ensure_partitions(conn, min(first, now), add_months(now, LOGIN_LOGS_PREMAKE_MONTHS))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS login_logs_default PARTITION OF login_logs DEFAULT"))
+    conn.execute(text('INSERT INTO login_logs SELECT id, username, role, "timestamp", ip_address FROM login_logs_plain'))
+    conn.execute(text("DROP TABLE login_logs_plain"))
+
+
+def setup_login_logs(bind=engine):
+    # Idempotente: convierte la tabla la primera vez y luego solo crea las particiones que falten
+    dialect = bind.dialect.name
+    with bind.begin() as conn:
+        if dialect == "sqlite":
+            # Base de datos anterior: timestamp guardado como ISO con "T" y sin índices
+            if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'ix_login_logs_timestamp_id'")).first() is None:
+                conn.execute(text("""UPDATE login_logs SET "timestamp" = replace("timestamp", 'T', ' ')"""))
+                for index in LoginLog.__table__.indexes:
+                    index.create(conn, checkfirst=True)
+        elif dialect == "postgresql":
+            kind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('login_logs')")).scalar()
+            if kind == "r":
+                citus = conn.execute(text("SELECT to_regclass('pg_dist_partition')")).scalar() is not None
+                if citus and conn.execute(text(
+                    "SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'login_logs'::regclass"
+                )).first():
+                    logger.warning("login_logs ya está distribuida sin particiones; ejecutar undistribute_table('login_logs') para particionarla")
+                    return
+                _convert_to_partitioned(conn)
+                logger.info("login_logs convertida a tabla particionada por mes")
+            elif kind == "p":
+                now = datetime.now()
+                ensure_partitions(conn, now, add_months(now, LOGIN_LOGS_PREMAKE_MONTHS))
+
+
+def _export_month(bind, month, end, archive_dir):
+    path = os.path.join(archive_dir, f"login_logs_{month:%Y_%m}.csv.gz")
+    tmp = f"{path}.tmp"
+    count = 0
+    query = (
+        select(*[getattr(LoginLog, c) for c in COLUMNS])
+        .where(LoginLog.timestamp >= month, LoginLog.timestamp < end)
+        .order_by(LoginLog.timestamp, LoginLog.id)
+    )
+    with bind.connect() as conn, gzip.open(tmp, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in conn.execution_options(stream_results=True, yield_per=10000).execute(query):
+            writer.writerow(row)
+            count += 1
+    if count == 0:
+        os.remove(tmp)
+        return None, 0
+    os.replace(tmp, path)
+    return path, count
+
+
+def _drop_month(bind, month, end):
+    with bind.begin() as conn:
+        if bind.dialect.name == "postgresql":
+            name = partition_name(month)
+            if conn.execute(text(f"SELECT to_regclass('{name}')")).scalar() is not None:
+                # Quitar una partición entera es instantáneo, sin DELETE ni VACUUM
+                conn.execute(text(f"ALTER TABLE login_logs DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+        # Filas del mes que estén en la partición por defecto (o toda la tabla en SQLite)
+        conn.execute(delete(LoginLog).where(LoginLog.timestamp >= month, LoginLog.timestamp < end))
+
+
+def archive_old_logs(bind=engine, months=LOGIN_LOGS_RETENTION_MONTHS, archive_dir=LOGIN_LOGS_ARCHIVE_DIR, now=None):
+    # Exporta a CSV comprimido cada mes anterior a la retención y luego lo elimina de la base de datos
+    cutoff = add_months(month_start(now or datetime.now()), -months)
+    with bind.connect() as conn:
+        first = conn.execute(select(func.min(LoginLog.timestamp))).scalar()
+    if first is None:
+        return []
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = []
+    month = month_start(first)
+    while month < cutoff:
+        end = add_months(month, 1)
+        path, count = _export_month(bind, month, end, archive_dir)
+        _drop_month(bind, month, end)
+        if path:
+            logger.info(f"Archivados {count} logs de {month:%Y-%m} en {path}")
+            archived.append((path, count))
+        month = end
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archiva y elimina los logs de login anteriores a la retención")
+    parser.add_argument("--months", type=int, default=LOGIN_LOGS_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=LOGIN_LOGS_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    setup_login_logs()
+    archived = archive_old_logs(months=args.months, archive_dir=args.archive_dir)
+    logger.info(f"Archivado terminado: {len(archived)} meses, {sum(count for _, count in archived)} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,99 @@
 # app/main.py
-from fastapi import FastAPI, HTTPException, Depends, Form, Request
+import time
+
+# Para el tiempo de arranque que se registra al terminar el lifespan
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Request, UploadFile
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from types import SimpleNamespace
+from typing import Optional
 import logging
 
-from app.database import Base, engine, SessionLocal
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine, async_engine, get_db, pool_stats
 import app.models as models
-from app.auth import authenticate_user, create_access_token, get_current_user, get_current_user_with_role, get_password_hash
+from app.auth import authenticate_user_async, create_access_token, get_current_user, get_current_user_with_role
 from app.models import PatientUpdate, LoginLog
-from datetime import timedelta, datetime
+from app import hashing
+from app.hashing import hash_password_async, shutdown_executor
+from app.pdf import get_cached, iter_file, pdf_cache, pdf_etag, render_and_cache
+from app import bulk_import, pdf_batch
+from app.audit import audit_writer
+from app.bootstrap import bootstrap, prepare_process
+from app.metrics import MetricsMiddleware, instrument_engine, mark_process_dead, register_gauges, render_latest
+from app.responses import CompressionMiddleware, ORJSONResponse, etag_matches, model_response
+from app.assets import INDEX, StaticAssets
+from app.patient_cache import patient_cache
+from app import search, section_history
+from app.search import SEARCH_FIELDS, SEARCH_MAX_OFFSET, search_patients
+from datetime import date, timedelta, datetime
+import base64
+import os
+import tempfile
 
 from fastapi.middleware.cors import CORSMiddleware
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
-
-# Crear usuario médico por defecto si no existe
-db = SessionLocal()
-try:
-    medico = db.query(models.User).filter(models.User.username == "gabriel").first()
-    if not medico:
-        hashed_password = get_password_hash("medico123")
-        medico = models.User(username="gabriel", hashed_password=hashed_password, role="medico")
-        db.add(medico)
-        db.commit()
-        logger.info("Usuario médico por defecto creado: gabriel / medico123")
+# false cuando la base de datos la prepara `python -m app.bootstrap` (initContainer/job) antes de arrancar:
+# los workers y réplicas no repiten el DDL ni compiten por hacerlo
+BOOTSTRAP_ON_STARTUP = os.getenv("BOOTSTRAP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Hilos de run_in_threadpool por proceso (sesiones síncronas, PDF, ficheros); 0 = el valor de anyio (40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "0"))
+
+# Admisiones más recientes incluidas en GET /paciente; el resto se pagina en /paciente/{id}/admisiones
+PACIENTE_ADMISSIONS_LIMIT = int(os.getenv("PACIENTE_ADMISSIONS_LIMIT", "100"))
+
+# Tiempo y número de consultas SQL por petición para /metrics
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+register_gauges([
+    ("db_pool_checked_out", "Conexiones del pool en uso", lambda: pool_stats().get("checked_out")),
+    ("db_pool_size", "Tamaño base del pool de conexiones", lambda: pool_stats().get("size")),
+    ("db_pool_overflow", "Conexiones abiertas por encima de DB_POOL_SIZE", lambda: pool_stats().get("overflow")),
+    ("db_pool_timeouts", "Esperas por conexión que agotaron DB_POOL_TIMEOUT", lambda: pool_stats()["timeouts"]),
+    ("hash_pool_pending", "Hashes de contraseña en curso o en cola", hashing.pending),
+    ("hash_pool_limit", "Máximo de hashes en cola antes de responder 503", lambda: hashing.HASH_QUEUE_LIMIT),
+    ("audit_queue_size", "Eventos de login pendientes de escribir", lambda: audit_writer.stats()["queued"]),
+    ("pdf_cache_bytes", "Bytes ocupados por la caché de PDFs", lambda: pdf_cache.weight),
+    ("patient_cache_size", "Pacientes en la caché local de GET /paciente", patient_cache.size),
+])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if THREADPOOL_SIZE:
+        to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    if BOOTSTRAP_ON_STARTUP:
+        await run_in_threadpool(bootstrap, engine)
     else:
-        logger.info("Usuario médico ya existe, actualizando contraseña")
-        medico.hashed_password = get_password_hash("medico123")
-        db.commit()
-        logger.info("Contraseña actualizada para gabriel / medico123")
-
-    # Crear usuario admisionista por defecto si no existe
-    admisionista = db.query(models.User).filter(models.User.username == "admision").first()
-    if not admisionista:
-        hashed_password = get_password_hash("admision123")
-        admisionista = models.User(username="admision", hashed_password=hashed_password, role="admisionista")
-        db.add(admisionista)
-        db.commit()
-        logger.info("Usuario admisionista por defecto creado: admision / admision123")
-    else:
-        logger.info("Usuario admisionista ya existe, actualizando contraseña")
-        admisionista.hashed_password = get_password_hash("admision123")
-        db.commit()
-        logger.info("Contraseña actualizada para admision / admision123")
-finally:
-    db.close()
-
-app = FastAPI()
+        await run_in_threadpool(prepare_process, engine)
+    audit_writer.start()
+    app.state.ready = True
+    logger.info(f"Aplicación lista en {(time.perf_counter() - _import_started) * 1000:.0f} ms desde la importación")
+    yield
+    # Deja de recibir tráfico nuevo mientras termina lo pendiente
+    app.state.ready = False
+    await audit_writer.stop()
+    shutdown_executor()
+    pdf_batch.shutdown_executor()
+    await run_in_threadpool(bulk_import.stop_imports)
+    if async_engine is not None:
+        await async_engine.dispose()
+    mark_process_dead()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.state.ready = False
 
 # Permitir que el frontend acceda
 app.add_middleware(
@@ -61,6 +104,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# brotli/gzip según Accept-Encoding para JSON y texto a partir de COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Latencia por ruta y SQL por petición; log de peticiones lentas con SLOW_REQUEST_SECONDS
+app.add_middleware(MetricsMiddleware)
+
+# Frontend generado por `python -m app.assets`: nombres con hash, caché inmutable y variantes .br/.gz
+static_assets = StaticAssets()
+app.mount("/static/dist", static_assets, name="static_dist")
+
 # Servir archivos estáticos
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -68,15 +121,16 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 async def read_root(request: Request):
     client_ip = request.client.host if request.client else "unknown"
     logger.info(f"Acceso a la raíz desde IP: {client_ip}")
-    return FileResponse("app/static/index.html")
+    # Sin build (desarrollo) se sirve el index.html original, que se revalida en cada carga
+    return static_assets.response(INDEX, request.headers) or FileResponse(
+        "app/static/index.html", headers={"Cache-Control": "no-cache"}
+    )
 
 @app.post("/token/medico")
-def login_medico(request: Request, username: str = Form(...), password: str = Form(...)):
+async def login_medico(request: Request, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
     client_ip = request.client.host if request.client else "unknown"
     logger.info(f"Intento de login médico desde IP: {client_ip} para usuario: {username}")
-    db = SessionLocal()
-
-    user = authenticate_user(db, username, password)
+    user = await authenticate_user_async(db, username, password)
 
     if not user or user.role != "medico":
         logger.warning(f"Intento de login médico fallido para usuario: {username}")
@@ -84,19 +138,12 @@ def login_medico(request: Request, username: str = Form(...), password: str = Fo
 
     logger.info(f"Login médico exitoso para usuario: {username}")
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
+        data={"sub": user.username, "role": user.role, "uid": user.id},
         expires_delta=timedelta(minutes=60)
     )
 
-    # Registrar log de login
-    log_entry = models.LoginLog(
-        username=username,
-        role=user.role,
-        timestamp=datetime.now().isoformat(),
-        ip_address=request.client.host if request.client else None
-    )
-    db.add(log_entry)
-    db.commit()
+    # Registrar log de login (se escribe en lote en segundo plano, fuera de la petición)
+    audit_writer.record(username, user.role, request.client.host if request.client else None)
 
     return {
         "access_token": access_token,
@@ -105,12 +152,10 @@ def login_medico(request: Request, username: str = Form(...), password: str = Fo
     }
 
 @app.post("/token/paciente")
-def login_paciente(request: Request, documento_id: str = Form(...), password: str = Form(...)):
+async def login_paciente(request: Request, documento_id: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
     client_ip = request.client.host if request.client else "unknown"
     logger.info(f"Intento de login paciente desde IP: {client_ip} para documento: {documento_id}")
-    db = SessionLocal()
-
-    user = authenticate_user(db, documento_id, password)
+    user = await authenticate_user_async(db, documento_id, password)
 
     if not user or user.role != "paciente":
         logger.warning(f"Intento de login paciente fallido para documento: {documento_id}")
@@ -118,19 +163,12 @@ def login_paciente(request: Request, documento_id: str = Form(...), password: st
 
     logger.info(f"Login paciente exitoso para documento: {documento_id}")
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
+        data={"sub": user.username, "role": user.role, "uid": user.id},
         expires_delta=timedelta(minutes=60)
     )
 
-    # Registrar log de login
-    log_entry = models.LoginLog(
-        username=documento_id,
-        role=user.role,
-        timestamp=datetime.now().isoformat(),
-        ip_address=request.client.host if request.client else None
-    )
-    db.add(log_entry)
-    db.commit()
+    # Registrar log de login (se escribe en lote en segundo plano, fuera de la petición)
+    audit_writer.record(documento_id, user.role, request.client.host if request.client else None)
 
     return {
         "access_token": access_token,
@@ -139,12 +177,10 @@ def login_paciente(request: Request, documento_id: str = Form(...), password: st
     }
 
 @app.post("/token/admisionista")
-def login_admisionista(request: Request, username: str = Form(...), password: str = Form(...)):
+async def login_admisionista(request: Request, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
     client_ip = request.client.host if request.client else "unknown"
     logger.info(f"Intento de login admisionista desde IP: {client_ip} para usuario: {username}")
-    db = SessionLocal()
-
-    user = authenticate_user(db, username, password)
+    user = await authenticate_user_async(db, username, password)
 
     if not user or user.role != "admisionista":
         logger.warning(f"Intento de login admisionista fallido para usuario: {username}")
@@ -152,19 +188,12 @@ def login_admisionista(request: Request, username: str = Form(...), password: st
 
     logger.info(f"Login admisionista exitoso para usuario: {username}")
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
+        data={"sub": user.username, "role": user.role, "uid": user.id},
         expires_delta=timedelta(minutes=60)
     )
 
-    # Registrar log de login
-    log_entry = models.LoginLog(
-        username=username,
-        role=user.role,
-        timestamp=datetime.now().isoformat(),
-        ip_address=request.client.host if request.client else None
-    )
-    db.add(log_entry)
-    db.commit()
+    # Registrar log de login (se escribe en lote en segundo plano, fuera de la petición)
+    audit_writer.record(username, user.role, request.client.host if request.client else None)
 
     return {
         "access_token": access_token,
@@ -172,51 +201,230 @@ def login_admisionista(request: Request, username: str = Form(...), password: st
         "role": user.role
     }
 
-@app.get("/paciente/{documento_id}")
-def get_paciente(documento_id: str, user=Depends(get_current_user)):
-    db = SessionLocal()
-    patient = db.query(models.Patient).filter(models.Patient.documento_id == documento_id).first()
-    if not patient:
+def _selected_fields(fields: Optional[str], sections: Optional[str]):
+    # Sin selector se devuelve la historia completa, como siempre
+    if fields is None and sections is None:
+        return set(models.PATIENT_DEMOGRAPHICS + models.PATIENT_SECTIONS + ["admissions"])
+
+    selected = {"documento_id"}
+    for value, allowed in ((fields, models.PATIENT_DEMOGRAPHICS + models.PATIENT_SECTIONS + ["admissions"]),
+                           (sections, models.PATIENT_SECTIONS)):
+        requested = {f.strip() for f in (value or "").split(",") if f.strip()}
+        unknown = requested - set(allowed)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(sorted(unknown))}")
+        selected |= requested
+    return selected
+
+def _patient_etag(version: int):
+    return f'"{version}"'
+
+def _expected_version(if_match: Optional[str], changes: dict):
+    # Versión esperada desde If-Match ("3" o W/"3") o, si no se envía, desde "version" en el cuerpo
+    value = changes.pop("version", None)
+    if if_match is not None:
+        value = if_match.strip().removeprefix("W/").strip('"')
+    if value is None:
+        raise HTTPException(status_code=428, detail="Se requiere la cabecera If-Match con la versión del paciente")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Versión inválida en If-Match")
+
+async def _check_version(db, documento_id: str, expected: Optional[int]):
+    # Versión actual del paciente: 404 si no existe, 412 con el ETag actual si no es la esperada
+    current = await db.scalar(select(models.Patient.version).where(models.Patient.documento_id == documento_id))
+    if current is None:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    if expected is not None and current != expected:
+        raise HTTPException(
+            status_code=412,
+            detail=f"La historia clínica fue modificada por otro usuario (versión actual {current})",
+            headers={"ETag": _patient_etag(current)},
+        )
+    return current
+
+def _patient_view(full: dict, selected: set):
+    # Subconjunto pedido de la historia completa guardada en caché, con las mismas claves que sin caché
+    data = {c: full[c] for c in models.PATIENT_DEMOGRAPHICS + models.PATIENT_SECTIONS if c in selected}
+    data["version"] = full["version"]
+    if "admissions" in selected:
+        data["admissions_truncated"] = full["admissions_truncated"]
+        data["admissions"] = full["admissions"]
+    return data
+
+@app.get("/paciente/{documento_id}", response_model=models.PatientRecord)
+async def get_paciente(
+    documento_id: str,
+    fields: Optional[str] = None,
+    sections: Optional[str] = None,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    selected = _selected_fields(fields, sections)
+    cached = await patient_cache.get(documento_id)
+    if cached is not None:
+        # Los permisos se comprueban igual que sin caché antes de servir nada
+        if user.role == "paciente" and documento_id != user.username:
+            raise HTTPException(status_code=403, detail="No tienes permisos para ver esta historia")
+        return model_response(
+            models.PatientRecord, _patient_view(cached, selected),
+            headers={"ETag": _patient_etag(cached["version"])}, exclude_unset=True,
+        )
+
+    # Solo se guarda en caché la historia completa, y solo si nada la modificó durante la lectura
+    full = fields is None and sections is None
+    generation = await patient_cache.generation(documento_id) if full else None
+    # Solo se leen las columnas pedidas; las secciones clínicas (Text) son lo que más pesa
+    columns = [c for c in models.PATIENT_DEMOGRAPHICS + models.PATIENT_SECTIONS if c in selected] + ["version"]
+    row = (await db.execute(
+        select(*[getattr(models.Patient, c) for c in columns]).where(models.Patient.documento_id == documento_id)
+    )).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
 
     # Si el usuario es paciente, solo puede ver su propia historia
     if user.role == "paciente" and documento_id != user.username:
         raise HTTPException(status_code=403, detail="No tienes permisos para ver esta historia")
 
-    # Obtener admisiones del paciente
-    admissions = db.query(models.Admission).filter(models.Admission.documento_id == documento_id).all()
+    data = dict(row._mapping)
+    # Secciones con historial: texto base de la columna + entradas, solo si se han pedido
+    history = [s for s in models.HISTORY_SECTIONS if s in selected]
+    if history:
+        data.update(await section_history.load_texts(db, documento_id, data, history))
+    if "admissions" in selected:
+        # Obtener las admisiones más recientes del paciente (se pide una de más para saber si hay otras)
+        admissions = (await db.execute(
+            select(models.Admission.id, models.Admission.fecha_ingreso, models.Admission.motivo)
+            .where(models.Admission.documento_id == documento_id)
+            .order_by(models.Admission.fecha_ingreso.desc(), models.Admission.id.desc())
+            .limit(PACIENTE_ADMISSIONS_LIMIT + 1)
+        )).all()
+        data["admissions_truncated"] = len(admissions) > PACIENTE_ADMISSIONS_LIMIT
+        data["admissions"] = [
+            {"id": a.id, "fecha_ingreso": a.fecha_ingreso, "motivo": a.motivo}
+            for a in reversed(admissions[:PACIENTE_ADMISSIONS_LIMIT])
+        ]
 
-    return {
-        "documento_id": patient.documento_id,
-        "nombre": patient.nombre,
-        "apellido": patient.apellido,
-        "fecha_nacimiento": patient.fecha_nacimiento,
-        "fecha_creacion": patient.fecha_creacion,
-        "antecedentes_interes": patient.antecedentes_interes,
-        "anamnesis_exploracion": patient.anamnesis_exploracion,
-        "evolucion_clinica": patient.evolucion_clinica,
-        "ordenes_medicas": patient.ordenes_medicas,
-        "tratamiento_farmacologico": patient.tratamiento_farmacologico,
-        "planificacion_cuidados": patient.planificacion_cuidados,
-        "constantes_datos_basicos": patient.constantes_datos_basicos,
-        "interconsulta": patient.interconsulta,
-        "exploraciones_complementarias": patient.exploraciones_complementarias,
-        "consentimientos_informados": patient.consentimientos_informados,
-        "informacion_alta": patient.informacion_alta,
-        "otra_informacion_clinica": patient.otra_informacion_clinica,
-        "informacion_anestesia": patient.informacion_anestesia,
-        "informacion_quirurgica": patient.informacion_quirurgica,
-        "informacion_urgencia": patient.informacion_urgencia,
-        "informacion_parto": patient.informacion_parto,
-        "informacion_anatomia_patologica": patient.informacion_anatomia_patologica,
-        "datos_sociales": patient.datos_sociales,
-        "notas_medico": patient.notas_medico,
-        "admissions": [{"id": a.id, "fecha_ingreso": a.fecha_ingreso, "motivo": a.motivo} for a in admissions]
-    }
+    if full:
+        await patient_cache.set(documento_id, data, generation)
+    # La versión se envía en If-Match al hacer PATCH
+    return model_response(models.PatientRecord, data, headers={"ETag": _patient_etag(data["version"])}, exclude_unset=True)
+
+def _encode_cursor(fecha: datetime, row_id: int):
+    return base64.urlsafe_b64encode(f"{fecha.isoformat()}|{row_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        fecha, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+@app.get("/paciente/{documento_id}/admisiones", response_model=models.AdmissionPage)
+async def list_admisiones(
+    documento_id: str,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Si el usuario es paciente, solo puede ver sus propias admisiones
+    if user.role == "paciente" and documento_id != user.username:
+        raise HTTPException(status_code=403, detail="No tienes permisos para ver esta historia")
+    limit = max(1, min(limit, 500))
+
+    exists = await db.scalar(select(models.Patient.id).where(models.Patient.documento_id == documento_id))
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+
+    # Más recientes primero, recorriendo el índice (documento_id, fecha_ingreso, id) hacia atrás
+    query = (
+        select(models.Admission.id, models.Admission.fecha_ingreso, models.Admission.motivo)
+        .where(models.Admission.documento_id == documento_id)
+        .order_by(models.Admission.fecha_ingreso.desc(), models.Admission.id.desc())
+        .limit(limit)
+    )
+    if desde is not None:
+        query = query.where(models.Admission.fecha_ingreso >= datetime.combine(desde, datetime.min.time()))
+    if hasta is not None:
+        query = query.where(models.Admission.fecha_ingreso < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+    if cursor is not None:
+        fecha, admission_id = _decode_cursor(cursor)
+        query = query.where(tuple_(models.Admission.fecha_ingreso, models.Admission.id) < tuple_(fecha, admission_id))
+
+    rows = (await db.execute(query)).all()
+    items = [{"id": a.id, "fecha_ingreso": a.fecha_ingreso, "motivo": a.motivo} for a in rows]
+    next_cursor = _encode_cursor(rows[-1].fecha_ingreso, rows[-1].id) if len(rows) == limit else None
+    return model_response(models.AdmissionPage, {"items": items, "next": next_cursor})
+
+@app.get("/pacientes", response_model=models.PatientPage)
+async def list_pacientes(
+    after: Optional[str] = None,
+    limit: int = 50,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Resumen ligero para listados: datos demográficos y admisiones, sin secciones clínicas
+    if user.role not in ["medico", "admisionista"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para listar pacientes")
+    limit = max(1, min(limit, 500))
+
+    # Subconsultas correlacionadas: solo se evalúan para la página devuelta (índice por documento_id)
+    same_patient = models.Admission.documento_id == models.Patient.documento_id
+    query = (
+        select(
+            *[getattr(models.Patient, c) for c in models.PATIENT_DEMOGRAPHICS],
+            select(func.count(models.Admission.id)).where(same_patient).scalar_subquery().label("num_admisiones"),
+            select(func.max(models.Admission.fecha_ingreso)).where(same_patient).scalar_subquery().label("ultima_admision"),
+        )
+        .order_by(models.Patient.documento_id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(models.Patient.documento_id > after)
+
+    rows = (await db.execute(query)).all()
+    items = [dict(row._mapping) for row in rows]
+    return model_response(
+        models.PatientPage, {"items": items, "next": items[-1]["documento_id"] if len(items) == limit else None}
+    )
+
+@app.get("/pacientes/buscar", response_model=models.SearchPage)
+async def buscar_pacientes(
+    q: str,
+    campos: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Búsqueda por prefijo de nombre/apellido y palabras del texto clínico, ordenada por relevancia
+    if user.role not in ["medico", "admisionista"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para buscar pacientes")
+    if len(q.strip()) < 2:
+        raise HTTPException(status_code=400, detail="La búsqueda debe tener al menos 2 caracteres")
+    limit = max(1, min(limit, 100))
+    offset = max(0, min(offset, SEARCH_MAX_OFFSET))
+
+    fields = None
+    if campos is not None:
+        fields = {f.strip() for f in campos.split(",") if f.strip()}
+        unknown = fields - set(SEARCH_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(sorted(unknown))}")
+
+    items = await search_patients(db, q, fields, limit, offset)
+    next_offset = offset + limit if len(items) == limit and offset + limit <= SEARCH_MAX_OFFSET else None
+    return model_response(models.SearchPage, {"items": items, "next": next_offset})
 
 @app.put("/paciente/{documento_id}")
-def update_paciente(
+async def update_paciente(
     documento_id: str,
+    request: Request,
+    response: Response,
     antecedentes_interes: str = Form(""),
     anamnesis_exploracion: str = Form(""),
     evolucion_clinica: str = Form(""),
@@ -236,24 +444,52 @@ def update_paciente(
     informacion_anatomia_patologica: str = Form(""),
     datos_sociales: str = Form(""),
     notas_medico: str = Form(""),
-    user=Depends(get_current_user)
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     if user.role not in ["medico", "admisionista"]:
         raise HTTPException(status_code=403, detail="No tienes permisos para actualizar historias clínicas")
-    db = SessionLocal()
-    patient = db.query(models.Patient).filter(models.Patient.documento_id == documento_id).first()
+    # If-Match es opcional (clientes que solo conocen PUT); si se envía, se comprueba como en PATCH
+    if_match = request.headers.get("if-match")
+    expected = _expected_version(if_match, {}) if if_match is not None else None
+
+    # La versión se incrementa en SQL antes de leer: dos escrituras concurrentes no pierden ningún
+    # incremento, y la fila queda bloqueada hasta el commit
+    conditions = [models.Patient.documento_id == documento_id]
+    if expected is not None:
+        conditions.append(models.Patient.version == expected)
+    new_version = await db.scalar(
+        update(models.Patient)
+        .where(*conditions)
+        .values(version=models.Patient.version + 1)
+        .returning(models.Patient.version)
+    )
+    if new_version is None:
+        await _check_version(db, documento_id, expected)
+
+    # Las secciones que se sobrescriben no se leen (ni se descomprimen)
+    history_columns = [getattr(models.Patient, s) for s in models.HISTORY_SECTIONS]
+    patient = await db.scalar(
+        select(models.Patient)
+        .options(load_only(models.Patient.id, models.Patient.documento_id, models.Patient.version, *history_columns))
+        .where(models.Patient.documento_id == documento_id)
+    )
     if not patient:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
 
+    base = {s: getattr(patient, s) for s in models.HISTORY_SECTIONS}
     if user.role == "medico":
         # Médico solo puede actualizar notas_medico
-        patient.notas_medico = notas_medico
+        await section_history.save_texts(db, documento_id, {"notas_medico": notas_medico}, user.username, base)
         message = "Notas del médico actualizadas"
     else:
-        # Admisionista puede actualizar todo
+        # Admisionista puede actualizar todo; las secciones con historial se guardan como entradas
+        await section_history.save_texts(db, documento_id, {
+            "evolucion_clinica": evolucion_clinica,
+            "notas_medico": notas_medico,
+        }, user.username, base)
         patient.antecedentes_interes = antecedentes_interes
         patient.anamnesis_exploracion = anamnesis_exploracion
-        patient.evolucion_clinica = evolucion_clinica
         patient.ordenes_medicas = ordenes_medicas
         patient.tratamiento_farmacologico = tratamiento_farmacologico
         patient.planificacion_cuidados = planificacion_cuidados
@@ -269,26 +505,155 @@ def update_paciente(
         patient.informacion_parto = informacion_parto
         patient.informacion_anatomia_patologica = informacion_anatomia_patologica
         patient.datos_sociales = datos_sociales
-        patient.notas_medico = notas_medico
+        await db.flush()
+        await search.index_patients_async(db, [{"documento_id": documento_id, **{s: getattr(patient, s) for s in models.PATIENT_SECTIONS}}])
         message = "Historia clínica actualizada"
 
-    db.commit()
-    db.refresh(patient)
-    return {"message": message}
+    await db.commit()
+    await patient_cache.invalidate(documento_id)
+
+    response.headers["ETag"] = _patient_etag(new_version)
+    return {"message": message, "version": new_version}
+
+@app.patch("/paciente/{documento_id}")
+async def patch_paciente(
+    documento_id: str,
+    changes: dict,
+    request: Request,
+    response: Response,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if user.role not in ["medico", "admisionista"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para actualizar historias clínicas")
+    expected = _expected_version(request.headers.get("if-match"), changes)
+
+    unknown = set(changes) - set(models.PATIENT_SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    if any(value is not None and not isinstance(value, str) for value in changes.values()):
+        raise HTTPException(status_code=400, detail="Las secciones deben ser texto")
+    # Médico solo puede actualizar notas_medico
+    if user.role == "medico" and set(changes) - {"notas_medico"}:
+        raise HTTPException(status_code=403, detail="Los médicos solo pueden actualizar notas_medico")
+
+    # Un único UPDATE con solo las columnas enviadas; la condición de versión evita pisar otra edición.
+    # Las secciones con historial no se reescriben: se añade una entrada con lo que cambió
+    history = {k: v for k, v in changes.items() if k in models.HISTORY_SECTIONS}
+    columns = {k: v for k, v in changes.items() if k not in models.HISTORY_SECTIONS}
+    new_version = None
+    if changes:
+        # Si cambian columnas se devuelven todas las secciones para recalcular el documento de búsqueda
+        returned = models.PATIENT_SECTIONS if columns else models.HISTORY_SECTIONS
+        row = (await db.execute(
+            update(models.Patient)
+            .where(models.Patient.documento_id == documento_id, models.Patient.version == expected)
+            .values(**columns, version=models.Patient.version + 1)
+            .returning(models.Patient.version, *[getattr(models.Patient, s) for s in returned])
+        )).first()
+        if row is not None:
+            new_version = row.version
+            if columns:
+                await search.index_patients_async(db, [{"documento_id": documento_id, **row._mapping}])
+            if history:
+                await section_history.save_texts(db, documento_id, history, user.username, row._mapping)
+    if new_version is None:
+        new_version = await _check_version(db, documento_id, expected)
+    await db.commit()
+    await patient_cache.invalidate(documento_id)
+
+    response.headers["ETag"] = _patient_etag(new_version)
+    return {"message": "Historia clínica actualizada", "version": new_version, "updated": sorted(changes)}
+
+def _history_section(section: str, user, write=False):
+    if section not in models.HISTORY_SECTIONS:
+        raise HTTPException(status_code=404, detail="Sección sin historial")
+    if write and user.role == "medico" and section != "notas_medico":
+        raise HTTPException(status_code=403, detail="Los médicos solo pueden actualizar notas_medico")
+
+@app.get("/paciente/{documento_id}/secciones/{section}/entradas", response_model=models.SectionEntryPage)
+async def list_section_entries(
+    documento_id: str,
+    section: str,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    _history_section(section, user)
+    if user.role == "paciente" and documento_id != user.username:
+        raise HTTPException(status_code=403, detail="No tienes permisos para ver esta historia")
+
+    limit = max(1, min(limit, 200))
+    query = section_history.list_entries_query(
+        documento_id, section,
+        desde=datetime.combine(desde, datetime.min.time()) if desde else None,
+        hasta=datetime.combine(hasta + timedelta(days=1), datetime.min.time()) if hasta else None,
+        before=_decode_cursor(cursor) if cursor else None,
+        limit=limit,
+    )
+    entries = (await db.execute(query)).all()
+    next_cursor = _encode_cursor(entries[-1].created_at, entries[-1].id) if len(entries) == limit else None
+    return model_response(models.SectionEntryPage, {"items": [dict(e._mapping) for e in entries], "next": next_cursor})
+
+@app.post("/paciente/{documento_id}/secciones/{section}/entradas")
+async def add_section_entry(
+    documento_id: str,
+    section: str,
+    request: dict,
+    response: Response,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if user.role not in ["medico", "admisionista"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para actualizar historias clínicas")
+    _history_section(section, user, write=True)
+    content = request.get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise HTTPException(status_code=400, detail="Se requiere el texto de la entrada en content")
+
+    # Solo se inserta la entrada y se incrementa la versión: no se lee ni reescribe el historial
+    version = await db.scalar(
+        update(models.Patient)
+        .where(models.Patient.documento_id == documento_id)
+        .values(version=models.Patient.version + 1)
+        .returning(models.Patient.version)
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    entry = models.SectionEntry(documento_id=documento_id, section=section, kind=section_history.ENTRY,
+                                content=content, author=user.username, created_at=datetime.now())
+    db.add(entry)
+    await db.commit()
+    await patient_cache.invalidate(documento_id)
+
+    response.headers["ETag"] = _patient_etag(version)
+    return {"message": "Entrada añadida", "id": entry.id, "version": version}
 
 @app.post("/admission")
-def create_admission(request: dict, user=Depends(get_current_user_with_role("admisionista"))):
-    db = SessionLocal()
+async def create_admission(request: dict, user=Depends(get_current_user_with_role("admisionista")), db: AsyncSession = Depends(get_db)):
     documento_id = request.get("documento_id")
     fecha_ingreso = request.get("fecha_ingreso")
     motivo = request.get("motivo")
 
     if not documento_id or not fecha_ingreso:
         raise HTTPException(status_code=400, detail="Documento ID y fecha de ingreso son requeridos")
-
-    # Verificar si el paciente existe
-    patient = db.query(models.Patient).filter(models.Patient.documento_id == documento_id).first()
-    if not patient:
+    try:
+        fecha_ingreso = datetime.fromisoformat(fecha_ingreso)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Fecha de ingreso inválida, se espera formato ISO (AAAA-MM-DDTHH:MM)")
+
+    # Verificar si el paciente existe e incrementar su versión en la misma sentencia (sin leer las
+    # secciones clínicas); el incremento en SQL no se pierde con admisiones concurrentes
+    patient_id = await db.scalar(
+        update(models.Patient)
+        .where(models.Patient.documento_id == documento_id)
+        .values(version=models.Patient.version + 1)
+        .returning(models.Patient.id)
+    )
+    if patient_id is None:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
 
     admission = models.Admission(
@@ -298,139 +663,208 @@ def create_admission(request: dict, user=Depends(get_current_user_with_role("adm
         admisionista_id=user.id
     )
     db.add(admission)
-    db.commit()
-    db.refresh(admission)
+    await db.commit()
+    await patient_cache.invalidate(documento_id)
+    await db.refresh(admission)
 
     return {"message": "Admisión creada", "id": admission.id}
 
 @app.get("/exportar_pdf/{documento_id}")
-def exportar_pdf(documento_id: str, user=Depends(get_current_user)):
+async def exportar_pdf(documento_id: str, request: Request, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     if user.role not in ["resultados", "medico", "admisionista", "paciente"]:
         raise HTTPException(status_code=403, detail="No tienes permisos para exportar PDF")
     # Pacientes solo pueden descargar su propio PDF
     if user.role == "paciente" and documento_id != user.username:
         raise HTTPException(status_code=403, detail="Solo puedes descargar tu propio PDF")
 
-    db = SessionLocal()
-    patient = db.query(models.Patient).filter(models.Patient.documento_id == documento_id).first()
-    if not patient:
+    version = await db.scalar(select(models.Patient.version).where(models.Patient.documento_id == documento_id))
+    if version is None:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
 
-    # Obtener admisiones del paciente
-    admissions = db.query(models.Admission).filter(models.Admission.documento_id == documento_id).all()
-    admissions_text = "\n".join([f"Fecha: {a.fecha_ingreso}, Motivo: {a.motivo or 'Sin motivo'}" for a in admissions]) if admissions else "(Sin admisiones)"
-
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-    from reportlab.lib.units import inch
-    from reportlab.lib.enums import TA_LEFT, TA_CENTER
-    from io import BytesIO
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
-
-    # Estilos personalizados
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
+    # El navegador ya tiene esta versión: no se consulta ni se renderiza nada más
+    etag = pdf_etag(documento_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
 
-    section_title_style = ParagraphStyle(
-        'SectionTitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=10,
-        spaceBefore=15
+    content = get_cached(documento_id, version)
+    if content is not None:
+        size = len(content)
+    else:
+        patient = await db.scalar(select(models.Patient).where(models.Patient.documento_id == documento_id))
+        # Borrado entre la consulta de versión y la carga completa
+        if patient is None:
+            raise HTTPException(status_code=404, detail="Paciente no encontrado")
+        base = {s: getattr(patient, s) for s in models.HISTORY_SECTIONS}
+        patient = SimpleNamespace(**{**{c.key: getattr(patient, c.key) for c in models.Patient.__table__.columns},
+                                     **await section_history.load_texts(db, documento_id, base)})
+        # Obtener admisiones del paciente en orden cronológico
+        admissions = (await db.scalars(
+            select(models.Admission)
+            .where(models.Admission.documento_id == documento_id)
+            .order_by(models.Admission.fecha_ingreso, models.Admission.id)
+        )).all()
+        # reportlab es CPU puro: se renderiza fuera del event loop
+        content, size = await run_in_threadpool(render_and_cache, patient, admissions)
+        # La versión puede haber cambiado entre la consulta de versión y la carga completa
+        version = patient.version
+
+    headers["ETag"] = pdf_etag(documento_id, version)
+    headers["Content-Disposition"] = f"attachment; filename=historia_{documento_id}.pdf"
+    if isinstance(content, bytes):
+        return Response(content=content, media_type="application/pdf", headers=headers)
+
+    # PDF grande: se envía por bloques desde el fichero temporal
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(iter_file(content), media_type="application/pdf", headers=headers)
+
+@app.post("/exportar_pdf/lote")
+async def exportar_pdf_lote(request: dict, user=Depends(get_current_user)):
+    if user.role not in ["resultados", "medico", "admisionista"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para exportar en lote")
+
+    documento_ids = request.get("documento_ids")
+    if not isinstance(documento_ids, list) or not documento_ids:
+        raise HTTPException(status_code=400, detail="Se requiere una lista documento_ids")
+    # Eliminar duplicados conservando el orden
+    documento_ids = list(dict.fromkeys(str(d) for d in documento_ids))
+    if len(documento_ids) > pdf_batch.PDF_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Máximo {pdf_batch.PDF_BATCH_MAX_IDS} documentos por lote")
+
+    job = pdf_batch.BatchJob(user.username, documento_ids)
+    pdf_batch.jobs.set(job.id, job)
+    logger.info(f"Lote PDF {job.id} iniciado por {user.username} con {job.total} documentos")
+
+    # El ZIP se envía a medida que cada PDF termina; el progreso se consulta con X-Job-Id
+    return StreamingResponse(
+        pdf_batch.stream_zip(job),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=historias_{job.id}.zip",
+            "X-Job-Id": job.id,
+        },
     )
 
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=8
-    )
+@app.get("/exportar_pdf/lote/{job_id}")
+async def exportar_pdf_lote_progreso(job_id: str, user=Depends(get_current_user)):
+    job = pdf_batch.jobs.get(job_id)
+    if job is None or job.owner != user.username:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return job.progress()
 
-    story = []
-
-    # Título principal
-    story.append(Paragraph("Historia Clínica Electrónica", title_style))
-    story.append(Spacer(1, 0.3*inch))
-
-    # Información del paciente
-    story.append(Paragraph(f"<b>Documento:</b> {patient.documento_id}", normal_style))
-    story.append(Paragraph(f"<b>Nombre:</b> {patient.nombre} {patient.apellido}", normal_style))
-    story.append(Paragraph(f"<b>Fecha de Nacimiento:</b> {patient.fecha_nacimiento}", normal_style))
-    story.append(Paragraph(f"<b>Fecha de Creación:</b> {patient.fecha_creacion}", normal_style))
-    story.append(Spacer(1, 0.3*inch))
-
-    sections = [
-        ("Admisiones", admissions_text),
-        ("Antecedentes de Interés", patient.antecedentes_interes),
-        ("Anamnesis y Exploración", patient.anamnesis_exploracion),
-        ("Evolución Clínica", patient.evolucion_clinica),
-        ("Órdenes Médicas", patient.ordenes_medicas),
-        ("Tratamiento Farmacológico", patient.tratamiento_farmacologico),
-        ("Planificación de Cuidados", patient.planificacion_cuidados),
-        ("Constantes y Datos Básicos", patient.constantes_datos_basicos),
-        ("Interconsulta", patient.interconsulta),
-        ("Exploraciones Complementarias", patient.exploraciones_complementarias),
-        ("Consentimientos Informados", patient.consentimientos_informados),
-        ("Información de Alta", patient.informacion_alta),
-        ("Otra Información Clínica", patient.otra_informacion_clinica),
-        ("Información de Anestesia", patient.informacion_anestesia),
-        ("Información Quirúrgica", patient.informacion_quirurgica),
-        ("Información de Urgencia", patient.informacion_urgencia),
-        ("Información del Parto", patient.informacion_parto),
-        ("Información de Anatomía Patológica", patient.informacion_anatomia_patologica),
-        ("Datos Sociales", patient.datos_sociales),
-        ("Notas del Médico", patient.notas_medico)
-    ]
+@app.post("/pacientes/importar")
+async def importar_pacientes(archivo: UploadFile = File(...), user=Depends(get_current_user_with_role("admisionista"))):
+    name = (archivo.filename or "").lower()
+    fmt = "ndjson" if name.endswith((".ndjson", ".jsonl")) or archivo.content_type == "application/x-ndjson" else "csv"
 
-    for title, text in sections:
-        story.append(Paragraph(title, section_title_style))
+    # Se copia a disco por bloques: la memoria no depende del tamaño del fichero
+    fd, path = tempfile.mkstemp(prefix="importacion_", suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await archivo.read(1024 * 1024):
+                await run_in_threadpool(f.write, chunk)
+    except Exception:
+        os.remove(path)
+        raise
+
+    job = bulk_import.ImportJob(user.username, path, fmt)
+    bulk_import.start_import(job)
+    logger.info(f"Importación {job.id} iniciada por {user.username} ({fmt})")
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/pacientes/importar/{job_id}")
+async def importar_pacientes_progreso(job_id: str, user=Depends(get_current_user_with_role("admisionista"))):
+    job = bulk_import.jobs.get(job_id)
+    if job is None or job.owner != user.username:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return job.progress()
+
+@app.get("/pacientes/importar/{job_id}/errores")
+async def importar_pacientes_errores(job_id: str, user=Depends(get_current_user_with_role("admisionista"))):
+    job = bulk_import.jobs.get(job_id)
+    if job is None or job.owner != user.username or not os.path.exists(job.errors_path):
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return FileResponse(job.errors_path, media_type="text/csv", filename=f"importacion_{job.id}_errores.csv")
+
+@app.get("/health/live")
+async def health_live():
+    # Solo que el proceso responde: un fallo de la base de datos no debe reiniciar los pods
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def health_ready(db: AsyncSession = Depends(get_db)):
+    # Recibe tráfico cuando el arranque terminó y la base de datos responde con el esquema creado
+    if not app.state.ready:
+        raise HTTPException(status_code=503, detail="La aplicación está arrancando o deteniéndose")
+    try:
+        await db.execute(select(models.User.id).limit(1))
+    except Exception as e:
+        logger.warning(f"Readiness: base de datos no disponible: {e}")
+        raise HTTPException(status_code=503, detail="Base de datos no disponible")
+    return {"status": "ok"}
 
-        if text and text.strip():
-            # Procesar el texto para manejar saltos de línea
-            formatted_text = text.replace('\n', '<br/>')
-            story.append(Paragraph(formatted_text, normal_style))
-        else:
-            story.append(Paragraph("<i>(Sin información)</i>", normal_style))
+@app.get("/metrics")
+async def metrics():
+    content, media_type = render_latest()
+    return Response(content=content, media_type=media_type)
 
-    doc.build(story)
-    buffer.seek(0)
+@app.get("/metrics/pool")
+async def metrics_pool():
+    return pool_stats()
 
-    from fastapi.responses import Response
-    return Response(content=buffer.getvalue(), media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=historia_{documento_id}.pdf"})
+@app.get("/metrics/audit")
+async def metrics_audit():
+    return audit_writer.stats()
 
 @app.get("/perfil")
-def perfil(user=Depends(get_current_user)):
+async def perfil(user=Depends(get_current_user)):
     return {"username": user.username, "role": user.role}
 
-@app.get("/login_logs")
-def get_login_logs(user=Depends(get_current_user_with_role("admisionista")), limit: int = 50):
-    db = SessionLocal()
-    try:
-        logs = db.query(models.LoginLog).order_by(models.LoginLog.timestamp.desc()).limit(limit).all()
-        return [
-            {
-                "id": log.id,
-                "username": log.username,
-                "role": log.role,
-                "timestamp": log.timestamp,
-                "ip_address": log.ip_address
-            }
-            for log in logs
-        ]
-    finally:
-        db.close()
+@app.get("/login_logs", response_model=models.LoginLogPage)
+async def get_login_logs(
+    user=Depends(get_current_user_with_role("admisionista")),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    username: Optional[str] = None,
+    role: Optional[str] = None,
+    ip: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db)
+):
+    limit = max(1, min(limit, 500))
+    # Más recientes primero por el índice (timestamp, id); en PostgreSQL el rango de fechas descarta particiones
+    query = select(models.LoginLog).order_by(models.LoginLog.timestamp.desc(), models.LoginLog.id.desc()).limit(limit)
+    if desde is not None:
+        query = query.where(models.LoginLog.timestamp >= datetime.combine(desde, datetime.min.time()))
+    if hasta is not None:
+        query = query.where(models.LoginLog.timestamp < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+    if username is not None:
+        query = query.where(models.LoginLog.username == username)
+    if role is not None:
+        query = query.where(models.LoginLog.role == role)
+    if ip is not None:
+        query = query.where(models.LoginLog.ip_address == ip)
+    if cursor is not None:
+        timestamp, log_id = _decode_cursor(cursor)
+        query = query.where(tuple_(models.LoginLog.timestamp, models.LoginLog.id) < tuple_(timestamp, log_id))
+
+    logs = (await db.scalars(query)).all()
+    items = [
+        {
+            "id": log.id,
+            "username": log.username,
+            "role": log.role,
+            "timestamp": log.timestamp,
+            "ip_address": log.ip_address
+        }
+        for log in logs
+    ]
+    next_cursor = _encode_cursor(logs[-1].timestamp, logs[-1].id) if len(logs) == limit else None
+    return model_response(models.LoginLogPage, {"items": items, "next": next_cursor})
 
 @app.post("/users")
-def create_user(
+async def create_user(
     documento_id: str = Form(...),
     nombre: str = Form(...),
     apellido: str = Form(...),
@@ -454,16 +888,16 @@ def create_user(
     informacion_anatomia_patologica: str = Form(""),
     datos_sociales: str = Form(""),
     role: str = Form(...),
-    user=Depends(get_current_user_with_role("admisionista"))
+    user=Depends(get_current_user_with_role("admisionista")),
+    db: AsyncSession = Depends(get_db)
 ):
-    db = SessionLocal()
     try:
         # Validar que documento_id sea numérico
         if not documento_id.isdigit():
             raise HTTPException(status_code=400, detail="Documento ID debe ser numérico")
 
         # Verificar si paciente ya existe
-        existing_patient = db.query(models.Patient).filter(models.Patient.documento_id == documento_id).first()
+        existing_patient = await db.scalar(select(models.Patient).where(models.Patient.documento_id == documento_id))
         if existing_patient:
             raise HTTPException(status_code=400, detail="No se puede crear el paciente porque ya existe un paciente con este ID")
 
@@ -472,15 +906,15 @@ def create_user(
         password = documento_id
 
         # Verificar si usuario ya existe
-        existing_user = db.query(models.User).filter(models.User.username == username).first()
+        existing_user = await db.scalar(select(models.User).where(models.User.username == username))
         if existing_user:
             raise HTTPException(status_code=400, detail="Usuario ya existe")
 
-        hashed_password = get_password_hash(password)
+        hashed_password = await hash_password_async(password)
         new_user = models.User(username=username, hashed_password=hashed_password, role=role)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         # Si es paciente, crear también el paciente con todos los campos
         if role == "paciente":
@@ -510,12 +944,18 @@ def create_user(
                 datos_sociales=datos_sociales
             )
             db.add(new_patient)
-            db.commit()
+            await db.flush()
+            await search.index_patients_async(db, [{
+                "documento_id": documento_id, **{s: getattr(new_patient, s) for s in models.PATIENT_SECTIONS},
+            }])
+            await db.commit()
+            await patient_cache.invalidate(documento_id)
 
         message = "Paciente creado correctamente" if role == "paciente" else "Usuario creado exitosamente"
         return {"message": message, "username": username, "role": role, "password": password}
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        db.close()
@@ -0,0 +1,186 @@
+# app/metrics.py
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Peticiones más lentas que esto (segundos) se registran con el SQL ejecutado (0 = desactivado)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+# Sentencias SQL guardadas por petición para el log de peticiones lentas
+SLOW_REQUEST_MAX_STATEMENTS = 50
+# Con varios workers (app/serve.py) cada proceso escribe sus métricas en este directorio y /metrics las suma
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Cada cuánto escribe cada worker sus gauges de ocupación en modo multiproceso
+GAUGE_REFRESH_SECONDS = 5
+# Scrapes y sondas de Kubernetes: no son tráfico de usuarios
+NOT_MEASURED_ROUTES = {"/metrics", "/health/live", "/health/ready"}
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Consultas SQL por petición", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Tiempo total en consultas SQL por petición", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Duración de cada consulta SQL",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5),
+)
+PDF_RENDER_SECONDS = Histogram(
+    "pdf_render_seconds", "Tiempo de generación de un PDF de historia clínica",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds", "Tiempo de hash/verificación de contraseñas, incluida la espera en el pool",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Peticiones por encima de SLOW_REQUEST_SECONDS", ["route"])
+PATIENT_CACHE_REQUESTS = Counter("patient_cache_requests_total", "Lecturas de la caché de pacientes", ["result"])
+PATIENT_CACHE_INVALIDATIONS = Counter("patient_cache_invalidations_total", "Invalidaciones de la caché de pacientes")
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if SLOW_REQUEST_SECONDS else None
+
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    # El threadpool y el motor asíncrono copian el contexto: las consultas se asignan a su petición
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if stats.statements is not None and len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+        stats.statements.append(f"{elapsed * 1000:.1f} ms  {' '.join(statement.split())[:500]}")
+
+
+def _handle_error(context):
+    # La consulta falló: after_cursor_execute no se llama
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class _SaturationCollector:
+    # Estado de los pools leído en cada scrape
+    def __init__(self, sources):
+        self.sources = sources
+
+    def collect(self):
+        for name, help_text, read in self.sources:
+            metric = GaugeMetricFamily(name, help_text)
+            value = read()
+            if value is not None:
+                metric.add_metric([], value)
+            yield metric
+
+
+def _refresh_gauges(gauges):
+    while True:
+        for name, gauge, read in gauges:
+            try:
+                value = read()
+            except Exception:
+                logger.exception(f"Error leyendo la métrica {name}")
+                continue
+            if value is not None:
+                gauge.set(value)
+        time.sleep(GAUGE_REFRESH_SECONDS)
+
+
+def register_gauges(sources):
+    # sources: [(nombre, ayuda, función sin argumentos)]
+    if not PROMETHEUS_MULTIPROC_DIR:
+        REGISTRY.register(_SaturationCollector(sources))
+        return
+    # El scrape lo atiende un solo worker: cada proceso publica sus valores periódicamente (etiqueta pid)
+    gauges = [(name, Gauge(name, help_text, multiprocess_mode="liveall"), read) for name, help_text, read in sources]
+    threading.Thread(target=_refresh_gauges, args=(gauges,), name="metrics-gauges", daemon=True).start()
+
+
+def mark_process_dead():
+    # Al parar el worker: sus gauges dejan de exportarse
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    # Middleware ASGI: mide hasta el último byte, también en respuestas en streaming
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            self._observe(scope, status["code"], time.perf_counter() - start, stats)
+
+    def _observe(self, scope, status, elapsed, stats):
+        # Plantilla de la ruta (/paciente/{documento_id}), no la URL: cardinalidad acotada
+        route = getattr(scope.get("route"), "path", "sin_ruta")
+        if route in NOT_MEASURED_ROUTES:
+            return
+        REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(elapsed)
+        REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+        REQUEST_DB_SECONDS.labels(route).observe(stats.db_seconds)
+        if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+            SLOW_REQUESTS.labels(route).inc()
+            logger.warning(
+                f"Petición lenta: {scope['method']} {scope['path']} {status} en {elapsed * 1000:.0f} ms, "
+                f"{stats.queries} consultas ({stats.db_seconds * 1000:.0f} ms en SQL)"
+                + "".join(f"\n  {statement}" for statement in stats.statements)
+            )
+
+
+def render_latest():
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
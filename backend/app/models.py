@@ -1,5 +1,6 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String, Text
+from app.compression import CompressedText
 from app.database import Base
 
 class User(Base):
@@ -20,50 +21,114 @@ class Patient(Base):
     fecha_nacimiento = Column(String, nullable=False)  # Mandatory
     fecha_creacion = Column(String, nullable=False)  # Fecha de creación del paciente
 
-    # Clinical sections - all optional
-    antecedentes_interes = Column(Text, nullable=True)
-    anamnesis_exploracion = Column(Text, nullable=True)
-    evolucion_clinica = Column(Text, nullable=True)
-    ordenes_medicas = Column(Text, nullable=True)
-    tratamiento_farmacologico = Column(Text, nullable=True)
-    planificacion_cuidados = Column(Text, nullable=True)
-    constantes_datos_basicos = Column(Text, nullable=True)
-    interconsulta = Column(Text, nullable=True)
-    exploraciones_complementarias = Column(Text, nullable=True)
-    consentimientos_informados = Column(Text, nullable=True)
-    informacion_alta = Column(Text, nullable=True)
-    otra_informacion_clinica = Column(Text, nullable=True)
-    informacion_anestesia = Column(Text, nullable=True)
-    informacion_quirurgica = Column(Text, nullable=True)
-    informacion_urgencia = Column(Text, nullable=True)
-    informacion_parto = Column(Text, nullable=True)
-    informacion_anatomia_patologica = Column(Text, nullable=True)
+    # Clinical sections - all optional. Comprimidas en la base de datos (app/compression.py)
+    antecedentes_interes = Column(CompressedText, nullable=True)
+    anamnesis_exploracion = Column(CompressedText, nullable=True)
+    evolucion_clinica = Column(CompressedText, nullable=True)
+    ordenes_medicas = Column(CompressedText, nullable=True)
+    tratamiento_farmacologico = Column(CompressedText, nullable=True)
+    planificacion_cuidados = Column(CompressedText, nullable=True)
+    constantes_datos_basicos = Column(CompressedText, nullable=True)
+    interconsulta = Column(CompressedText, nullable=True)
+    exploraciones_complementarias = Column(CompressedText, nullable=True)
+    consentimientos_informados = Column(CompressedText, nullable=True)
+    informacion_alta = Column(CompressedText, nullable=True)
+    otra_informacion_clinica = Column(CompressedText, nullable=True)
+    informacion_anestesia = Column(CompressedText, nullable=True)
+    informacion_quirurgica = Column(CompressedText, nullable=True)
+    informacion_urgencia = Column(CompressedText, nullable=True)
+    informacion_parto = Column(CompressedText, nullable=True)
+    informacion_anatomia_patologica = Column(CompressedText, nullable=True)
 
     # Social data
-    datos_sociales = Column(Text, nullable=True)
+    datos_sociales = Column(CompressedText, nullable=True)
 
     # Notas del médico
-    notas_medico = Column(Text, nullable=True)
+    notas_medico = Column(CompressedText, nullable=True)
+
+    # Versión del contenido (historia + admisiones), se incrementa en cada cambio
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # documento_id forma parte de la identidad en el ORM: los UPDATE llevan la clave de
+    # distribución de Citus y se enrutan a un único shard
+    __mapper_args__ = {"primary_key": [id, documento_id]}
+
+# Columnas de Patient por grupo, en el orden en que las devuelve la API
+PATIENT_DEMOGRAPHICS = ["documento_id", "nombre", "apellido", "fecha_nacimiento", "fecha_creacion"]
+PATIENT_SECTIONS = [
+    "antecedentes_interes", "anamnesis_exploracion", "evolucion_clinica", "ordenes_medicas",
+    "tratamiento_farmacologico", "planificacion_cuidados", "constantes_datos_basicos", "interconsulta",
+    "exploraciones_complementarias", "consentimientos_informados", "informacion_alta",
+    "otra_informacion_clinica", "informacion_anestesia", "informacion_quirurgica", "informacion_urgencia",
+    "informacion_parto", "informacion_anatomia_patologica", "datos_sociales", "notas_medico",
+]
+
+# Secciones que crecen con cada visita: se guardan como entradas en section_entries en lugar de
+# reescribir la columna; la columna de Patient queda como texto base (alta o datos anteriores)
+HISTORY_SECTIONS = ["evolucion_clinica", "notas_medico"]
 
 class Admission(Base):
     __tablename__ = "admissions"
+    __table_args__ = (
+        # Paginación por cursor (documento_id, fecha_ingreso, id); también cubre los filtros por documento_id
+        Index("ix_admissions_documento_fecha_id", "documento_id", "fecha_ingreso", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    documento_id = Column(String, index=True, nullable=False)
-    fecha_ingreso = Column(String, nullable=False)
+    documento_id = Column(String, nullable=False)
+    fecha_ingreso = Column(DateTime, nullable=False)
     motivo = Column(Text, nullable=True)
     admisionista_id = Column(Integer, nullable=False)  # ID del admisionista que lo creó
 
+    __mapper_args__ = {"primary_key": [id, documento_id]}
+
+class SectionEntry(Base):
+    # Historial de solo inserción de las secciones de HISTORY_SECTIONS (app/section_history.py)
+    __tablename__ = "section_entries"
+    __table_args__ = (
+        # Últimas N entradas o rango de fechas de una sección, y montaje del texto completo en orden
+        Index("ix_section_entries_documento_section_fecha", "documento_id", "section", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    documento_id = Column(String, nullable=False)
+    section = Column(String, nullable=False)
+    # "entrada" (nota con autor), "anexo" (texto añadido al final) o "reemplazo" (texto completo nuevo)
+    kind = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    author = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
+    __mapper_args__ = {"primary_key": [id, documento_id]}
+
+class CompressionDictionary(Base):
+    # Diccionarios de compresión de las secciones clínicas; se conservan todos para poder leer lo ya escrito
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
 class LoginLog(Base):
     __tablename__ = "login_logs"
+    __table_args__ = (
+        # Listado por cursor (timestamp, id) y filtros por usuario o IP dentro de un rango de fechas.
+        # En PostgreSQL la tabla se particiona por mes (app/login_logs.py)
+        Index("ix_login_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_login_logs_username_timestamp", "username", "timestamp"),
+        Index("ix_login_logs_ip_timestamp", "ip_address", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, nullable=False)
     role = Column(String, nullable=False)
-    timestamp = Column(String, nullable=False)  # ISO format
+    timestamp = Column(DateTime, nullable=False)
     ip_address = Column(String, nullable=True)
 
 # Pydantic models for API
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class PatientUpdate(BaseModel):
@@ -85,3 +150,89 @@ class PatientUpdate(BaseModel):
     informacion_parto: str = ""
     informacion_anatomia_patologica: str = ""
     datos_sociales: str = ""
+
+# Respuestas de la API: cada ruta valida lo que devuelve contra su modelo (model_response en app/responses.py)
+class AdmissionSummary(BaseModel):
+    id: int
+    fecha_ingreso: datetime
+    motivo: Optional[str] = None
+
+class PatientRecord(BaseModel):
+    # Con fields/sections solo se incluyen los campos pedidos (documento_id y version siempre)
+    documento_id: str
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    fecha_nacimiento: Optional[str] = None
+    fecha_creacion: Optional[str] = None
+    antecedentes_interes: Optional[str] = None
+    anamnesis_exploracion: Optional[str] = None
+    evolucion_clinica: Optional[str] = None
+    ordenes_medicas: Optional[str] = None
+    tratamiento_farmacologico: Optional[str] = None
+    planificacion_cuidados: Optional[str] = None
+    constantes_datos_basicos: Optional[str] = None
+    interconsulta: Optional[str] = None
+    exploraciones_complementarias: Optional[str] = None
+    consentimientos_informados: Optional[str] = None
+    informacion_alta: Optional[str] = None
+    otra_informacion_clinica: Optional[str] = None
+    informacion_anestesia: Optional[str] = None
+    informacion_quirurgica: Optional[str] = None
+    informacion_urgencia: Optional[str] = None
+    informacion_parto: Optional[str] = None
+    informacion_anatomia_patologica: Optional[str] = None
+    datos_sociales: Optional[str] = None
+    notas_medico: Optional[str] = None
+    version: int
+    admissions_truncated: Optional[bool] = None
+    admissions: Optional[List[AdmissionSummary]] = None
+
+class AdmissionPage(BaseModel):
+    items: List[AdmissionSummary]
+    next: Optional[str] = None
+
+class PatientSummary(BaseModel):
+    documento_id: str
+    nombre: str
+    apellido: str
+    fecha_nacimiento: str
+    fecha_creacion: str
+    num_admisiones: int
+    ultima_admision: Optional[datetime] = None
+
+class PatientPage(BaseModel):
+    items: List[PatientSummary]
+    next: Optional[str] = None
+
+class SearchResult(BaseModel):
+    documento_id: str
+    nombre: str
+    apellido: str
+    fecha_nacimiento: str
+    rank: float
+
+class SearchPage(BaseModel):
+    items: List[SearchResult]
+    next: Optional[int] = None
+
+class SectionEntryOut(BaseModel):
+    id: int
+    kind: str
+    content: str
+    author: Optional[str] = None
+    created_at: datetime
+
+class SectionEntryPage(BaseModel):
+    items: List[SectionEntryOut]
+    next: Optional[str] = None
+
+class LoginLogOut(BaseModel):
+    id: int
+    username: str
+    role: str
+    timestamp: datetime
+    ip_address: Optional[str] = None
+
+class LoginLogPage(BaseModel):
+    items: List[LoginLogOut]
+    next: Optional[str] = None
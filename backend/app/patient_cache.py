@@ -0,0 +1,180 @@
+# app/patient_cache.py
+# Caché de lectura de GET /paciente: la historia completa (columnas, secciones con historial y admisiones
+# recientes) por documento_id. Se invalida después de cada commit que modifica al paciente.
+#
+#   PATIENT_CACHE_BACKEND=local   # LRU con TTL en memoria del proceso (por defecto)
+#   PATIENT_CACHE_BACKEND=redis   # compartida entre workers/réplicas, PATIENT_CACHE_URL=redis://...
+#   PATIENT_CACHE_BACKEND=off     # sin caché
+import json
+import logging
+import os
+from datetime import datetime
+
+from app.cache import TTLCache
+from app.metrics import PATIENT_CACHE_INVALIDATIONS, PATIENT_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+PATIENT_CACHE_BACKEND = os.getenv("PATIENT_CACHE_BACKEND", "local")
+PATIENT_CACHE_TTL = float(os.getenv("PATIENT_CACHE_TTL", "30"))
+PATIENT_CACHE_SIZE = int(os.getenv("PATIENT_CACHE_SIZE", "5000"))
+PATIENT_CACHE_URL = os.getenv("PATIENT_CACHE_URL", "redis://localhost:6379/0")
+PATIENT_CACHE_PREFIX = "paciente:"
+# Generación por paciente en Redis; dura más que cualquier lectura en curso
+PATIENT_CACHE_GENERATION_PREFIX = "paciente_gen:"
+PATIENT_CACHE_GENERATION_TTL = 3600
+
+# Guarda el valor solo si la generación del paciente sigue siendo la leída antes de ir a la base de datos
+_SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+  return 0
+end
+if tonumber(ARGV[3]) > 0 then
+  redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+else
+  redis.call('SET', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+
+class LocalBackend:
+    # En memoria del proceso: cada worker tiene la suya y solo ve sus propias invalidaciones
+    def __init__(self, maxsize=PATIENT_CACHE_SIZE, ttl=PATIENT_CACHE_TTL):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Una sola generación para todo el proceso: basta con que ninguna invalidación local se cuele
+        self.generation_counter = 0
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def generation(self, key):
+        return self.generation_counter
+
+    async def set(self, key, value, generation):
+        if generation == self.generation_counter:
+            self.cache.set(key, value)
+
+    async def delete(self, key):
+        self.generation_counter += 1
+        self.cache.pop(key)
+
+    async def clear(self):
+        self.generation_counter += 1
+        self.cache.clear()
+
+    def size(self):
+        return len(self.cache)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+class RedisBackend:
+    # Compartida: una invalidación en un worker vale para todos. Los valores viajan como JSON
+    # (las fechas llegan como texto ISO, igual que en la respuesta). La generación de cada paciente
+    # también vive en Redis: un worker no puede guardar lo que leyó antes de que otro lo invalidara
+    def __init__(self, url=PATIENT_CACHE_URL, ttl=PATIENT_CACHE_TTL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("PATIENT_CACHE_BACKEND=redis requiere el paquete redis (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.set_if_generation = self.client.register_script(_SET_IF_GENERATION)
+
+    async def get(self, key):
+        value = await self.client.get(PATIENT_CACHE_PREFIX + key)
+        return json.loads(value) if value is not None else None
+
+    async def generation(self, key):
+        return int(await self.client.get(PATIENT_CACHE_GENERATION_PREFIX + key) or 0)
+
+    async def set(self, key, value, generation):
+        await self.set_if_generation(
+            keys=[PATIENT_CACHE_GENERATION_PREFIX + key, PATIENT_CACHE_PREFIX + key],
+            args=[generation, json.dumps(value, default=_json_default), int(self.ttl)],
+        )
+
+    async def delete(self, key):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(PATIENT_CACHE_GENERATION_PREFIX + key)
+            pipe.expire(PATIENT_CACHE_GENERATION_PREFIX + key, PATIENT_CACHE_GENERATION_TTL)
+            pipe.delete(PATIENT_CACHE_PREFIX + key)
+            await pipe.execute()
+
+    async def clear(self):
+        async for key in self.client.scan_iter(f"{PATIENT_CACHE_PREFIX}*"):
+            await self.client.delete(key)
+
+    def size(self):
+        return None
+
+
+class PatientCache:
+    # Cada invalidación incrementa la generación del paciente: una lectura que empezó antes de un
+    # commit no guarda datos viejos
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def get(self, documento_id):
+        if self.backend is None:
+            return None
+        try:
+            value = await self.backend.get(documento_id)
+        except Exception:
+            # La caché es prescindible: si el backend falla se lee de la base de datos
+            logger.exception("Caché de pacientes no disponible")
+            value = None
+        PATIENT_CACHE_REQUESTS.labels("hit" if value is not None else "miss").inc()
+        return value
+
+    async def generation(self, documento_id):
+        # None si no hay caché o no responde: entonces no se guarda lo leído
+        if self.backend is None:
+            return None
+        try:
+            return await self.backend.generation(documento_id)
+        except Exception:
+            logger.exception("Caché de pacientes no disponible")
+            return None
+
+    async def set(self, documento_id, value, generation):
+        if self.backend is None or generation is None:
+            return
+        try:
+            await self.backend.set(documento_id, value, generation)
+        except Exception:
+            logger.exception("Caché de pacientes no disponible")
+
+    async def invalidate(self, documento_id):
+        if self.backend is None:
+            return
+        PATIENT_CACHE_INVALIDATIONS.inc()
+        try:
+            await self.backend.delete(documento_id)
+        except Exception:
+            logger.exception(f"No se pudo invalidar la caché del paciente {documento_id}")
+
+    async def clear(self):
+        if self.backend is not None:
+            await self.backend.clear()
+
+    def size(self):
+        return self.backend.size() if self.backend is not None else None
+
+
+def _create_backend(name):
+    if name == "local":
+        return LocalBackend()
+    if name == "redis":
+        return RedisBackend()
+    if name == "off":
+        return None
+    raise ValueError(f"PATIENT_CACHE_BACKEND desconocido: {name}")
+
+
+patient_cache = PatientCache(_create_backend(PATIENT_CACHE_BACKEND))
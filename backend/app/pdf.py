@@ -0,0 +1,180 @@
+# app/pdf.py
+import os
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from types import SimpleNamespace
+
+from app.cache import TTLCache
+from app.metrics import PDF_RENDER_SECONDS
+
+# Cambiar si se modifica el diseño del PDF, para invalidar ETags emitidos antes
+PDF_LAYOUT_VERSION = "2"
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_CACHE_MAX_ITEMS = int(os.getenv("PDF_CACHE_MAX_ITEMS", "512"))
+# PDFs mayores que esto se vuelcan a un fichero temporal y se envían por bloques sin cachear
+PDF_SPOOL_MAX_MEMORY = int(os.getenv("PDF_SPOOL_MAX_MEMORY", str(4 * 1024 * 1024)))
+PDF_STREAM_CHUNK = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def _styles():
+    # reportlab se importa con el primer PDF, no al arrancar: la mayoría de workers nunca generan uno.
+    # Los estilos se compilan una sola vez por proceso
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    normal = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=8
+    )
+    return SimpleNamespace(
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            spaceAfter=20,
+            alignment=TA_CENTER
+        ),
+        section_title=ParagraphStyle(
+            'SectionTitle',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=10,
+            spaceBefore=15
+        ),
+        normal=normal,
+        # Una línea de una sección; el espacio final se añade tras la última línea
+        line=ParagraphStyle(
+            'SectionLine',
+            parent=normal,
+            spaceAfter=0
+        ),
+    )
+
+
+# (título, columna de Patient) en el orden en que aparecen en el PDF
+SECTIONS = [
+    ("Antecedentes de Interés", "antecedentes_interes"),
+    ("Anamnesis y Exploración", "anamnesis_exploracion"),
+    ("Evolución Clínica", "evolucion_clinica"),
+    ("Órdenes Médicas", "ordenes_medicas"),
+    ("Tratamiento Farmacológico", "tratamiento_farmacologico"),
+    ("Planificación de Cuidados", "planificacion_cuidados"),
+    ("Constantes y Datos Básicos", "constantes_datos_basicos"),
+    ("Interconsulta", "interconsulta"),
+    ("Exploraciones Complementarias", "exploraciones_complementarias"),
+    ("Consentimientos Informados", "consentimientos_informados"),
+    ("Información de Alta", "informacion_alta"),
+    ("Otra Información Clínica", "otra_informacion_clinica"),
+    ("Información de Anestesia", "informacion_anestesia"),
+    ("Información Quirúrgica", "informacion_quirurgica"),
+    ("Información de Urgencia", "informacion_urgencia"),
+    ("Información del Parto", "informacion_parto"),
+    ("Información de Anatomía Patológica", "informacion_anatomia_patologica"),
+    ("Datos Sociales", "datos_sociales"),
+    ("Notas del Médico", "notas_medico"),
+]
+
+pdf_cache = TTLCache(maxsize=PDF_CACHE_MAX_ITEMS, ttl=None, maxweight=PDF_CACHE_MAX_BYTES)
+
+
+def pdf_etag(documento_id, version):
+    return f'"{documento_id}-{version}-{PDF_LAYOUT_VERSION}"'
+
+
+def build_story(patient, admissions):
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _styles()
+    title_style, section_title_style = styles.title, styles.section_title
+    normal_style, line_style = styles.normal, styles.line
+    admissions_text = "\n".join([f"Fecha: {a.fecha_ingreso}, Motivo: {a.motivo or 'Sin motivo'}" for a in admissions]) if admissions else "(Sin admisiones)"
+
+    story = []
+
+    # Título principal
+    story.append(Paragraph("Historia Clínica Electrónica", title_style))
+    story.append(Spacer(1, 0.3*inch))
+
+    # Información del paciente
+    story.append(Paragraph(f"<b>Documento:</b> {patient.documento_id}", normal_style))
+    story.append(Paragraph(f"<b>Nombre:</b> {patient.nombre} {patient.apellido}", normal_style))
+    story.append(Paragraph(f"<b>Fecha de Nacimiento:</b> {patient.fecha_nacimiento}", normal_style))
+    story.append(Paragraph(f"<b>Fecha de Creación:</b> {patient.fecha_creacion}", normal_style))
+    story.append(Spacer(1, 0.3*inch))
+
+    sections = [("Admisiones", admissions_text)] + [(title, getattr(patient, column)) for title, column in SECTIONS]
+
+    for title, text in sections:
+        story.append(Paragraph(title, section_title_style))
+
+        if text and text.strip():
+            # Un párrafo por línea: un único Paragraph gigante con <br/> tiene coste cuadrático
+            for line in text.split('\n'):
+                if line.strip():
+                    story.append(Paragraph(line, line_style))
+                else:
+                    story.append(Spacer(1, line_style.leading))
+            story.append(Spacer(1, normal_style.spaceAfter))
+        else:
+            story.append(Paragraph("<i>(Sin información)</i>", normal_style))
+
+    return story
+
+
+def render_historia_to(fileobj, patient, admissions):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+
+    with PDF_RENDER_SECONDS.time():
+        doc = SimpleDocTemplate(fileobj, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        doc.build(build_story(patient, admissions))
+
+
+def render_historia(patient, admissions):
+    buffer = BytesIO()
+    render_historia_to(buffer, patient, admissions)
+    return buffer.getvalue()
+
+
+def render_spooled(patient, admissions):
+    # Devuelve (fichero posicionado al inicio, tamaño); pasa a disco por encima del umbral
+    spool = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MEMORY)
+    try:
+        render_historia_to(spool, patient, admissions)
+    except Exception:
+        spool.close()
+        raise
+    size = spool.tell()
+    spool.seek(0)
+    return spool, size
+
+
+def iter_file(fileobj, chunk_size=PDF_STREAM_CHUNK):
+    try:
+        while chunk := fileobj.read(chunk_size):
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def get_cached(documento_id, version):
+    return pdf_cache.get((documento_id, version))
+
+
+def render_and_cache(patient, admissions):
+    # Devuelve (bytes, tamaño) para PDFs pequeños, que quedan cacheados, o (fichero temporal, tamaño)
+    spool, size = render_spooled(patient, admissions)
+    if size > PDF_SPOOL_MAX_MEMORY:
+        return spool, size
+
+    with spool:
+        content = spool.read()
+    pdf_cache.set((patient.documento_id, patient.version), content)
+    return content, size
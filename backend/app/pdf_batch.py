@@ -0,0 +1,189 @@
+# app/pdf_batch.py
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from types import SimpleNamespace
+
+from app.database import SessionLocal
+from app.jobs import JobStore
+from app.pdf import SECTIONS, pdf_cache, render_historia
+from app import section_history
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_BATCH_MAX_IDS = int(os.getenv("PDF_BATCH_MAX_IDS", "5000"))
+# Documentos cargados de la base de datos por consulta
+PDF_BATCH_CHUNK = 50
+
+PATIENT_FIELDS = ["documento_id", "nombre", "apellido", "fecha_nacimiento", "fecha_creacion", "version"] + [column for _, column in SECTIONS]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+jobs = JobStore("lote_pdf", maxsize=1000, ttl=3600)
+
+
+class BatchJob:
+    def __init__(self, owner, documento_ids):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.documento_ids = documento_ids
+        self.total = len(documento_ids)
+        self.done = 0
+        self.errors = {}
+        self.status = "pendiente"
+        self.started_at = None
+        self.finished_at = None
+
+    def progress(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "failed": len(self.errors),
+            "elapsed_seconds": round(elapsed, 2),
+        }
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+                logger.info(f"Pool de PDF iniciado con {PDF_WORKERS} procesos")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _render_from_dict(data):
+    # Se ejecuta en el proceso worker: solo recibe datos planos serializables
+    patient = SimpleNamespace(**data["patient"])
+    admissions = [SimpleNamespace(**a) for a in data["admissions"]]
+    return render_historia(patient, admissions)
+
+
+def _load_chunk(db, documento_ids):
+    patients = db.query(models.Patient).filter(models.Patient.documento_id.in_(documento_ids)).all()
+    admissions = (
+        db.query(models.Admission)
+        .filter(models.Admission.documento_id.in_(documento_ids))
+        .order_by(models.Admission.documento_id, models.Admission.fecha_ingreso, models.Admission.id)
+        .all()
+    )
+
+    by_patient = {}
+    for a in admissions:
+        by_patient.setdefault(a.documento_id, []).append({"fecha_ingreso": a.fecha_ingreso, "motivo": a.motivo})
+
+    loaded = {
+        p.documento_id: {
+            "patient": {field: getattr(p, field) for field in PATIENT_FIELDS},
+            "admissions": by_patient.get(p.documento_id, []),
+        }
+        for p in patients
+    }
+    # Texto completo de las secciones con historial (columna base + entradas), en una consulta por bloque
+    texts = section_history.load_texts_many(db, {d: data["patient"] for d, data in loaded.items()})
+    for (documento_id, section), text in texts.items():
+        loaded[documento_id]["patient"][section] = text
+    return loaded
+
+
+class _ZipSink(io.RawIOBase):
+    # Destino no buscable: zipfile escribe descriptores de datos y podemos vaciarlo por partes
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        # Generador con 0 o 1 bloque, para no enviar trozos vacíos
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def stream_zip(job):
+    job.status = "en_progreso"
+    job.started_at = time.time()
+    jobs.publish(job, force=True)
+    sink = _ZipSink()
+    executor = get_executor()
+    max_in_flight = PDF_WORKERS * 2
+    pending = {}
+    queue = list(job.documento_ids)
+
+    def add(zf, documento_id, content):
+        zf.writestr(f"historia_{documento_id}.pdf", content)
+        job.done += 1
+        jobs.publish(job)
+
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf, SessionLocal() as db:
+            while queue or pending:
+                # Alimentar el pool por bloques para no cargar todo el lote en memoria
+                if queue and len(pending) < max_in_flight:
+                    chunk, queue = queue[:PDF_BATCH_CHUNK], queue[PDF_BATCH_CHUNK:]
+                    loaded = _load_chunk(db, chunk)
+                    db.expunge_all()
+                    for documento_id in chunk:
+                        data = loaded.get(documento_id)
+                        if data is None:
+                            job.errors[documento_id] = "Paciente no encontrado"
+                            continue
+                        cached = pdf_cache.get((documento_id, data["patient"]["version"]))
+                        if cached is not None:
+                            add(zf, documento_id, cached)
+                        else:
+                            pending[executor.submit(_render_from_dict, data)] = documento_id
+                    yield from sink.drain()
+                    continue
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    documento_id = pending.pop(future)
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        logger.exception(f"Error renderizando PDF de {documento_id} en lote")
+                        job.errors[documento_id] = str(e)
+                        continue
+                    add(zf, documento_id, content)
+                yield from sink.drain()
+
+            if job.errors:
+                zf.writestr("errores.txt", "\n".join(f"{doc}: {msg}" for doc, msg in job.errors.items()))
+        yield from sink.drain()
+        job.status = "completado"
+    except BaseException:
+        job.status = "cancelado"
+        for future in pending:
+            future.cancel()
+        raise
+    finally:
+        job.finished_at = time.time()
+        jobs.publish(job, force=True)
+        logger.info(f"Lote PDF {job.id}: {job.done}/{job.total} generados, {len(job.errors)} errores")
@@ -0,0 +1,162 @@
+# app/responses.py
+# Serialización JSON con orjson y compresión de las respuestas (brotli o gzip según Accept-Encoding).
+# Las historias clínicas son texto muy repetitivo: comprimidas ocupan una fracción de lo que pesan en JSON.
+import gzip
+import os
+import zlib
+
+import orjson
+from anyio import to_thread
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Respuestas más pequeñas se envían sin comprimir: la cabecera y la CPU no compensan
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# A partir de este tamaño se comprime en el threadpool para no bloquear el event loop
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", str(256 * 1024)))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+class ORJSONResponse(JSONResponse):
+    # Sin jsonable_encoder: orjson serializa directamente dict, list, str, datetime y date
+    def render(self, content):
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match: "*" o una lista de ETags separados por comas; la comparación es débil (W/"x" == "x")
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def model_response(model, data, headers=None, exclude_unset=False):
+    # Valida data contra el modelo tipado de la ruta y lo serializa con orjson. Las rutas devuelven la
+    # respuesta ya hecha (para añadir cabeceras como ETag): FastAPI no aplicaría su response_model
+    content = model.model_validate(data).model_dump(exclude_unset=exclude_unset)
+    return ORJSONResponse(content, headers=headers)
+
+
+def accepted_encoding(accept_encoding, available=None):
+    # La primera de available (por defecto br y gzip) que acepte el cliente; se respeta q=0 ("gzip;q=0")
+    if available is None:
+        available = ("br", "gzip") if brotli is not None else ("gzip",)
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    for encoding in available:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _compressor(encoding):
+    # Para respuestas en streaming: se comprime cada fragmento a medida que llega
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+async def _run(function, *args, size):
+    if size >= COMPRESSION_THREAD_MIN_SIZE:
+        return await to_thread.run_sync(function, *args)
+    return function(*args)
+
+
+class CompressionMiddleware:
+    # Middleware ASGI: comprime JSON y texto a partir de COMPRESSION_MIN_SIZE; PDFs y ZIPs ya van comprimidos
+    def __init__(self, app, minimum_size=None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        state = {"start": None, "compress": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer fragmento del cuerpo (tamaño y si hay más)
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["start"] is None:
+                await send(message)
+                return
+
+            start, state["start"] = state["start"], None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            compressible = (
+                start["status"] not in (204, 206, 304)
+                and "content-encoding" not in headers
+                and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if not compressible or encoding is None or (not more_body and len(body) < self.minimum_size):
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            # Otra representación del mismo contenido: ETag débil, como hace nginx
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if not more_body:
+                body = await _run(compress, body, encoding, size=len(body))
+                headers["Content-Length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            del headers["Content-Length"]
+            state["compress"] = _compressor(encoding)
+            await send(start)
+            await send_chunk(message)
+
+        async def send_chunk(message):
+            process, finish = state["compress"]
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            data = await _run(process, body, size=len(body)) if body else b""
+            if not more_body:
+                data += finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        async def send_compressed(message):
+            if state["compress"] is not None and message["type"] == "http.response.body":
+                await send_chunk(message)
+            else:
+                await send_wrapper(message)
+
+        await self.app(scope, receive, send_compressed)
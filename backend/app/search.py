@@ -0,0 +1,288 @@
+# app/search.py
+import logging
+import os
+import re
+
+from sqlalchemy import func, literal_column, select, text, union_all
+
+from app.database import engine
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+# Configuración de texto de PostgreSQL (stemming en español por defecto)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "spanish")
+# Los resultados se ordenan por relevancia: no tiene sentido paginar más allá de esto
+SEARCH_MAX_OFFSET = 1000
+# Candidatas de cada índice que pasan al cruce con patients, la agrupación y la página: las mejor
+# puntuadas (con el id para desempatar), así que los resultados y su paginación son estables. Con términos
+# muy comunes evita ordenar y cruzar todas las coincidencias (0 = sin límite)
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "2000"))
+
+NAME_FIELDS = ["nombre", "apellido"]
+SEARCH_FIELDS = NAME_FIELDS + models.PATIENT_SECTIONS
+# Peso de cada columna en bm25 (SQLite): los nombres pesan más que el texto clínico
+_BM25_WEIGHTS = ", ".join(["10.0"] * len(NAME_FIELDS) + ["1.0"] * len(models.PATIENT_SECTIONS))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(q):
+    return _TOKEN_RE.findall(q or "")
+
+
+def _columns_text(fields):
+    return " || ' ' || ".join(f"coalesce({f}, '')" for f in fields)
+
+
+# Las secciones se guardan comprimidas (app/compression.py): PostgreSQL no puede calcular el índice a
+# partir de las columnas, así que la aplicación guarda sus lexemas en search_document al escribirlas.
+# Sin posiciones (strip): ocupa la mitad que con ellas y el índice GIN no las usa
+# Un único tsvector por paciente: nombres con peso A y lexemas de las secciones.
+# La consulta usa exactamente esta expresión para que PostgreSQL use el índice GIN.
+_PG_DOCUMENT = (
+    f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', {_columns_text(NAME_FIELDS)}), 'A') || "
+    "coalesce(search_document, ''::tsvector)"
+)
+# Pesos {D, C, B, A} de ts_rank: los lexemas sin posición cuentan como D, con el peso que tenían
+# antes las secciones (B)
+_PG_RANK_WEIGHTS = "'{0.4, 0.2, 0.4, 1.0}'::float4[]"
+
+# Una sola sentencia por bloque de pacientes (importación, backfill), no una por fila
+_PG_UPDATE_DOCUMENT = text(
+    f"UPDATE patients SET search_document = strip(to_tsvector('{SEARCH_TS_CONFIG}', d.body)) "
+    "FROM unnest(CAST(:documento_ids AS text[]), CAST(:bodies AS text[])) AS d(documento_id, body) "
+    "WHERE patients.documento_id = d.documento_id"
+)
+
+# Tabla FTS5 de contenido externo sobre una vista que descomprime las secciones: no duplica el texto,
+# solo guarda el índice invertido. descomprimir() se registra en cada conexión (app/compression.py)
+_SQLITE_CONTENT = f"""CREATE VIEW IF NOT EXISTS patients_search AS
+    SELECT id, {", ".join(f if f in NAME_FIELDS else f"descomprimir({f}) AS {f}" for f in SEARCH_FIELDS)}
+    FROM patients"""
+
+
+def _sqlite_values(prefix):
+    return ", ".join(f"{prefix}.{f}" if f in NAME_FIELDS else f"descomprimir({prefix}.{f})" for f in SEARCH_FIELDS)
+
+
+_SQLITE_DDL = [
+    _SQLITE_CONTENT,
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+        {", ".join(SEARCH_FIELDS)},
+        content='patients_search', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_fts(rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.id, {_sqlite_values("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_fts(patients_fts, rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES ('delete', old.id, {_sqlite_values("old")});
+    END""",
+    # Solo se reindexa si cambia texto indexado (no al incrementar la versión por una admisión)
+    f"""CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF {", ".join(SEARCH_FIELDS)} ON patients BEGIN
+        INSERT INTO patients_fts(patients_fts, rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES ('delete', old.id, {_sqlite_values("old")});
+        INSERT INTO patients_fts(rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.id, {_sqlite_values("new")});
+    END""",
+]
+
+_SQLITE_TRIGGERS = ["patients_fts_ai", "patients_fts_ad", "patients_fts_au"]
+
+# Entradas de las secciones con historial (section_entries): índice propio, la sección no se indexa
+_SQLITE_ENTRIES_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS section_entries_fts USING fts5(
+        section UNINDEXED, content,
+        content='section_entries', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS section_entries_fts_ai AFTER INSERT ON section_entries BEGIN
+        INSERT INTO section_entries_fts(rowid, section, content) VALUES (new.id, new.section, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS section_entries_fts_ad AFTER DELETE ON section_entries BEGIN
+        INSERT INTO section_entries_fts(section_entries_fts, rowid, section, content)
+        VALUES ('delete', old.id, old.section, old.content);
+    END""",
+]
+
+_PG_ENTRIES_DOCUMENT = f"to_tsvector('{SEARCH_TS_CONFIG}', content)"
+
+_PG_DDL = [
+    "ALTER TABLE patients ADD COLUMN IF NOT EXISTS search_document tsvector",
+    # El índice anterior se calculaba sobre las columnas de texto
+    "DROP INDEX IF EXISTS ix_patients_search",
+    f"CREATE INDEX IF NOT EXISTS ix_patients_search_document ON patients USING gin (({_PG_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_section_entries_search ON section_entries USING gin (({_PG_ENTRIES_DOCUMENT}))",
+]
+
+
+def setup_search(bind=engine):
+    # Idempotente: crea el índice de búsqueda si falta y lo llena con los pacientes existentes
+    dialect = bind.dialect.name
+    with bind.begin() as conn:
+        if dialect == "sqlite":
+            # Índice de versiones anteriores, leído directamente de las columnas (ahora comprimidas): se rehace
+            legacy = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'patients_fts'")).scalar()
+            if legacy and "'patients_search'" not in legacy:
+                for trigger in _SQLITE_TRIGGERS:
+                    conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+                conn.execute(text("DROP TABLE patients_fts"))
+            for table, ddls in (("patients_fts", _SQLITE_DDL), ("section_entries_fts", _SQLITE_ENTRIES_DDL)):
+                exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": table}).first()
+                for ddl in ddls:
+                    conn.execute(text(ddl))
+                if not exists:
+                    conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+                    logger.info(f"Índice de búsqueda FTS5 creado: {table}")
+        elif dialect == "postgresql":
+            for ddl in _PG_DDL:
+                conn.execute(text(ddl))
+        else:
+            logger.warning(f"Búsqueda de pacientes sin índice para el dialecto {dialect}")
+
+
+def _sqlite_query(tokens, fields, limit, offset):
+    # Cada palabra como prefijo; todas deben aparecer (AND implícito de FTS5)
+    match = " ".join(f'"{t}"*' for t in tokens)
+    patient_match = match
+    if fields != SEARCH_FIELDS:
+        patient_match = f"{{{' '.join(fields)}}} : ({match})"
+    # rank es el alias de bm25 en cada rama (tiene prioridad sobre la columna oculta rank de FTS5)
+    candidates = f"ORDER BY rank, rowid LIMIT {SEARCH_MAX_CANDIDATES}" if SEARCH_MAX_CANDIDATES else ""
+    # Se puntúa dentro de la tabla FTS y solo la página final se cruza con patients
+    branches = [f"""
+        SELECT * FROM (
+            SELECT rowid AS id, bm25(patients_fts, {_BM25_WEIGHTS}) AS rank
+            FROM patients_fts WHERE patients_fts MATCH :patient_match {candidates}
+        )"""]
+    params = {"patient_match": patient_match, "limit": limit, "offset": offset}
+    history = [f for f in fields if f in models.HISTORY_SECTIONS]
+    if history:
+        # Las palabras deben aparecer en una misma entrada del historial
+        branches.append(f"""
+        SELECT p.id, e.rank FROM (
+            SELECT rowid, bm25(section_entries_fts) AS rank
+            FROM section_entries_fts
+            WHERE section_entries_fts MATCH :entries_match
+              AND section IN ({", ".join(f"'{f}'" for f in history)}) {candidates}
+        ) e JOIN section_entries se ON se.id = e.rowid JOIN patients p ON p.documento_id = se.documento_id""")
+        params["entries_match"] = f"content : ({match})"
+    statement = text(f"""
+        SELECT p.documento_id, p.nombre, p.apellido, p.fecha_nacimiento, min(f.rank) AS rank
+        FROM ({" UNION ALL ".join(branches)}) f JOIN patients p ON p.id = f.id
+        GROUP BY p.id
+        ORDER BY rank, p.id
+        LIMIT :limit OFFSET :offset
+    """)
+    return statement, params
+
+
+def _pg_tsquery(tokens):
+    return func.to_tsquery(SEARCH_TS_CONFIG, " & ".join(f"{t}:*" for t in tokens))
+
+
+async def _pg_section_matches(db, tokens, fields):
+    # Búsqueda limitada a secciones concretas: search_document no distingue secciones, así que se
+    # descomprimen solo los campos pedidos de los candidatos del índice y PostgreSQL los vuelve a analizar
+    tsquery = _pg_tsquery(tokens)
+    document = literal_column(f"({_PG_DOCUMENT})")
+    candidates = select(models.Patient.id, *[getattr(models.Patient, f) for f in fields]).where(document.op("@@")(tsquery))
+    if SEARCH_MAX_CANDIDATES:
+        # Los mejor puntuados en el documento completo
+        rank = func.ts_rank(literal_column(_PG_RANK_WEIGHTS), document, tsquery)
+        candidates = candidates.order_by(rank.desc(), models.Patient.id).limit(SEARCH_MAX_CANDIDATES)
+    rows = (await db.execute(candidates)).all()
+    if not rows:
+        return []
+    recheck = text(f"""
+        SELECT t.id FROM unnest(CAST(:ids AS integer[]), CAST(:bodies AS text[])) AS t(id, body)
+        WHERE to_tsvector('{SEARCH_TS_CONFIG}', t.body) @@ to_tsquery('{SEARCH_TS_CONFIG}', :query)
+    """)
+    params = {
+        "ids": [row.id for row in rows],
+        "bodies": [" ".join(getattr(row, f) or "" for f in fields) for row in rows],
+        "query": " & ".join(f"{t}:*" for t in tokens),
+    }
+    return list((await db.execute(recheck, params)).scalars())
+
+
+def _pg_query(tokens, fields, limit, offset, section_matches=None):
+    tsquery = _pg_tsquery(tokens)
+    document = literal_column(f"({_PG_DOCUMENT})")
+    rank = func.ts_rank(literal_column(_PG_RANK_WEIGHTS), document, tsquery)
+    matches = select(models.Patient.id, models.Patient.documento_id, rank.label("rank")).where(document.op("@@")(tsquery))
+    if section_matches is not None:
+        matches = matches.where(models.Patient.id.in_(section_matches))
+    elif fields != SEARCH_FIELDS:
+        # Solo nombres: el índice GIN filtra los candidatos y se vuelve a comprobar en los campos pedidos
+        matches = matches.where(
+            func.to_tsvector(SEARCH_TS_CONFIG, literal_column(_columns_text(fields))).op("@@")(tsquery)
+        )
+    if SEARCH_MAX_CANDIDATES:
+        matches = matches.order_by(rank.desc(), models.Patient.id).limit(SEARCH_MAX_CANDIDATES)
+
+    history = [f for f in fields if f in models.HISTORY_SECTIONS]
+    if history:
+        # Entradas del historial: las palabras deben aparecer en una misma entrada
+        entries_document = literal_column(f"({_PG_ENTRIES_DOCUMENT})")
+        entries_rank = func.ts_rank(entries_document, tsquery)
+        entries = (
+            select(models.Patient.id, models.Patient.documento_id, entries_rank.label("rank"))
+            .select_from(models.SectionEntry)
+            .join(models.Patient, models.Patient.documento_id == models.SectionEntry.documento_id)
+            .where(entries_document.op("@@")(tsquery), models.SectionEntry.section.in_(history))
+        )
+        if SEARCH_MAX_CANDIDATES:
+            entries = entries.order_by(entries_rank.desc(), models.SectionEntry.id).limit(SEARCH_MAX_CANDIDATES)
+        union = union_all(matches.subquery().select(), entries.subquery().select()).subquery()
+        matches = select(union.c.id, union.c.documento_id, func.max(union.c.rank).label("rank")).group_by(union.c.id, union.c.documento_id)
+
+    matches = matches.subquery()
+    statement = (
+        select(models.Patient.documento_id, models.Patient.nombre, models.Patient.apellido,
+               models.Patient.fecha_nacimiento, matches.c.rank)
+        # Cruce por la columna de distribución para que Citus lo resuelva dentro de cada shard
+        .join(matches, (matches.c.documento_id == models.Patient.documento_id) & (matches.c.id == models.Patient.id))
+        .order_by(matches.c.rank.desc(), models.Patient.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return statement, None
+
+
+async def search_patients(db, q, fields=None, limit=20, offset=0):
+    tokens = tokenize(q)
+    if not tokens:
+        return []
+    fields = [f for f in SEARCH_FIELDS if f in fields] if fields else SEARCH_FIELDS
+    if engine.dialect.name == "postgresql":
+        section_matches = None
+        if fields != SEARCH_FIELDS and set(fields) - set(NAME_FIELDS):
+            section_matches = await _pg_section_matches(db, tokens, fields)
+        statement, params = _pg_query(tokens, fields, limit, offset, section_matches)
+    else:
+        statement, params = _sqlite_query(tokens, fields, limit, offset)
+    rows = (await db.execute(statement, params)).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def _document_params(patients):
+    # patients: dicts (o filas) con documento_id y el texto de las secciones
+    return {
+        "documento_ids": [p["documento_id"] for p in patients],
+        "bodies": [" ".join(p.get(s) or "" for s in models.PATIENT_SECTIONS) for p in patients],
+    }
+
+
+def index_patients(conn, patients):
+    # Recalcula search_document tras escribir secciones (PostgreSQL); en SQLite lo hacen los triggers
+    if conn.dialect.name == "postgresql" and patients:
+        conn.execute(_PG_UPDATE_DOCUMENT, _document_params(patients))
+
+
+async def index_patients_async(db, patients):
+    if engine.dialect.name == "postgresql" and patients:
+        await db.execute(_PG_UPDATE_DOCUMENT, _document_params(patients))
@@ -0,0 +1,183 @@
+# app/section_compression.py
+# Secciones clínicas comprimidas (app/compression.py): conversión del esquema, entrenamiento del
+# diccionario compartido y recompresión de las filas existentes.
+#
+#   python -m app.section_compression --train       # entrena un diccionario con una muestra de pacientes
+#   python -m app.section_compression --backfill    # recomprime por bloques con el diccionario más reciente
+#   python -m app.section_compression --report      # espacio ocupado frente al texto sin comprimir
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import LargeBinary, bindparam, func, insert, select, text, type_coerce, update
+from sqlalchemy.types import NullType
+
+from app import compression
+from app.database import engine
+from app.search import SEARCH_TS_CONFIG, index_patients, setup_search
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+# Pacientes de los que se toman las secciones para entrenar el diccionario
+TRAIN_SAMPLE = 2000
+# Pacientes recomprimidos por transacción
+BACKFILL_BATCH = 1000
+
+
+def setup_compression(bind=engine):
+    # Idempotente. En PostgreSQL, la primera vez convierte las secciones de text a bytea: el contenido
+    # queda como UTF-8 sin comprimir (se lee igual) hasta el backfill, y search_document se llena antes
+    # de que el índice de búsqueda deje de poder leer las columnas
+    if bind.dialect.name == "postgresql":
+        with bind.begin() as conn:
+            text_columns = conn.execute(text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'patients' AND data_type = 'text' AND column_name = ANY(:sections)"
+            ), {"sections": models.PATIENT_SECTIONS}).scalars().all()
+            if text_columns:
+                conn.execute(text("ALTER TABLE patients ADD COLUMN IF NOT EXISTS search_document tsvector"))
+                conn.execute(text(
+                    f"UPDATE patients SET search_document = "
+                    f"strip(to_tsvector('{SEARCH_TS_CONFIG}', concat_ws(' ', {', '.join(models.PATIENT_SECTIONS)})))"
+                ))
+                conn.execute(text("DROP INDEX IF EXISTS ix_patients_search"))
+                conn.execute(text("ALTER TABLE patients " + ", ".join(
+                    f"ALTER COLUMN {column} TYPE bytea USING convert_to({column}, 'UTF8')" for column in text_columns
+                )))
+                logger.info(f"Secciones de patients convertidas a bytea: {len(text_columns)} columnas")
+    dictionary_id = compression.load_dictionaries(bind)
+    if compression.TEXT_COMPRESSION and not dictionary_id:
+        logger.warning("Secciones clínicas sin diccionario de compresión: python -m app.section_compression --train --backfill")
+
+
+def _sections():
+    return [getattr(models.Patient, s) for s in models.PATIENT_SECTIONS]
+
+
+def train(bind=engine, sample=TRAIN_SAMPLE):
+    with bind.connect() as conn:
+        ids = conn.execute(select(models.Patient.id).order_by(func.random()).limit(sample)).scalars().all()
+        rows = conn.execute(select(*_sections()).where(models.Patient.id.in_(ids))).all() if ids else []
+    samples = [value for row in rows for value in row if value]
+    if not samples:
+        logger.warning("No hay texto clínico con el que entrenar el diccionario")
+        return None
+    data = compression.train_dictionary(samples)
+    if not data:
+        logger.warning(f"Ningún fragmento se repite en las {len(samples)} secciones de la muestra: no se guarda el diccionario")
+        return None
+    with bind.begin() as conn:
+        dictionary_id = conn.execute(
+            insert(models.CompressionDictionary)
+            .values(data=data, created_at=datetime.now())
+            .returning(models.CompressionDictionary.id)
+        ).scalar()
+    compression.load_dictionaries(bind)
+    logger.info(f"Diccionario {dictionary_id} entrenado con {len(samples)} secciones de {len(rows)} pacientes ({len(data)} bytes)")
+    return dictionary_id
+
+
+def backfill(bind=engine, batch=BACKFILL_BATCH):
+    # Por bloques de id: recomprime con el diccionario actual lo que no lo esté (texto de antes de la
+    # conversión, diccionarios anteriores) y recalcula search_document. Se puede repetir e interrumpir
+    stored = [type_coerce(getattr(models.Patient, s), NullType()).label(s) for s in models.PATIENT_SECTIONS]
+    statement = (
+        update(models.Patient)
+        .where(models.Patient.id == bindparam("b_id"), models.Patient.documento_id == bindparam("b_documento_id"))
+        .values({s: bindparam(f"b_{s}", type_=LargeBinary) for s in models.PATIENT_SECTIONS})
+    )
+    total = rewritten = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(models.Patient.id, models.Patient.documento_id, *stored)
+                .where(models.Patient.id > last_id).order_by(models.Patient.id).limit(batch)
+            ).all()
+            if not rows:
+                break
+            changed = []
+            texts = []
+            for row in rows:
+                values = {s: compression.decompress(getattr(row, s)) for s in models.PATIENT_SECTIONS}
+                texts.append({"documento_id": row.documento_id, **values})
+                params = {f"b_{s}": compression.compress(values[s]) for s in models.PATIENT_SECTIONS}
+                if any(_differs(getattr(row, s), params[f"b_{s}"]) for s in models.PATIENT_SECTIONS):
+                    changed.append({"b_id": row.id, "b_documento_id": row.documento_id, **params})
+            if changed:
+                conn.execute(statement, changed)
+            index_patients(conn, texts)
+        last_id = rows[-1].id
+        total += len(rows)
+        rewritten += len(changed)
+        logger.info(f"Compresión de secciones: {total} pacientes revisados, {rewritten} recomprimidos")
+    return total, rewritten
+
+
+def _differs(stored, new):
+    if stored is None or new is None:
+        return stored is not new
+    return isinstance(stored, str) or bytes(stored) != new
+
+
+def report(bind=engine, batch=BACKFILL_BATCH):
+    # Bytes guardados frente a bytes de texto (UTF-8) de las secciones, y tamaño de la tabla en PostgreSQL
+    stored = [type_coerce(getattr(models.Patient, s), NullType()).label(s) for s in models.PATIENT_SECTIONS]
+    result = {"patients": 0, "text_bytes": 0, "stored_bytes": 0, "dictionary": compression.current_dictionary()}
+    last_id = 0
+    with bind.connect() as conn:
+        while True:
+            rows = conn.execute(
+                select(models.Patient.id, *stored).where(models.Patient.id > last_id).order_by(models.Patient.id).limit(batch)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                for s in models.PATIENT_SECTIONS:
+                    value = getattr(row, s)
+                    if value is None:
+                        continue
+                    result["text_bytes"] += len(compression.decompress(value).encode("utf-8"))
+                    result["stored_bytes"] += len(value.encode("utf-8") if isinstance(value, str) else bytes(value))
+            result["patients"] += len(rows)
+            last_id = rows[-1].id
+        if bind.dialect.name == "postgresql":
+            sizes = conn.execute(text(
+                "SELECT pg_relation_size('patients') AS heap_bytes, "
+                "coalesce(pg_total_relation_size(reltoastrelid), 0) AS toast_bytes, "
+                "pg_indexes_size('patients') AS index_bytes, pg_total_relation_size('patients') AS total_bytes "
+                "FROM pg_class WHERE oid = 'patients'::regclass"
+            )).first()
+            result.update(sizes._mapping)
+    result["ratio"] = round(result["stored_bytes"] / result["text_bytes"], 3) if result["text_bytes"] else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compresión de las secciones clínicas")
+    parser.add_argument("--train", action="store_true", help="entrenar un diccionario nuevo con una muestra de pacientes")
+    parser.add_argument("--sample", type=int, default=TRAIN_SAMPLE)
+    parser.add_argument("--backfill", action="store_true", help="recomprimir las filas existentes con el diccionario más reciente")
+    parser.add_argument("--batch", type=int, default=BACKFILL_BATCH)
+    parser.add_argument("--report", action="store_true", help="espacio ocupado por las secciones")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine, tables=[models.CompressionDictionary.__table__])
+    setup_compression(engine)
+    setup_search(engine)
+    if not (args.train or args.backfill or args.report):
+        parser.print_help()
+    if args.train:
+        train(sample=args.sample)
+    if args.backfill:
+        total, rewritten = backfill(batch=args.batch)
+        logger.info(f"Backfill terminado: {rewritten} de {total} pacientes recomprimidos")
+    if args.report:
+        for key, value in report(batch=args.batch).items():
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
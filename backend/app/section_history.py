@@ -0,0 +1,185 @@
+# app/section_history.py
+# Secciones clínicas de solo inserción: cada guardado añade una entrada en section_entries en lugar de
+# reescribir la columna. El texto completo se monta al leer, solo para las secciones pedidas.
+#
+#   python -m app.section_history --migrate    # mueve el texto de las columnas a entradas
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from app.database import engine
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+ENTRY = "entrada"
+APPEND = "anexo"
+REPLACE = "reemplazo"
+
+# Pacientes migrados por transacción
+MIGRATE_BATCH = 1000
+
+SectionEntry = models.SectionEntry
+
+
+def _current_entries(documento_ids, sections):
+    # Solo las entradas desde el último reemplazo de cada sección: lo anterior ya no forma parte del texto
+    replaced = models.SectionEntry.__table__.alias("replaced")
+    last_replace = (
+        select(func.max(replaced.c.created_at))
+        .where(
+            replaced.c.documento_id == SectionEntry.documento_id,
+            replaced.c.section == SectionEntry.section,
+            replaced.c.kind == REPLACE,
+        )
+        .scalar_subquery()
+    )
+    return (
+        select(SectionEntry.documento_id, SectionEntry.section, SectionEntry.kind, SectionEntry.content)
+        .where(
+            SectionEntry.documento_id.in_(documento_ids),
+            SectionEntry.section.in_(sections),
+            or_(last_replace.is_(None), SectionEntry.created_at >= last_replace),
+        )
+        .order_by(SectionEntry.documento_id, SectionEntry.section, SectionEntry.created_at, SectionEntry.id)
+    )
+
+
+def _assemble(texts, rows):
+    # texts: {(documento_id, sección): texto base de la columna}; se completa con las entradas en orden
+    for row in rows:
+        key = (row.documento_id, row.section)
+        current = texts.get(key) or ""
+        if row.kind == REPLACE:
+            texts[key] = row.content
+        elif row.kind == APPEND:
+            texts[key] = current + row.content
+        else:
+            texts[key] = f"{current}\n{row.content}" if current else row.content
+    return texts
+
+
+async def load_texts(db, documento_id, base, sections=None):
+    # base: {sección: valor de la columna}; devuelve el texto completo de cada sección de historial pedida
+    sections = [s for s in (sections or models.HISTORY_SECTIONS) if s in models.HISTORY_SECTIONS]
+    if not sections:
+        return {}
+    rows = (await db.execute(_current_entries([documento_id], sections))).all()
+    texts = _assemble({(documento_id, s): base.get(s) for s in sections}, rows)
+    return {s: texts[(documento_id, s)] for s in sections}
+
+
+def load_texts_many(db, patients):
+    # Versión síncrona para lotes: patients es {documento_id: {sección: valor de la columna}}
+    rows = db.execute(_current_entries(list(patients), models.HISTORY_SECTIONS)).all()
+    texts = {(d, s): data.get(s) for d, data in patients.items() for s in models.HISTORY_SECTIONS}
+    return _assemble(texts, rows)
+
+
+def _delta(current, new_text):
+    # Texto añadido al final: solo se guarda lo nuevo; cualquier otra edición guarda el texto completo
+    current = current or ""
+    if new_text == current:
+        return None, None
+    if current and new_text.startswith(current):
+        return APPEND, new_text[len(current):]
+    return REPLACE, new_text
+
+
+async def save_texts(db, documento_id, changes, author, base):
+    # changes: {sección: texto completo enviado por el cliente}; añade una entrada por sección modificada
+    current = await load_texts(db, documento_id, base, list(changes))
+    now = datetime.now()
+    saved = []
+    for section, new_text in changes.items():
+        kind, content = _delta(current[section], new_text or "")
+        if kind is None:
+            continue
+        db.add(SectionEntry(documento_id=documento_id, section=section, kind=kind, content=content,
+                            author=author, created_at=now))
+        saved.append(section)
+    return saved
+
+
+def list_entries_query(documento_id, section, desde=None, hasta=None, before=None, limit=50):
+    # Más recientes primero; before = (created_at, id) de la última entrada de la página anterior
+    query = (
+        select(SectionEntry.id, SectionEntry.kind, SectionEntry.content, SectionEntry.author, SectionEntry.created_at)
+        .where(SectionEntry.documento_id == documento_id, SectionEntry.section == section)
+        .order_by(SectionEntry.created_at.desc(), SectionEntry.id.desc())
+        .limit(limit)
+    )
+    if desde is not None:
+        query = query.where(SectionEntry.created_at >= desde)
+    if hasta is not None:
+        query = query.where(SectionEntry.created_at < hasta)
+    if before is not None:
+        created_at, entry_id = before
+        query = query.where(or_(
+            SectionEntry.created_at < created_at,
+            and_(SectionEntry.created_at == created_at, SectionEntry.id < entry_id),
+        ))
+    return query
+
+
+def _creation_date(fecha_creacion):
+    try:
+        return datetime.fromisoformat(fecha_creacion)
+    except (TypeError, ValueError):
+        return datetime(1970, 1, 1)
+
+
+def migrate(bind=engine, batch=MIGRATE_BATCH):
+    # Idempotente y por bloques: el texto de la columna pasa a ser la primera entrada de la sección
+    # (con la fecha de alta del paciente, antes de cualquier entrada posterior) y la columna queda vacía
+    has_text = or_(*[getattr(models.Patient, s).isnot(None) & (getattr(models.Patient, s) != "") for s in models.HISTORY_SECTIONS])
+    columns = [models.Patient.id, models.Patient.documento_id, models.Patient.fecha_creacion] + \
+        [getattr(models.Patient, s) for s in models.HISTORY_SECTIONS]
+    total = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(*columns).where(models.Patient.id > last_id, has_text).order_by(models.Patient.id).limit(batch)
+            ).all()
+            if not rows:
+                break
+            entries = []
+            for row in rows:
+                created_at = _creation_date(row.fecha_creacion)
+                for section in models.HISTORY_SECTIONS:
+                    text = getattr(row, section)
+                    if text:
+                        entries.append({"documento_id": row.documento_id, "section": section, "kind": APPEND,
+                                        "content": text, "author": None, "created_at": created_at})
+            conn.execute(insert(SectionEntry), entries)
+            conn.execute(
+                update(models.Patient)
+                .where(models.Patient.id.in_([row.id for row in rows]))
+                .values({s: None for s in models.HISTORY_SECTIONS})
+            )
+        last_id = rows[-1].id
+        total += len(rows)
+        logger.info(f"Historial de secciones: {total} pacientes migrados")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historial de secciones clínicas")
+    parser.add_argument("--migrate", action="store_true", help="mover el texto de las columnas a section_entries")
+    parser.add_argument("--batch", type=int, default=MIGRATE_BATCH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine, tables=[SectionEntry.__table__])
+    if args.migrate:
+        total = migrate(batch=args.batch)
+        logger.info(f"Migración terminada: {total} pacientes")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# app/serve.py
+# Arranque en producción: varios procesos uvicorn independientes (sin memoria compartida) detrás del mismo
+# socket. El proceso principal prepara la base de datos una vez, ajusta los pools de cada worker a la CPU
+# disponible y supervisa los workers: los reinicia si mueren, los recicla tras WEB_MAX_REQUESTS peticiones
+# y con SIGHUP los sustituye uno a uno (el nuevo entra en servicio antes de parar el anterior).
+#
+#   python -m app.serve                  # WEB_CONCURRENCY workers (por defecto, según la cuota de CPU)
+#   kill -HUP <pid del proceso principal>  # recarga sin cortar el servicio
+import logging
+import math
+import os
+import shutil
+import tempfile
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Peticiones por worker antes de reciclarlo (0 = nunca), con una variación aleatoria para que no coincidan
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "10000"))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", str(WEB_MAX_REQUESTS // 10)))
+# Segundos para terminar las peticiones en curso al parar o reciclar un worker
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+# AUTH_CACHE_TTL por defecto con varios workers (segundos)
+AUTH_CACHE_TTL_WORKERS = "5"
+
+
+def available_cpus():
+    # Cuota de CPU del contenedor (cgroup v2 o v1) si la hay; si no, las CPUs asignadas al proceso.
+    # os.cpu_count() devuelve las del nodo aunque el pod tenga limits.cpu: 1
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def configure(workers, cpus):
+    # Variables que leen los workers al importar la aplicación (se crean con spawn y heredan el entorno)
+    per_worker = str(max(1, cpus // workers))
+    for name in ("HASH_WORKERS", "PDF_WORKERS", "IMPORT_WORKERS"):
+        os.environ.setdefault(name, per_worker)
+    if workers > 1:
+        # La caché local de pacientes no se invalida entre workers: sin Redis se desactiva
+        if os.environ.setdefault("PATIENT_CACHE_BACKEND", "off") == "local":
+            logger.warning("PATIENT_CACHE_BACKEND=local con varios workers: lecturas obsoletas hasta PATIENT_CACHE_TTL")
+        # Tampoco la de usuarios (AUTH_MODE=cache): un cambio de rol o un borrado en un worker tarda hasta
+        # AUTH_CACHE_TTL en verse en los demás, así que se acorta
+        os.environ.setdefault("AUTH_CACHE_TTL", AUTH_CACHE_TTL_WORKERS)
+        # /metrics suma lo de todos los workers; el directorio se vacía en cada arranque
+        metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "historias_metrics"))
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def prepare_database():
+    # Una vez en el proceso principal, antes de arrancar los workers: ellos solo cargan lo que necesitan
+    if os.getenv("BOOTSTRAP_ON_STARTUP", "true").lower() in ("1", "true", "yes"):
+        from app.bootstrap import bootstrap
+        from app.database import engine
+        bootstrap(engine)
+        engine.dispose()
+        os.environ["BOOTSTRAP_ON_STARTUP"] = "false"
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    cpus = available_cpus()
+    workers = int(os.getenv("WEB_CONCURRENCY") or cpus)
+    configure(workers, cpus)
+    prepare_database()
+    logger.info(
+        f"{workers} workers para {cpus} CPUs (hashing/PDF {os.environ['HASH_WORKERS']} por worker, "
+        f"reciclado cada {WEB_MAX_REQUESTS or '∞'} peticiones)"
+    )
+
+    config = uvicorn.Config(
+        "app.main:app", host=HOST, port=PORT, workers=workers, proxy_headers=True,
+        limit_max_requests=WEB_MAX_REQUESTS or None, limit_max_requests_jitter=WEB_MAX_REQUESTS_JITTER,
+        timeout_graceful_shutdown=WEB_GRACEFUL_TIMEOUT, timeout_keep_alive=WEB_KEEPALIVE,
+    )
+    # Siempre bajo el supervisor, también con un worker: reciclarlo no debe terminar el contenedor
+    Multiprocess(config, sockets=[config.bind_socket()]).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench/admissions_keyset.py
+# Paginación de admisiones sobre una tabla grande (SQLite local o DATABASE_URL).
+#
+#   python bench/admissions_keyset.py --rows 1000000 --chronic 200000
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def timed(fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--chronic", type=int, default=200_000, help="admisiones del paciente crónico")
+    parser.add_argument("--page", type=int, default=50)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_admissions.db"
+    from sqlalchemy import insert, select, tuple_
+    from app.database import Base, SessionLocal, engine
+    import app.models as models
+
+    Base.metadata.drop_all(engine, tables=[models.Admission.__table__])
+    Base.metadata.create_all(engine, tables=[models.Admission.__table__])
+    Admission = models.Admission
+
+    print(f"Insertando {args.rows} admisiones...")
+    start = datetime(2000, 1, 1)
+    rng = random.Random(42)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(args.rows):
+            documento_id = "1" if i < args.chronic else str(2 + rng.randrange(args.patients - 1))
+            batch.append({
+                "documento_id": documento_id,
+                "fecha_ingreso": start + timedelta(minutes=rng.randrange(13_000_000)),
+                "motivo": "Control",
+                "admisionista_id": 1,
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(Admission), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(Admission), batch)
+
+    with SessionLocal() as db:
+        base = select(Admission.id, Admission.fecha_ingreso, Admission.motivo).where(Admission.documento_id == "1")
+        newest = base.order_by(Admission.fecha_ingreso.desc(), Admission.id.desc())
+
+        ms, rows = timed(lambda: db.execute(base).all(), repeat=3)
+        print(f"antes: todas las admisiones sin orden ({len(rows)} filas)     {ms:8.1f} ms")
+
+        ms, _ = timed(lambda: db.execute(newest.offset(args.chronic // 2).limit(args.page)).all())
+        print(f"OFFSET {args.chronic // 2} LIMIT {args.page}                          {ms:8.1f} ms")
+
+        ms, page = timed(lambda: db.execute(newest.limit(args.page)).all())
+        print(f"keyset primera página                                   {ms:8.1f} ms")
+
+        # Cursor a mitad de la historia
+        middle = db.execute(newest.offset(args.chronic // 2).limit(1)).first()
+        ms, _ = timed(lambda: db.execute(
+            newest.where(tuple_(Admission.fecha_ingreso, Admission.id) < tuple_(middle.fecha_ingreso, middle.id)).limit(args.page)
+        ).all())
+        print(f"keyset página a mitad de la historia                    {ms:8.1f} ms")
+
+        rng_from, rng_to = datetime(2010, 1, 1), datetime(2010, 2, 1)
+        ms, rows = timed(lambda: db.execute(
+            newest.where(Admission.fecha_ingreso >= rng_from, Admission.fecha_ingreso < rng_to).limit(args.page)
+        ).all())
+        print(f"filtro por rango de fechas ({len(rows)} filas)               {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# bench/auth_throughput.py
+# req/s de /perfil y /paciente/{documento_id}; ejecutar una vez por AUTH_MODE.
+#
+#   AUTH_MODE=db uvicorn app.main:app --port 8000 &
+#   python bench/auth_throughput.py --url http://localhost:8000
+import argparse
+import asyncio
+import time
+
+from common import client as make_client, ensure_patient, login, percentile
+
+
+async def worker(client, path, headers, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await client.get(path, headers=headers)
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(args):
+    async with make_client(args.url, connections=args.concurrency + 5) as client:
+        admin = await login(client, "admisionista", "admision", "admision123")
+        await ensure_patient(client, admin, args.documento)
+        medico = await login(client, "medico", "gabriel", "medico123")
+
+        for path in ("/perfil", f"/paciente/{args.documento}"):
+            latencies = []
+            deadline = time.perf_counter() + args.seconds
+            await asyncio.gather(*(worker(client, path, medico, deadline, latencies) for _ in range(args.concurrency)))
+            print(f"{path:<28} {len(latencies) / args.seconds:8.1f} req/s  "
+                  f"p50={percentile(latencies, 50):.1f}ms  p99={percentile(latencies, 99):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--documento", default="900000001")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
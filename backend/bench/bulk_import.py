@@ -0,0 +1,76 @@
+# bench/bulk_import.py
+# Importación masiva de pacientes: filas/s y memoria máxima del proceso frente a POST /users fila a fila.
+# Los pbkdf2 dominan el tiempo: el resultado escala con IMPORT_WORKERS (núcleos disponibles).
+#
+#   DATABASE_URL=postgresql+psycopg2://... IMPORT_WORKERS=8 python bench/bulk_import.py --rows 100000
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def write_csv(path, first, rows, bad_every):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["documento_id", "nombre", "apellido", "fecha_nacimiento", "antecedentes_interes", "datos_sociales"])
+        for i in range(first, first + rows):
+            documento_id = str(i) if not bad_every or i % bad_every else f"X{i}"
+            writer.writerow([documento_id, f"Nombre{i}", f"Apellido{i % 1000}", "1980-01-01",
+                             "Hipertensión arterial en tratamiento" if i % 3 == 0 else "", "Vive acompañado"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--single", type=int, default=200, help="filas creadas con POST /users para comparar")
+    parser.add_argument("--bad-every", type=int, default=1000, help="una fila inválida cada N (0 = ninguna)")
+    parser.add_argument("--first-id", type=int, default=700_000_000)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_bulk_import.db"
+    os.environ.setdefault("AUTH_MODE", "claims")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        r = client.post("/token/admisionista", data={"username": "admision", "password": "admision123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        # Antes: una petición (hash + dos commits) por paciente
+        t0 = time.perf_counter()
+        for i in range(args.single):
+            documento_id = str(args.first_id - args.single + i)
+            client.post("/users", headers=headers, data={"documento_id": documento_id, "nombre": "Bench", "apellido": "Paciente",
+                                                          "fecha_nacimiento": "1980-01-01", "role": "paciente"})
+        single = args.single / (time.perf_counter() - t0) if args.single else 0
+
+        path = os.path.join(tempfile.mkdtemp(), "pacientes.csv")
+        write_csv(path, args.first_id, args.rows, args.bad_every)
+        print(f"Fichero de {args.rows} filas: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        t0 = time.perf_counter()
+        with open(path, "rb") as f:
+            r = client.post("/pacientes/importar", headers=headers, files={"archivo": ("pacientes.csv", f, "text/csv")})
+        job_id = r.json()["job_id"]
+        while True:
+            progress = client.get(f"/pacientes/importar/{job_id}", headers=headers).json()
+            if progress["status"] not in ("pendiente", "en_progreso"):
+                break
+            time.sleep(1)
+        elapsed = time.perf_counter() - t0
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"POST /users:        {single:8.1f} pacientes/s")
+    print(f"/pacientes/importar: {progress['imported'] / elapsed:8.1f} pacientes/s  ({progress['imported']} importados, "
+          f"{progress['failed']} con error, {elapsed:.1f}s, estado {progress['status']})")
+    print(f"Memoria máxima del proceso: {rss:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
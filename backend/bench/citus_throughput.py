@@ -0,0 +1,76 @@
+# bench/citus_throughput.py
+# Carga mixta por paciente (historia, admisiones, nueva admisión, PDF) contra una o varias instancias,
+# p. ej. la API sobre Citus y la API sobre PostgreSQL de un nodo de docker-compose.citus.yml:
+#
+#   python bench/citus_throughput.py --url http://localhost:8001 --url http://localhost:8002
+import argparse
+import asyncio
+import random
+import time
+
+from common import client as make_client, ensure_patient, login, percentile
+
+DOCUMENTO_BASE = 800_000_000
+
+
+def _operations(documento_id):
+    return [
+        ("historia", "GET", f"/paciente/{documento_id}?sections=evolucion_clinica&fields=nombre,apellido", None),
+        ("admisiones", "GET", f"/paciente/{documento_id}/admisiones?limit=20", None),
+        ("nueva_admision", "POST", "/admission", {"documento_id": documento_id, "fecha_ingreso": "2024-05-01T10:00", "motivo": "Control"}),
+        ("listado", "GET", f"/pacientes?limit=20&after={documento_id}", None),
+    ]
+
+
+async def run_url(url, args):
+    async with make_client(url, connections=args.concurrency + 5) as client:
+        admin = await login(client, "admisionista", "admision", "admision123")
+        documentos = [str(DOCUMENTO_BASE + i) for i in range(args.patients)]
+        # De 5 en 5: la creación hashea la contraseña y el pool de hashing rechaza ráfagas grandes
+        for i in range(0, len(documentos), 5):
+            await asyncio.gather(*(ensure_patient(client, admin, d, evolucion_clinica="Paciente estable") for d in documentos[i:i + 5]))
+
+        latencies = {}
+        errors = 0
+        count = 0
+        deadline = time.perf_counter() + args.duration
+        rng = random.Random(1)
+
+        async def worker():
+            nonlocal errors, count
+            while time.perf_counter() < deadline:
+                label, method, path, body = rng.choice(_operations(rng.choice(documentos)))
+                start = time.perf_counter()
+                r = await client.request(method, path, json=body, headers=admin)
+                latencies.setdefault(label, []).append((time.perf_counter() - start) * 1000)
+                count += 1
+                if r.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+        print(f"{url}: {count} peticiones en {elapsed:.1f}s  {count / elapsed:.0f} req/s  errores={errors}")
+        for label, values in sorted(latencies.items()):
+            print(f"  {label:<16} p50={percentile(values, 50):6.1f}ms  p99={percentile(values, 99):6.1f}ms  n={len(values)}")
+
+
+async def run(args):
+    for url in args.url:
+        await run_url(url, args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", action="append", default=None)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+    args.url = args.url or ["http://localhost:8000"]
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
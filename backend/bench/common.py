@@ -0,0 +1,32 @@
+# bench/common.py
+import httpx
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def login(client, role, username, password):
+    field = "documento_id" if role == "paciente" else "username"
+    r = await client.post(f"/token/{role}", data={field: username, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def ensure_patient(client, admin_headers, documento_id, **fields):
+    data = {"documento_id": documento_id, "nombre": "Bench", "apellido": "Paciente",
+            "fecha_nacimiento": "1980-01-01", "role": "paciente"}
+    data.update(fields)
+    r = await client.post("/users", data=data, headers=admin_headers)
+    # 400 = ya existe
+    if r.status_code not in (200, 400):
+        r.raise_for_status()
+
+
+def client(url, connections=100, timeout=120):
+    return httpx.AsyncClient(base_url=url, timeout=timeout,
+                             limits=httpx.Limits(max_connections=connections))
@@ -0,0 +1,217 @@
+# bench/compression.py
+# Secciones clínicas sin comprimir frente a comprimidas con el diccionario compartido: espacio en disco,
+# latencia de lectura (historia completa y solo dos columnas) y de escritura.
+# El texto se genera con plantillas de frases clínicas (fármacos, pautas, constantes, exploración), que
+# se repiten entre pacientes como en las historias reales; un texto aleatorio no se parecería en nada.
+#
+#   python bench/compression.py --patients 20000
+#   DATABASE_URL=postgresql+psycopg2://... python bench/compression.py --patients 100000
+# Usar una base de datos vacía: el espacio se mide sobre la tabla patients completa.
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from suite import SECTION_LENGTHS
+
+SEED_FIRST_ID = 700_000_000
+SEED_BATCH = 1000
+
+FARMACOS = ["paracetamol", "ibuprofeno", "metamizol", "omeprazol", "enalapril", "amlodipino", "metformina", "insulina glargina",
+            "atorvastatina", "furosemida", "bisoprolol", "acenocumarol", "enoxaparina", "amoxicilina-clavulánico", "levofloxacino",
+            "ceftriaxona", "salbutamol", "budesonida", "prednisona", "lorazepam", "sertralina", "tramadol", "morfina", "ondansetrón",
+            "metoclopramida", "pantoprazol", "losartán", "hidroclorotiazida", "clopidogrel", "ácido acetilsalicílico", "levotiroxina"]
+SINTOMAS = ["dolor abdominal", "dolor torácico", "disnea", "fiebre", "tos productiva", "cefalea", "mareo", "náuseas", "vómitos",
+            "diarrea", "astenia", "edemas en miembros inferiores", "palpitaciones", "síncope", "disuria", "hematuria", "lumbalgia",
+            "dolor en fosa ilíaca derecha", "pérdida de peso", "hiporexia", "prurito", "rigidez matutina"]
+LOCALIZACIONES = ["hemitórax derecho", "base pulmonar izquierda", "epigastrio", "hipocondrio derecho", "región lumbar",
+                  "rodilla izquierda", "tobillo derecho", "región cervical", "flanco izquierdo", "mesogastrio"]
+PRUEBAS = ["hemograma", "bioquímica con perfil hepático y renal", "coagulación", "gasometría venosa", "radiografía de tórax",
+           "ecografía abdominal", "TAC craneal sin contraste", "electrocardiograma", "sedimento de orina", "troponinas seriadas",
+           "PCR y procalcitonina", "hemocultivos", "urocultivo", "ecocardiograma transtorácico"]
+SERVICIOS = ["cardiología", "neumología", "cirugía general", "traumatología", "medicina interna", "nefrología", "digestivo",
+             "endocrinología", "neurología", "urología", "ginecología", "hematología"]
+FAMILIARES = ["esposa", "marido", "hija", "hijo", "madre", "hermana", "cuidadora"]
+PLANTILLAS = [
+    "Paciente de {edad} años que acude por {sintoma} de {n} días de evolución.",
+    "Refiere {sintoma} y {sintoma2}, sin otra sintomatología acompañante.",
+    "Niega alergias medicamentosas conocidas.",
+    "Alergia a {farmaco}.",
+    "Antecedentes de {sintoma} en {anio}, estudiado por {servicio}.",
+    "En tratamiento habitual con {farmaco} {dosis} mg cada {h} horas y {farmaco2} {dosis2} mg al día.",
+    "TA {ta}/{td} mmHg, FC {fc} lpm, SatO2 {sat}% basal, Tª {temp} ºC.",
+    "Exploración: consciente, orientado, normohidratado y normoperfundido.",
+    "Auscultación cardiaca rítmica sin soplos; murmullo vesicular disminuido en {local}.",
+    "Abdomen blando, depresible, doloroso a la palpación en {local}, sin signos de irritación peritoneal.",
+    "Se solicita {prueba} y {prueba2}.",
+    "{prueba}: sin hallazgos significativos.",
+    "{prueba}: leucocitos {leu} x10^9/L, hemoglobina {hb} g/dL, creatinina {cr} mg/dL.",
+    "Se inicia {farmaco} {dosis} mg intravenoso cada {h} horas.",
+    "Se suspende {farmaco} por {sintoma}.",
+    "Se ajusta dosis de {farmaco} a {dosis} mg.",
+    "Se realiza interconsulta a {servicio}.",
+    "Valorado por {servicio}, que recomienda {prueba} y control evolutivo.",
+    "Evolución favorable, afebril en las últimas {n} horas, tolera dieta oral.",
+    "Persiste {sintoma}; se decide ampliar estudio con {prueba}.",
+    "Vive con su {familiar} en domicilio con ascensor; independiente para las actividades básicas de la vida diaria.",
+    "Exfumador de {n} paquetes-año desde hace {n2} años. No bebedor.",
+    "Alta a domicilio. Control por su médico de atención primaria en {n} semanas y revisión en consultas de {servicio}.",
+    "Glucemia capilar {gl} mg/dL; se administran {ui} UI de insulina rápida según pauta.",
+    "Curas de herida quirúrgica en {local} cada {h} horas, sin signos de infección.",
+    "Se explica el procedimiento al paciente y a su {familiar}, que firman el consentimiento informado.",
+]
+
+
+def clinical_text(rng, length):
+    if not length:
+        return ""
+    length = int(rng.uniform(0.5, 1.5) * length)
+    sentences = []
+    size = 0
+    while size < length:
+        sentence = rng.choice(PLANTILLAS).format(
+            edad=rng.randint(18, 95), sintoma=rng.choice(SINTOMAS), sintoma2=rng.choice(SINTOMAS), n=rng.randint(1, 15),
+            n2=rng.randint(1, 30), anio=rng.randint(1990, 2024), servicio=rng.choice(SERVICIOS),
+            farmaco=rng.choice(FARMACOS), farmaco2=rng.choice(FARMACOS),
+            dosis=rng.choice([5, 10, 20, 40, 50, 100, 500, 575, 1000]), dosis2=rng.choice([2.5, 5, 10, 25, 75, 100]),
+            h=rng.choice([6, 8, 12, 24]), ta=rng.randint(95, 180), td=rng.randint(50, 105), fc=rng.randint(48, 125),
+            sat=rng.randint(86, 100), temp=round(rng.uniform(35.5, 39.5), 1), local=rng.choice(LOCALIZACIONES),
+            prueba=rng.choice(PRUEBAS), prueba2=rng.choice(PRUEBAS), leu=round(rng.uniform(3, 22), 1),
+            hb=round(rng.uniform(8, 16.5), 1), cr=round(rng.uniform(0.5, 3.2), 2), familiar=rng.choice(FAMILIARES),
+            gl=rng.randint(60, 380), ui=rng.randint(2, 12),
+        )
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def patient_row(rng, documento_id):
+    import app.models as models
+    row = {"documento_id": documento_id, "nombre": "Bench", "apellido": "Compresión", "fecha_nacimiento": "1970-01-01",
+           "fecha_creacion": "2024-01-01T00:00:00", "version": 1}
+    for section in models.PATIENT_SECTIONS:
+        row[section] = clinical_text(rng, SECTION_LENGTHS.get(section, 0))
+    return row
+
+
+def seed(engine, patients, rng):
+    from sqlalchemy import insert
+    from app.search import index_patients
+    import app.models as models
+    for first in range(0, patients, SEED_BATCH):
+        rows = [patient_row(rng, str(SEED_FIRST_ID + i)) for i in range(first, min(first + SEED_BATCH, patients))]
+        with engine.begin() as conn:
+            conn.execute(insert(models.Patient), rows)
+            index_patients(conn, rows)
+
+
+def storage(engine):
+    from sqlalchemy import text
+    from app.section_compression import report
+    # Sin el espacio de las versiones anteriores de las filas reescritas
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM FULL patients" if engine.dialect.name == "postgresql" else "VACUUM"))
+    return report(engine)
+
+
+def read_latency(engine, ids, rng, requests):
+    from sqlalchemy import select
+    import app.models as models
+    full = select(models.Patient)
+    narrow = select(models.Patient.nombre, models.Patient.tratamiento_farmacologico)
+    result = {}
+    with engine.connect() as conn:
+        for name, statement in (("completa", full), ("dos columnas", narrow)):
+            latencies = []
+            for _ in range(requests):
+                documento_id = rng.choice(ids)
+                t0 = time.perf_counter()
+                conn.execute(statement.where(models.Patient.documento_id == documento_id)).one()
+                latencies.append((time.perf_counter() - t0) * 1000)
+            result[name] = latencies
+    return result
+
+
+def write_latency(engine, rng, requests, first_id):
+    from sqlalchemy import delete, insert
+    import app.models as models
+    rows = [patient_row(rng, str(first_id + i)) for i in range(requests)]
+    latencies = []
+    for row in rows:
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert(models.Patient), [row])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    with engine.begin() as conn:
+        conn.execute(delete(models.Patient).where(models.Patient.documento_id.in_([row["documento_id"] for row in rows])))
+    return latencies
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return f"p50 {statistics.median(latencies):6.3f} ms  p95 {latencies[int(len(latencies) * 0.95) - 1]:6.3f} ms"
+
+
+def mb(value):
+    return f"{value / 2**20:8.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=2000, help="pacientes con los que se entrena el diccionario")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_compression.db"
+    from app import compression
+    from app.database import Base, engine
+    from app.search import setup_search
+    from app.section_compression import backfill, setup_compression, train
+    import app.models as models
+
+    Base.metadata.create_all(engine)
+    setup_compression(engine)
+    setup_search(engine)
+    rng = random.Random(42)
+    ids = [str(SEED_FIRST_ID + i) for i in range(args.patients)]
+
+    # Primero todo sin comprimir, como una base de datos de antes del cambio
+    compression.TEXT_COMPRESSION = False
+    print(f"Insertando {args.patients} pacientes sin comprimir...")
+    seed(engine, args.patients, rng)
+    raw = storage(engine)
+    raw_reads = read_latency(engine, ids, rng, args.requests)
+    raw_writes = write_latency(engine, rng, args.writes, SEED_FIRST_ID + args.patients)
+
+    compression.TEXT_COMPRESSION = True
+    t0 = time.perf_counter()
+    train(engine, sample=args.sample)
+    trained = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    backfill(engine)
+    backfilled = time.perf_counter() - t0
+    compressed = storage(engine)
+    compressed_reads = read_latency(engine, ids, rng, args.requests)
+    compressed_writes = write_latency(engine, rng, args.writes, SEED_FIRST_ID + args.patients)
+
+    print(f"\n{engine.dialect.name}, {args.patients} pacientes, {raw['text_bytes'] / args.patients / 1024:.1f} KB de texto clínico por paciente")
+    print(f"Entrenamiento del diccionario {trained:.1f} s, backfill {backfilled:.1f} s")
+    print(f"Secciones      {mb(raw['stored_bytes'])} -> {mb(compressed['stored_bytes'])}  (ratio {compressed['ratio']})")
+    if "total_bytes" in raw:
+        for key in ("heap_bytes", "toast_bytes", "index_bytes", "total_bytes"):
+            print(f"{key:14} {mb(raw[key])} -> {mb(compressed[key])}")
+    for name in raw_reads:
+        print(f"Lectura {name:13} sin comprimir {summary(raw_reads[name])}   comprimida {summary(compressed_reads[name])}")
+    print(f"Escritura             sin comprimir {summary(raw_writes)}   comprimida {summary(compressed_writes)}")
+
+
+if __name__ == "__main__":
+    main()
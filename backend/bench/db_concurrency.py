@@ -0,0 +1,52 @@
+# bench/db_concurrency.py
+# N lecturas simultáneas de /paciente; ejecutar una vez con DB_ASYNC=false y otra con DB_ASYNC=true.
+#
+#   DB_ASYNC=true uvicorn app.main:app --port 8000 &
+#   python bench/db_concurrency.py --url http://localhost:8000 --concurrency 1000
+import argparse
+import asyncio
+import time
+
+from common import client as make_client, ensure_patient, login, percentile
+
+
+async def run(args):
+    async with make_client(args.url, connections=args.concurrency + 5) as client:
+        admin = await login(client, "admisionista", "admision", "admision123")
+        await ensure_patient(client, admin, args.documento)
+        medico = await login(client, "medico", "gabriel", "medico123")
+        path = f"/paciente/{args.documento}"
+        # Calentamiento: abre conexiones HTTP y del pool
+        await asyncio.gather(*(client.get(path, headers=medico) for _ in range(20)))
+
+        for round_ in range(args.rounds):
+            latencies = []
+            errors = 0
+
+            async def one():
+                nonlocal errors
+                start = time.perf_counter()
+                r = await client.get(path, headers=medico)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if r.status_code != 200:
+                    errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+            print(f"ronda {round_ + 1}: {args.concurrency} lecturas en {elapsed:.2f}s  "
+                  f"{args.concurrency / elapsed:.0f} req/s  p50={percentile(latencies, 50):.0f}ms  "
+                  f"p99={percentile(latencies, 99):.0f}ms  errores={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--documento", default="900000001")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
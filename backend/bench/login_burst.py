@@ -0,0 +1,76 @@
+# bench/login_burst.py
+# Latencia de endpoints no-login durante una ráfaga de logins.
+#
+#   uvicorn app.main:app --port 8000 &
+#   python bench/login_burst.py --url http://localhost:8000 --logins 500 --documento 123
+import argparse
+import asyncio
+import statistics
+import time
+
+from common import client as make_client, percentile
+
+
+async def reader(client, paths, headers, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        await client.get(path, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def login(client, username, password, status_counts):
+    r = await client.post("/token/medico", data={"username": username, "password": password})
+    status_counts[r.status_code] = status_counts.get(r.status_code, 0) + 1
+
+
+async def run(args):
+    async with make_client(args.url, connections=args.logins + args.readers + 10) as client:
+        r = await client.post("/token/medico", data={"username": args.username, "password": args.password})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        paths = ["/perfil"]
+        if args.documento:
+            paths.append(f"/paciente/{args.documento}")
+
+        async def measure(burst):
+            stop = asyncio.Event()
+            latencies = []
+            status_counts = {}
+            tasks = [asyncio.create_task(reader(client, paths, headers, stop, latencies)) for _ in range(args.readers)]
+            start = time.perf_counter()
+            if burst:
+                await asyncio.gather(*(login(client, args.username, args.password, status_counts) for _ in range(args.logins)))
+            else:
+                await asyncio.sleep(args.baseline_seconds)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await asyncio.gather(*tasks)
+            return latencies, status_counts, elapsed
+
+        for label, burst in (("sin ráfaga", False), (f"ráfaga de {args.logins} logins", True)):
+            latencies, status_counts, elapsed = await measure(burst)
+            print(f"== {label} ({elapsed:.1f}s)")
+            print(f"   lecturas: {len(latencies)}  p50={percentile(latencies, 50):.1f}ms  "
+                  f"p95={percentile(latencies, 95):.1f}ms  p99={percentile(latencies, 99):.1f}ms  "
+                  f"media={statistics.mean(latencies) if latencies else 0:.1f}ms")
+            if status_counts:
+                print(f"   logins por status: {dict(sorted(status_counts.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="gabriel")
+    parser.add_argument("--password", default="medico123")
+    parser.add_argument("--documento", default=None, help="documento_id existente para leer /paciente")
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
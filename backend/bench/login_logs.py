@@ -0,0 +1,114 @@
+# bench/login_logs.py
+# Latencia de GET /login_logs con la tabla llena (por defecto 50M filas repartidas en 24 meses).
+# Los datos se generan dentro de la base de datos (generate_series / CTE recursiva).
+#
+#   DATABASE_URL=postgresql+psycopg2://... python bench/login_logs.py --rows 50000000
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+CHUNK = 2_000_000
+
+
+def seed(engine, rows, months):
+    from sqlalchemy import func, select, text
+    import app.models as models
+    from app.login_logs import add_months, ensure_partitions, month_start
+
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(models.LoginLog)).scalar()
+    if existing >= rows:
+        return
+    now = datetime.now()
+    start = add_months(month_start(now), -months)
+    seconds = int((now - start).total_seconds())
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            ensure_partitions(conn, start, now)
+        generate = """
+            INSERT INTO login_logs (username, role, "timestamp", ip_address)
+            SELECT 'user' || (g % 50000), (ARRAY['medico','paciente','admisionista'])[1 + g % 3],
+                   timestamp :start + make_interval(secs => (g::bigint * :step) % :seconds),
+                   '10.0.' || (g % 256) || '.' || (g % 97)
+            FROM generate_series(:first, :last) g
+        """
+    else:
+        generate = """
+            WITH RECURSIVE s(g) AS (SELECT :first UNION ALL SELECT g + 1 FROM s WHERE g < :last)
+            INSERT INTO login_logs (username, role, "timestamp", ip_address)
+            SELECT 'user' || (g % 50000), CASE g % 3 WHEN 0 THEN 'medico' WHEN 1 THEN 'paciente' ELSE 'admisionista' END,
+                   datetime(:start, '+' || ((g * :step) % :seconds) || ' seconds'),
+                   '10.0.' || (g % 256) || '.' || (g % 97)
+            FROM s
+        """
+    print(f"Insertando {rows - existing} filas...")
+    t0 = time.perf_counter()
+    for first in range(existing, rows, CHUNK):
+        last = min(first + CHUNK, rows) - 1
+        with engine.begin() as conn:
+            conn.execute(text(generate), {"start": start.isoformat(sep=" "), "step": 7919, "seconds": seconds,
+                                          "first": first, "last": last})
+        print(f"  {last + 1} filas ({time.perf_counter() - t0:.0f}s)", flush=True)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE login_logs"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_login_logs.db"
+    os.environ.setdefault("AUTH_MODE", "claims")
+    from fastapi.testclient import TestClient
+    from app.database import engine
+    from app.main import app
+
+    seed(engine, args.rows, args.months)
+
+    recent = datetime.now() - timedelta(days=45)
+    cases = [
+        ("primera página", {}),
+        ("rango de un mes", {"desde": recent.date().isoformat(), "hasta": (recent + timedelta(days=30)).date().isoformat()}),
+        ("usuario", {"username": "user123"}),
+        ("usuario + rango", {"username": "user123", "desde": recent.date().isoformat()}),
+        ("IP", {"ip": "10.0.7.7"}),
+        ("rol", {"role": "medico"}),
+    ]
+    with TestClient(app) as client:
+        r = client.post("/token/admisionista", data={"username": "admision", "password": "admision123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for label, params in cases:
+            samples = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                r = client.get("/login_logs", params={**params, "limit": 50}, headers=headers)
+                samples.append((time.perf_counter() - t0) * 1000)
+            body = r.json()
+            # Página 20 siguiendo el cursor
+            cursor_ms = []
+            cursor = body["next"]
+            for _ in range(20):
+                if not cursor:
+                    break
+                t0 = time.perf_counter()
+                page = client.get("/login_logs", params={**params, "limit": 50, "cursor": cursor}, headers=headers).json()
+                cursor_ms.append((time.perf_counter() - t0) * 1000)
+                cursor = page["next"]
+            samples.sort()
+            print(f"{label:<18} p50 {statistics.median(samples):7.1f} ms  p95 {samples[int(len(samples) * 0.95) - 1]:7.1f} ms  "
+                  f"cursor p50 {statistics.median(cursor_ms) if cursor_ms else 0:6.1f} ms  ({len(body['items'])} filas)")
+
+
+if __name__ == "__main__":
+    main()
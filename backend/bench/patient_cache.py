@@ -0,0 +1,81 @@
+# bench/patient_cache.py
+# GET /paciente con y sin la caché de pacientes: latencia por petición y consultas SQL.
+# El mismo paciente se pide una y otra vez, como cuando el personal reabre una historia durante el turno.
+#
+#   DATABASE_URL=postgresql+psycopg2://... python bench/patient_cache.py --requests 2000
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def measure(client, headers, documento_id, requests):
+    from app.metrics import REQUEST_DB_QUERIES
+    route = REQUEST_DB_QUERIES.labels("/paciente/{documento_id}")
+    queries_before = route._sum.get()
+    latencies = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        r = client.get(f"/paciente/{documento_id}", headers=headers)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert r.status_code == 200, r.text
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "rps": requests / (sum(latencies) / 1000),
+        "queries": (route._sum.get() - queries_before) / requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--admissions", type=int, default=50)
+    parser.add_argument("--section-kb", type=int, default=4, help="tamaño aproximado de cada sección clínica")
+    parser.add_argument("--documento-id", default="900000001")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_patient_cache.db"
+    os.environ.setdefault("AUTH_MODE", "claims")
+    os.environ.setdefault("PATIENT_CACHE_BACKEND", "local")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.patient_cache import patient_cache
+    import app.models as models
+
+    with TestClient(app) as client:
+        r = client.post("/token/admisionista", data={"username": "admision", "password": "admision123"})
+        admision = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = client.post("/token/medico", data={"username": "gabriel", "password": "medico123"})
+        medico = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        text = ("Paciente estable, sin cambios relevantes en la exploración. " * 64)[:args.section_kb * 1024]
+        client.post("/users", headers=admision, data={
+            "documento_id": args.documento_id, "nombre": "Bench", "apellido": "Caché", "fecha_nacimiento": "1980-01-01",
+            "role": "paciente", **{section: text for section in models.PATIENT_SECTIONS if section != "notas_medico"},
+        })
+        for i in range(args.admissions):
+            client.post("/admission", headers=admision, json={
+                "documento_id": args.documento_id, "fecha_ingreso": f"2024-01-01T{i % 24:02d}:{i % 60:02d}", "motivo": "Control",
+            })
+
+        backend = patient_cache.backend
+        patient_cache.backend = None
+        uncached = measure(client, medico, args.documento_id, args.requests)
+        patient_cache.backend = backend
+        cached = measure(client, medico, args.documento_id, args.requests)
+
+    print(f"Paciente con {args.admissions} admisiones y secciones de ~{args.section_kb} KB, {args.requests} peticiones")
+    for name, result in (("sin caché", uncached), ("con caché", cached)):
+        print(f"{name:10} p50 {result['p50']:6.2f} ms  p95 {result['p95']:6.2f} ms  {result['rps']:7.0f} req/s  "
+              f"{result['queries']:.2f} consultas/petición")
+
+
+if __name__ == "__main__":
+    main()
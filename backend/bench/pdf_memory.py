@@ -0,0 +1,68 @@
+# bench/pdf_memory.py
+# Memoria pico y tiempo de exportar_pdf con una historia sintética grande.
+#
+#   python bench/pdf_memory.py --mb 50
+#
+# "buffer" reproduce el camino anterior (BytesIO + getvalue + Response en memoria);
+# "spool" usa render_spooled + iter_file como hace ahora exportar_pdf.
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+LINE = "Paciente estable, afebril, tolera vía oral. Se mantiene tratamiento y control de constantes.\n"
+
+
+def synthetic_patient(mb):
+    from app.pdf import SECTIONS
+    patient = SimpleNamespace(documento_id="1", nombre="Bench", apellido="Paciente",
+                              fecha_nacimiento="1950-01-01", fecha_creacion="2000-01-01", version=1,
+                              **{column: "" for _, column in SECTIONS})
+    patient.evolucion_clinica = LINE * int(mb * 1024 * 1024 / len(LINE))
+    return patient
+
+
+def run_mode(mode, mb, queue):
+    from app import pdf
+    patient = synthetic_patient(mb)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "buffer":
+        body = pdf.render_historia(patient, [])
+        # Response(content=...) guarda su propia copia del cuerpo
+        response_body = bytes(bytearray(body))
+        size = len(response_body)
+    else:
+        spool, size = pdf.render_spooled(patient, [])
+        for _ in pdf.iter_file(spool):
+            pass
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((mode, size, elapsed, (peak_rss - base_rss) / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=50.0, help="tamaño de evolucion_clinica en MB")
+    parser.add_argument("--spool-max-memory", type=int, default=None, help="PDF_SPOOL_MAX_MEMORY en bytes")
+    args = parser.parse_args()
+    if args.spool_max_memory is not None:
+        os.environ["PDF_SPOOL_MAX_MEMORY"] = str(args.spool_max_memory)
+
+    queue = multiprocessing.Queue()
+    for mode in ("buffer", "spool"):
+        # Un proceso por modo para que ru_maxrss no se contamine entre mediciones
+        proc = multiprocessing.Process(target=run_mode, args=(mode, args.mb, queue))
+        proc.start()
+        proc.join()
+        mode, size, elapsed, delta_mb = queue.get()
+        print(f"{mode:<7} pdf={size / 1024 / 1024:.1f}MB  tiempo={elapsed:.1f}s  memoria pico sobre la base={delta_mb:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
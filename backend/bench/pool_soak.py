@@ -0,0 +1,71 @@
+# bench/pool_soak.py
+# Prueba de resistencia: el número de conexiones del pool debe mantenerse plano.
+#
+#   uvicorn app.main:app --port 8000 &
+#   python bench/pool_soak.py --url http://localhost:8000 --requests 100000
+import argparse
+import asyncio
+import sys
+
+from common import client as make_client, ensure_patient, login
+
+
+async def run(args):
+    async with make_client(args.url, connections=args.concurrency + 5) as client:
+        admin = await login(client, "admisionista", "admision", "admision123")
+        await ensure_patient(client, admin, args.documento)
+        medico = await login(client, "medico", "gabriel", "medico123")
+        requests = [
+            ("/perfil", medico),
+            (f"/paciente/{args.documento}", medico),
+            (f"/exportar_pdf/{args.documento}", medico),
+            ("/login_logs?limit=20", admin),
+        ]
+
+        counter = iter(())
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                path, headers = requests[i % len(requests)]
+                r = await client.get(path, headers=headers)
+                if r.status_code >= 500:
+                    errors += 1
+
+        samples = []
+
+        async def sample(done):
+            r = await client.get("/metrics/pool")
+            stats = r.json()
+            samples.append(stats)
+            print(f"{done:>8} peticiones  checked_out={stats.get('checked_out')}  "
+                  f"pool={stats.get('checked_in', 0) + stats.get('checked_out', 0)}  "
+                  f"overflow={stats.get('overflow')}  wait_max={stats['wait_seconds_max'] * 1000:.1f}ms  "
+                  f"timeouts={stats['timeouts']}")
+
+        await sample(0)
+        step = max(args.requests // 10, 1)
+        for done in range(step, args.requests + 1, step):
+            counter = iter(range(step))
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            await sample(done)
+
+        first, last = samples[0], samples[-1]
+        opened = [s.get("checked_in", 0) + s.get("checked_out", 0) for s in samples[1:]]
+        flat = last.get("checked_out", 0) <= first.get("checked_out", 0) + 1 and max(opened) == min(opened)
+        print(f"errores 5xx: {errors}  conexiones estables: {'sí' if flat else 'NO'}")
+        return 0 if flat and errors == 0 else 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--documento", default="900000001")
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
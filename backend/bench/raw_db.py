@@ -0,0 +1,172 @@
+# bench/raw_db.py
+# Acceso directo con psycopg2 (app/db.py): conexión nueva por consulta (como el app/db.py anterior)
+# frente al pool, con y sin sentencias preparadas, y N lecturas sueltas frente a una lectura en lote.
+# Solo PostgreSQL/Citus.
+#
+#   DATABASE_URL=postgresql+psycopg2://... python bench/raw_db.py --patients 2000 --requests 2000
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+SEED_FIRST_ID = 800_000_000
+SEED_BATCH = 1000
+
+
+def seed(engine, patients, rng):
+    from sqlalchemy import insert
+    from compression import patient_row
+    import app.models as models
+    for first in range(0, patients, SEED_BATCH):
+        documento_ids = [str(SEED_FIRST_ID + i) for i in range(first, min(first + SEED_BATCH, patients))]
+        with engine.begin() as conn:
+            conn.execute(insert(models.Patient), [patient_row(rng, d) for d in documento_ids])
+            conn.execute(insert(models.Admission), [
+                {"documento_id": d, "fecha_ingreso": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T10:00:00",
+                 "motivo": "Ingreso programado", "admisionista_id": 1}
+                for d in documento_ids for _ in range(rng.randint(1, 5))
+            ])
+
+
+def cleanup(engine):
+    from sqlalchemy import delete
+    import app.models as models
+    first, last = str(SEED_FIRST_ID), str(SEED_FIRST_ID * 2)
+    with engine.begin() as conn:
+        for model in (models.Admission, models.Patient):
+            conn.execute(delete(model).where(model.documento_id >= first, model.documento_id < last))
+
+
+def per_call_connect(url):
+    # El app/db.py anterior: psycopg2.connect en cada consulta
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    from app.db import PREPARED
+
+    query = PREPARED["paciente"][1].replace("$1", "%s")
+
+    def fetch(documento_id):
+        conn = psycopg2.connect(url, cursor_factory=RealDictCursor)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, (documento_id,))
+                return cur.fetchone()
+        finally:
+            conn.close()
+    return fetch
+
+
+def pooled_unprepared():
+    # Mismo pool, consulta enviada y planificada en cada llamada
+    from app import db
+    query = db.PREPARED["paciente"][1].replace("$1", "%s")
+
+    def fetch(documento_id):
+        with db.connection(readonly=True) as conn, conn.cursor() as cur:
+            cur.execute(query, (documento_id,))
+            return cur.fetchone()
+    return fetch
+
+
+def pooled_prepared():
+    from app import db
+    return lambda documento_id: db.execute_prepared("paciente", (documento_id,))
+
+
+def latencies(fetch, ids, rng, requests):
+    result = []
+    for _ in range(requests):
+        documento_id = rng.choice(ids)
+        t0 = time.perf_counter()
+        fetch(documento_id)
+        result.append((time.perf_counter() - t0) * 1000)
+    return result
+
+
+def throughput(fetch, ids, threads, seconds):
+    done = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def worker(n):
+        rng = random.Random(n)
+        while time.perf_counter() < stop:
+            fetch(rng.choice(ids))
+            done[n] += 1
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(done) / seconds
+
+
+def summary(values):
+    values = sorted(values)
+    return f"p50 {statistics.median(values):7.3f} ms  p95 {values[int(len(values) * 0.95) - 1]:7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50, help="pacientes por lectura en lote")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    from app import db
+    from app.database import Base, engine
+    if engine.dialect.name != "postgresql":
+        sys.exit("bench/raw_db.py necesita DATABASE_URL de PostgreSQL")
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    ids = [str(SEED_FIRST_ID + i) for i in range(args.patients)]
+    cleanup(engine)
+    print(f"Insertando {args.patients} pacientes...")
+    seed(engine, args.patients, rng)
+
+    try:
+        variants = {
+            "conexión por consulta": per_call_connect(db._libpq_url(db.DATABASE_URL)),
+            "pool sin preparar": pooled_unprepared(),
+            "pool + preparada": pooled_prepared(),
+        }
+        for fetch in variants.values():
+            fetch(ids[0])  # pool creado y sentencia preparada antes de medir
+        print(f"\nPaciente por documento_id, {args.requests} lecturas, un hilo")
+        for name, fetch in variants.items():
+            requests = args.requests // 10 if name == "conexión por consulta" else args.requests
+            print(f"  {name:24} {summary(latencies(fetch, ids, rng, requests))}")
+
+        print(f"\nHistoria completa + admisiones de {args.batch} pacientes")
+        single, batch = [], []
+        for _ in range(max(args.requests // args.batch, 10)):
+            chosen = rng.sample(ids, args.batch)
+            t0 = time.perf_counter()
+            for documento_id in chosen:
+                db.fetch_paciente(documento_id)
+                db.fetch_admisiones(documento_id)
+            single.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            patients = db.fetch_pacientes(chosen)
+            admissions = db.fetch_admisiones_pacientes(chosen)
+            batch.append((time.perf_counter() - t0) * 1000)
+            assert len(patients) == len(admissions) == args.batch
+        print(f"  {'una a una':24} {summary(single)}")
+        print(f"  {'en lote':24} {summary(batch)}")
+
+        print(f"\nRendimiento con {args.threads} hilos durante {args.seconds:.0f} s (DB_RAW_POOL_MAX={db.DB_RAW_POOL_MAX})")
+        for name, fetch in variants.items():
+            print(f"  {name:24} {throughput(fetch, ids, args.threads, args.seconds):8.0f} lecturas/s")
+    finally:
+        db.close_pools()
+        cleanup(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench/search.py
+# Latencia de la búsqueda de pacientes con el índice (FTS5 en SQLite, GIN en PostgreSQL).
+#
+#   python bench/search.py --patients 1000000
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+NOMBRES = ["Ana", "Álvaro", "Lucía", "Carlos", "María", "José", "Sofía", "Andrés", "Valentina", "Diego", "Camila", "Juan"]
+APELLIDOS = ["Gómez", "Rodríguez", "Pérez", "López", "Martínez", "García", "Hernández", "Díaz", "Torres", "Ramírez"]
+ANTECEDENTES = ["diabetes tipo 2", "hipertensión arterial", "asma", "EPOC", "hipotiroidismo", "sin antecedentes", "dislipidemia"]
+FARMACOS = ["metformina 850mg", "losartán 50mg", "salbutamol inhalado", "levotiroxina 50mcg", "atorvastatina 20mg", "omeprazol 20mg"]
+
+QUERIES = [
+    ("prefijo de nombre", "alv", None),
+    ("nombre y apellido", "lucia gom", None),
+    ("palabra clínica", "metformina", None),
+    ("dos palabras", "diabetes metformina", None),
+    ("campo concreto", "asma", "antecedentes_interes"),
+    ("sin resultados", "zzzzz", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_search.db"
+    from sqlalchemy import func, insert, select
+    from app.database import Base, SessionLocal, ThreadedSession, engine
+    from app.search import index_patients, search_patients, setup_search
+    from app.section_compression import setup_compression
+    import app.models as models
+
+    Base.metadata.create_all(engine)
+    setup_compression(engine)
+    setup_search(engine)
+
+    with SessionLocal() as db:
+        existing = db.scalar(select(func.count(models.Patient.id)))
+    rng = random.Random(42)
+    if existing < args.patients:
+        print(f"Insertando {args.patients - existing} pacientes...")
+        start = time.perf_counter()
+        batch = []
+        with engine.begin() as conn:
+            for i in range(existing, args.patients):
+                batch.append({
+                    "documento_id": str(10_000_000 + i),
+                    "nombre": rng.choice(NOMBRES),
+                    "apellido": f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+                    "fecha_nacimiento": "1980-01-01",
+                    "fecha_creacion": "2024-01-01T00:00:00",
+                    "antecedentes_interes": rng.choice(ANTECEDENTES),
+                    "tratamiento_farmacologico": rng.choice(FARMACOS),
+                    "evolucion_clinica": f"Paciente estable en control {i % 97}",
+                })
+                if len(batch) == 20_000:
+                    conn.execute(insert(models.Patient), batch)
+                    index_patients(conn, batch)
+                    batch.clear()
+            if batch:
+                conn.execute(insert(models.Patient), batch)
+                index_patients(conn, batch)
+        print(f"  {time.perf_counter() - start:.1f} s")
+
+    async def run():
+        db = ThreadedSession(SessionLocal())
+        try:
+            for label, q, campos in QUERIES:
+                fields = {campos} if campos else None
+                samples = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    items = await search_patients(db, q, fields, limit=20)
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                print(f"{label:<20} {q!r:<24} p50 {statistics.median(samples):7.2f} ms  "
+                      f"p95 {samples[int(len(samples) * 0.95) - 1]:7.2f} ms  ({len(items)} resultados)")
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
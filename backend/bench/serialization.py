@@ -0,0 +1,114 @@
+# bench/serialization.py
+# Historias de 10 KB a 5 MB: CPU de serialización (jsonable_encoder + json frente a orjson), tamaño y CPU
+# de la compresión (gzip y brotli a varios niveles) y GET /paciente completo con cada Accept-Encoding.
+#
+#   python bench/serialization.py
+#   python bench/serialization.py --sizes 10000,100000,1000000,5000000 --repeat 20
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from compression import clinical_text
+
+SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+GZIP_LEVELS = [1, 6, 9]
+BROTLI_QUALITIES = [1, 4, 6, 11]
+
+
+def history(rng, size):
+    import app.models as models
+    data = {"documento_id": "900000000", "nombre": "Bench", "apellido": "Serialización", "fecha_nacimiento": "1970-01-01",
+            "fecha_creacion": "2024-01-01T00:00:00", "version": 1, "admissions_truncated": False,
+            "admissions": [{"id": i, "fecha_ingreso": datetime(2024, 1, 1 + i % 28, 10), "motivo": "Ingreso programado"}
+                           for i in range(20)]}
+    per_section = size // len(models.PATIENT_SECTIONS)
+    for section in models.PATIENT_SECTIONS:
+        data[section] = clinical_text(rng, per_section) if per_section else ""
+    return data
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), result
+
+
+def human(size):
+    return f"{size / 1024:.0f} KB" if size < 2**20 else f"{size / 2**20:.1f} MB"
+
+
+def cpu(sizes, repeat, rng):
+    import brotli
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from app.responses import ORJSONResponse
+
+    for size in sizes:
+        data = history(rng, size)
+        # Lo que hacía FastAPI con el dict devuelto: jsonable_encoder y JSONResponse (json.dumps)
+        before, body = timed(lambda: json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode(), repeat)
+        after, orjson_body = timed(lambda: ORJSONResponse(data).body, repeat)
+        assert orjson.loads(orjson_body) == json.loads(body)
+        print(f"\nHistoria de {human(len(body))} en JSON")
+        print(f"  serialización  jsonable_encoder+json {before:8.2f} ms   orjson {after:8.2f} ms")
+        rows = [(f"gzip {level}", lambda level=level: gzip.compress(body, compresslevel=level, mtime=0)) for level in GZIP_LEVELS]
+        rows += [(f"brotli {quality}", lambda quality=quality: brotli.compress(body, quality=quality)) for quality in BROTLI_QUALITIES]
+        for name, function in rows:
+            elapsed, compressed = timed(function, max(1, repeat // 5) if "11" in name else repeat)
+            print(f"  {name:10} {human(len(compressed)):>9} ({len(compressed) / len(body):6.1%})  {elapsed:8.2f} ms")
+
+
+def end_to_end(sizes, repeat, rng):
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_serialization.db")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        token = client.post("/token/medico", data={"username": "gabriel", "password": "medico123"}).json()["access_token"]
+        admin = client.post("/token/admisionista", data={"username": "admision", "password": "admision123"}).json()["access_token"]
+        print("\nGET /paciente (TestClient, sin red): bytes enviados y latencia p50")
+        for size in sizes:
+            documento_id = f"9{size}"
+            data = history(rng, size)
+            form = {k: data[k] for k in ("nombre", "apellido", "fecha_nacimiento")}
+            form.update({s: data[s] for s in data if s not in ("documento_id", "nombre", "apellido", "fecha_nacimiento",
+                                                                  "fecha_creacion", "version", "admissions_truncated", "admissions")})
+            response = client.post("/users", data={"documento_id": documento_id, "role": "paciente", **form},
+                                   headers={"Authorization": f"Bearer {admin}"})
+            assert response.status_code == 200, response.text
+            line = []
+            for encoding in ("identity", "gzip", "br"):
+                headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+                elapsed, response = timed(lambda: client.get(f"/paciente/{documento_id}", headers=headers), repeat)
+                sent = int(response.headers.get("content-length", len(response.content)))
+                line.append(f"{encoding} {human(sent):>9} {elapsed:7.2f} ms")
+            print(f"  {human(size):>7}  " + "   ".join(line))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="tamaño del texto clínico, en bytes")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--no-http", action="store_true", help="solo CPU, sin GET /paciente")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    rng = random.Random(42)
+    cpu(sizes, args.repeat, rng)
+    if not args.no_http:
+        end_to_end(sizes, args.repeat, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench/startup.py
+# Tiempo de arranque: importación de app.main, bootstrap de la base de datos (vacía y ya preparada) y
+# desde que se lanza uvicorn hasta que /health/ready responde 200. Cada medida en un proceso nuevo.
+# Con --max-ready-seconds termina con código 1 si el arranque supera el límite (para CI).
+#
+#   python bench/startup.py --runs 5 --max-ready-seconds 5
+#   DATABASE_URL=postgresql+psycopg2://... python bench/startup.py --out startup.json
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_python(args, env):
+    t0 = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=BACKEND, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - t0
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} falló:\n{result.stderr[-2000:]}")
+    return elapsed, result.stdout
+
+
+def time_to_ready(env, timeout=60):
+    port = _free_port()
+    t0 = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health/ready", timeout=1).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn terminó al arrancar")
+            time.sleep(0.02)
+        raise RuntimeError("uvicorn no estuvo listo a tiempo")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ready-seconds", type=float, help="falla si la mediana hasta /health/ready lo supera")
+    parser.add_argument("--out", help="fichero JSON con los resultados")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_startup.db")
+    # Como en Kubernetes: la base de datos la prepara el bootstrap y los workers solo arrancan
+    env["BOOTSTRAP_ON_STARTUP"] = "false"
+
+    first_bootstrap, _ = run_python(["-m", "app.bootstrap"], env)
+    bootstrap = [run_python(["-m", "app.bootstrap"], env)[0] for _ in range(args.runs)]
+    imports = [float(run_python(["-c", IMPORT_SNIPPET], env)[1].strip().splitlines()[-1]) for _ in range(args.runs)]
+    ready = [time_to_ready(env) for _ in range(args.runs)]
+
+    results = {
+        "database": env["DATABASE_URL"].split(":", 1)[0],
+        "runs": args.runs,
+        "bootstrap_first_seconds": first_bootstrap,
+        "bootstrap_seconds": statistics.median(bootstrap),
+        "import_seconds": statistics.median(imports),
+        "ready_seconds": statistics.median(ready),
+        "ready_max_seconds": max(ready),
+    }
+    print(f"Bootstrap (base de datos vacía)      {first_bootstrap:6.2f} s")
+    print(f"Bootstrap (ya preparada)             {results['bootstrap_seconds']:6.2f} s  (mediana, proceso completo)")
+    print(f"Importación de app.main              {results['import_seconds']:6.2f} s")
+    print(f"Lanzamiento -> /health/ready         {results['ready_seconds']:6.2f} s  (máximo {results['ready_max_seconds']:.2f} s)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.max_ready_seconds is not None and results["ready_seconds"] > args.max_ready_seconds:
+        print(f"El arranque supera {args.max_ready_seconds} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
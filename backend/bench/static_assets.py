@@ -0,0 +1,105 @@
+# bench/static_assets.py
+# Bytes transferidos y tiempo hasta interactivo de la carga del frontend (/ y sus CSS/JS), en primera visita
+# y en visitas siguientes con la caché del navegador (Cache-Control y ETag/304), en tres escenarios:
+#   original      index.html y /static sin comprimir ni cachear (antes de la compresión y del build)
+#   sin build     la compresión dinámica de CompressionMiddleware, sin python -m app.assets
+#   build         app/static/dist: minificado, .br ya comprimido, nombres con hash y caché inmutable
+# El tiempo hasta interactivo se modela por perfil de red: el HTML y luego sus recursos en paralelo, cada
+# petición con un RTT más sus bytes entre el ancho de banda, más el tiempo de servidor medido. El JS de la
+# aplicación solo registra manejadores al cargarse, así que su ejecución no cambia entre escenarios.
+#
+#   python -m app.assets && python bench/static_assets.py
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# nombre: (RTT en segundos, bytes por segundo)
+PROFILES = {"3G": (0.150, 1.6e6 / 8), "4G": (0.050, 20e6 / 8), "fibra": (0.010, 300e6 / 8)}
+SUBRESOURCE_RE = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+# Cabeceras de respuesta aproximadas por petición (HTTP/1.1 sin comprimir cabeceras)
+HEADER_BYTES = 250
+
+
+class Browser:
+    # Caché de navegador mínima: sirve sin pedir lo que sigue fresco y revalida con If-None-Match lo demás
+    def __init__(self, client, accept_encoding):
+        self.client = client
+        self.accept_encoding = accept_encoding
+        self.cache = {}
+
+    async def get(self, path):
+        cached = self.cache.get(path)
+        if cached and "immutable" in cached["cache_control"]:
+            return {"path": path, "bytes": 0, "requests": 0, "server": 0.0, "body": cached["body"]}
+        headers = {"Accept-Encoding": self.accept_encoding}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        t0 = time.perf_counter()
+        response = await self.client.get(path, headers=headers)
+        server = time.perf_counter() - t0
+        sent = int(response.headers.get("content-length", len(response.content))) if response.status_code != 304 else 0
+        if response.status_code == 200:
+            self.cache[path] = {"body": response.text, "etag": response.headers.get("etag"),
+                                "cache_control": response.headers.get("cache-control", "")}
+        body = self.cache[path]["body"]
+        return {"path": path, "bytes": sent + HEADER_BYTES, "requests": 1, "server": server, "body": body}
+
+    async def load(self):
+        page = await self.get("/")
+        resources = await asyncio.gather(*[self.get(path) for path in SUBRESOURCE_RE.findall(page["body"])])
+        return page, list(resources)
+
+
+def time_to_interactive(page, resources, rtt, bandwidth):
+    html = page["requests"] * rtt + page["bytes"] / bandwidth + page["server"]
+    pending = [r for r in resources if r["requests"]]
+    if not pending:
+        return html
+    return html + rtt + sum(r["bytes"] for r in pending) / bandwidth + max(r["server"] for r in pending)
+
+
+async def scenario(app, accept_encoding, visits):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        browser = Browser(client, accept_encoding)
+        return [await browser.load() for _ in range(visits)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visits", type=int, default=3, help="la primera con la caché vacía")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_static.db")
+    import app.main as main_module
+    if not main_module.static_assets.assets:
+        sys.exit("Sin build: ejecutar antes python -m app.assets")
+    built = main_module.static_assets.assets
+
+    results = {}
+    main_module.static_assets.assets = {}
+    results["original"] = asyncio.run(scenario(main_module.app, "identity", args.visits))
+    results["sin build"] = asyncio.run(scenario(main_module.app, "gzip, deflate, br", args.visits))
+    main_module.static_assets.assets = built
+    results["build"] = asyncio.run(scenario(main_module.app, "gzip, deflate, br", args.visits))
+
+    for visit in range(args.visits):
+        print(f"\n{'Primera visita (caché vacía)' if visit == 0 else f'Visita {visit + 1} (con caché)'}")
+        print(f"  {'escenario':10} {'peticiones':>10} {'bytes':>9}   " + "   ".join(f"TTI {name:>5}" for name in PROFILES))
+        for name, loads in results.items():
+            page, resources = loads[visit]
+            requests = page["requests"] + sum(r["requests"] for r in resources)
+            sent = page["bytes"] + sum(r["bytes"] for r in resources)
+            ttis = [time_to_interactive(page, resources, rtt, bw) * 1000 for rtt, bw in PROFILES.values()]
+            print(f"  {name:10} {requests:10} {sent:9}   " + "   ".join(f"{tti:6.0f} ms" for tti in ttis))
+
+
+if __name__ == "__main__":
+    main()
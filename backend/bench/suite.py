@@ -0,0 +1,291 @@
+# bench/suite.py
+# Suite de carga reproducible: siembra un conjunto sintético (pacientes con secciones de longitud realista,
+# admisiones y logs de login) y mide req/s y latencias p50/p95/p99 de los endpoints principales.
+# El resultado se guarda en JSON para comparar ejecuciones (--compare).
+#
+#   python bench/suite.py                                   # SQLite temporal, arranca uvicorn
+#   DATABASE_URL=postgresql+psycopg2://... python bench/suite.py --patients 50000 --out pg.json
+#   python bench/suite.py --url http://localhost:8000 --no-seed --compare antes.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from common import client as make_client, login, percentile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+# Todos los pacientes sembrados comparten contraseña: se hashea una sola vez
+SEED_PASSWORD = "bench123"
+SEED_FIRST_ID = 800_000_000
+SEED_BATCH = 1000
+
+# Longitud aproximada (caracteres) de cada sección: la mayoría cortas, evolución y órdenes largas
+SECTION_LENGTHS = {
+    "antecedentes_interes": 400,
+    "anamnesis_exploracion": 1500,
+    "evolucion_clinica": 4000,
+    "ordenes_medicas": 1200,
+    "tratamiento_farmacologico": 800,
+    "planificacion_cuidados": 600,
+    "constantes_datos_basicos": 300,
+    "informacion_alta": 1000,
+    "datos_sociales": 200,
+}
+
+WORDS = ("paciente refiere dolor abdominal fiebre tratamiento control tensión arterial analítica normal "
+         "evolución favorable alta domicilio pauta revisión semanas hipertensión diabetes insulina "
+         "exploración abdomen blando depresible radiografía tórax sin hallazgos consulta urgencias").split()
+
+SCENARIOS = ["login_medico", "login_paciente", "get_paciente", "update_paciente",
+             "create_admission", "exportar_pdf", "login_logs"]
+
+
+def _text(rng, length):
+    if not length:
+        return ""
+    length = int(rng.uniform(0.5, 1.5) * length)
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def seed(patients, admissions, login_logs, rng):
+    from sqlalchemy import func, insert, select
+    from app.database import engine
+    from app.hashing import pwd_context
+    from app.search import index_patients
+    import app.models as models
+
+    with engine.connect() as conn:
+        existing = conn.execute(
+            select(func.count()).select_from(models.Patient).where(models.Patient.documento_id >= str(SEED_FIRST_ID))
+        ).scalar()
+    if existing >= patients:
+        print(f"Conjunto ya sembrado ({existing} pacientes)")
+        return
+
+    print(f"Sembrando {patients - existing} pacientes, ~{admissions} admisiones y {login_logs} logs de login por paciente...")
+    hashed = pwd_context.hash(SEED_PASSWORD)
+    now = datetime.now()
+    t0 = time.perf_counter()
+    for first in range(existing, patients, SEED_BATCH):
+        ids = [str(SEED_FIRST_ID + i) for i in range(first, min(first + SEED_BATCH, patients))]
+        users, rows, admission_rows, log_rows = [], [], [], []
+        for documento_id in ids:
+            users.append({"username": documento_id, "hashed_password": hashed, "role": "paciente"})
+            row = {"documento_id": documento_id, "nombre": f"Nombre{documento_id[-4:]}", "apellido": rng.choice(WORDS).title(),
+                   "fecha_nacimiento": "1970-01-01", "fecha_creacion": now.isoformat(), "version": 1}
+            for section in models.PATIENT_SECTIONS:
+                row[section] = _text(rng, SECTION_LENGTHS.get(section, 0))
+            rows.append(row)
+            for _ in range(rng.randint(0, admissions * 2)):
+                admission_rows.append({"documento_id": documento_id, "fecha_ingreso": now - timedelta(days=rng.randint(0, 3650)),
+                                       "motivo": _text(rng, 80), "admisionista_id": 1})
+            for _ in range(login_logs):
+                log_rows.append({"username": documento_id, "role": "paciente",
+                                 "timestamp": now - timedelta(seconds=rng.randint(0, 365 * 86400)), "ip_address": "10.0.0.1"})
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), users)
+            conn.execute(insert(models.Patient), rows)
+            index_patients(conn, rows)
+            if admission_rows:
+                conn.execute(insert(models.Admission), admission_rows)
+            if log_rows:
+                conn.execute(insert(models.LoginLog), log_rows)
+        print(f"  {first + len(ids)} pacientes ({time.perf_counter() - t0:.0f}s)", flush=True)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            httpx.get(url + "/perfil", timeout=1)
+            return process, url
+        except httpx.TransportError:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn terminó al arrancar")
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("uvicorn no arrancó a tiempo")
+
+
+def build_requests(ids, headers):
+    medico, admin = headers["medico"], headers["admisionista"]
+
+    def pick():
+        return random.choice(ids)
+
+    return {
+        "login_medico": lambda: ("POST", "/token/medico", {"data": {"username": "gabriel", "password": "medico123"}}),
+        "login_paciente": lambda: ("POST", "/token/paciente", {"data": {"documento_id": pick(), "password": SEED_PASSWORD}}),
+        "get_paciente": lambda: ("GET", f"/paciente/{pick()}", {"headers": medico}),
+        "update_paciente": lambda: ("PUT", f"/paciente/{pick()}", {"headers": medico, "data": {"notas_medico": f"Revisión {time.time()}"}}),
+        "create_admission": lambda: ("POST", "/admission", {"headers": admin, "json": {
+            "documento_id": pick(), "fecha_ingreso": datetime.now().isoformat(timespec="minutes"), "motivo": "Control"}}),
+        "exportar_pdf": lambda: ("GET", f"/exportar_pdf/{pick()}", {"headers": medico}),
+        "login_logs": lambda: ("GET", "/login_logs", {"headers": admin, "params": {"limit": 50}}),
+    }
+
+
+async def run_scenario(client, make_request, seconds, concurrency):
+    latencies = []
+    statuses = {}
+
+    async def worker(deadline):
+        while time.perf_counter() < deadline:
+            method, path, kwargs = make_request()
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, path, **kwargs)
+                status = str(r.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(worker(deadline) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies, default=0), 2),
+    }
+
+
+async def run(args, url, ids):
+    async with make_client(url, connections=args.concurrency + 5) as client:
+        headers = {
+            "medico": await login(client, "medico", "gabriel", "medico123"),
+            "admisionista": await login(client, "admisionista", "admision", "admision123"),
+        }
+        requests = build_requests(ids, headers)
+        results = {}
+        for name in args.scenarios:
+            # Calentamiento: cachés, conexiones del pool y pools de procesos
+            await run_scenario(client, requests[name], min(1.0, args.seconds), args.concurrency)
+            results[name] = await run_scenario(client, requests[name], args.seconds, args.concurrency)
+            r = results[name]
+            print(f"{name:<18} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f}  p95 {r['p95_ms']:7.1f}  "
+                  f"p99 {r['p99_ms']:7.1f} ms  errores {r['errors']}", flush=True)
+        return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, path):
+    with open(path) as f:
+        baseline = json.load(f)["scenarios"]
+    print(f"\nComparación con {path} (req/s y p95, positivo = mejor):")
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        b = baseline[name]
+        rps = (r["rps"] / b["rps"] - 1) * 100 if b["rps"] else 0
+        p95 = (1 - r["p95_ms"] / b["p95_ms"]) * 100 if b["p95_ms"] else 0
+        print(f"{name:<18} req/s {b['rps']:8.1f} -> {r['rps']:8.1f} ({rps:+6.1f}%)  p95 {b['p95_ms']:7.1f} -> {r['p95_ms']:7.1f} ms ({p95:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="servidor ya arrancado (por defecto se arranca uvicorn con DATABASE_URL)")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--admissions", type=int, default=5, help="media de admisiones por paciente")
+    parser.add_argument("--login-logs", type=int, default=20, help="logs de login por paciente")
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed-random", type=int, default=42)
+    parser.add_argument("--out", help="fichero JSON de resultados (por defecto bench-AAAAMMDD-HHMMSS.json)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    if args.url and not args.no_seed and "DATABASE_URL" not in os.environ:
+        parser.error("Con --url hay que indicar la DATABASE_URL del servidor para sembrar (o usar --no-seed)")
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_suite.db")
+    os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+
+    process = None
+    url = args.url
+    if url is None:
+        # El servidor crea las tablas y los usuarios por defecto antes de sembrar
+        process, url = start_server(env)
+    try:
+        if not args.no_seed:
+            seed(args.patients, args.admissions, args.login_logs, random.Random(args.seed_random))
+        random.seed(args.seed_random)
+        ids = [str(SEED_FIRST_ID + i) for i in range(args.patients)]
+        results = asyncio.run(run(args, url, ids))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "database": env["DATABASE_URL"].split(":", 1)[0],
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "dataset": {"patients": args.patients, "admissions_per_patient": args.admissions, "login_logs_per_patient": args.login_logs},
+        "concurrency": args.concurrency,
+        "seconds": args.seconds,
+        "scenarios": results,
+    }
+    out = args.out or f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados en {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench/workers.py
+# Escalado con el número de workers de app/serve.py: req/s de los escenarios de CPU (login con pbkdf2,
+# GET /paciente con su serialización y compresión, PDF) arrancando el servidor con 1, 2, ... N workers
+# sobre el mismo conjunto sembrado. Con un solo proceso el GIL limita todo lo que no sale a los pools de
+# hashing o PDF; el escalado real lo da la cuota de CPU del pod (bench/suite.py para el detalle por endpoint).
+#
+#   python bench/workers.py --workers 1,2,4
+#   DATABASE_URL=postgresql+psycopg2://... python bench/workers.py --workers 1,2,4,8 --seconds 20
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import client as make_client, login
+from suite import BACKEND, SEED_FIRST_ID, _free_port, build_requests, run_scenario, seed
+
+SCENARIOS = ["login_paciente", "get_paciente", "exportar_pdf"]
+
+
+def start_server(env, workers):
+    port = _free_port()
+    env = dict(env, PORT=str(port), HOST="127.0.0.1", WEB_CONCURRENCY=str(workers))
+    process = subprocess.Popen([sys.executable, "-m", "app.serve"], cwd=BACKEND, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            # Todos los workers atienden el mismo socket: se espera a que respondan varias veces seguidas
+            if all(httpx.get(url + "/health/ready", timeout=2).status_code == 200 for _ in range(workers * 4)):
+                return process, url
+        except httpx.TransportError:
+            pass
+        if process.poll() is not None:
+            raise RuntimeError("app.serve terminó al arrancar")
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("app.serve no arrancó a tiempo")
+
+
+async def run(args, url, ids):
+    async with make_client(url, connections=args.concurrency + 5) as client:
+        headers = {
+            "medico": await login(client, "medico", "gabriel", "medico123"),
+            "admisionista": await login(client, "admisionista", "admision", "admision123"),
+        }
+        requests = build_requests(ids, headers)
+        results = {}
+        for name in args.scenarios:
+            await run_scenario(client, requests[name], min(1.0, args.seconds), args.concurrency)
+            results[name] = await run_scenario(client, requests[name], args.seconds, args.concurrency)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4", help="números de workers a comparar")
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    counts = [int(n) for n in args.workers.split(",")]
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_workers.db")
+    os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+    # Sin reciclar workers durante la medición
+    env.setdefault("WEB_MAX_REQUESTS", "0")
+    ids = [str(SEED_FIRST_ID + i) for i in range(args.patients)]
+
+    print(f"{os.cpu_count()} CPUs en la máquina; escenarios: {', '.join(args.scenarios)}")
+    table = {}
+    for workers in counts:
+        process, url = start_server(env, workers)
+        try:
+            if not table:
+                seed(args.patients, 2, 0, random.Random(42))
+            random.seed(42)
+            table[workers] = asyncio.run(run(args, url, ids))
+        finally:
+            process.terminate()
+            process.wait()
+        # Los 503 de login son el límite de la cola de hashing (HASH_QUEUE_LIMIT): cuentan las respuestas 2xx
+        for r in table[workers].values():
+            r["ok_rps"] = (r["requests"] - r["errors"]) / args.seconds
+        row = "  ".join(f"{name} {r['ok_rps']:7.1f} req/s (p95 {r['p95_ms']:6.1f} ms, {r['statuses']})"
+                        for name, r in table[workers].items())
+        print(f"{workers:2} workers  {row}", flush=True)
+
+    base = table[counts[0]]
+    print(f"\nEscalado respecto a {counts[0]} worker(s)")
+    for workers in counts:
+        print(f"{workers:2} workers  " + "  ".join(
+            f"{name} x{table[workers][name]['ok_rps'] / max(base[name]['ok_rps'], 0.1):.2f}" for name in args.scenarios))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# tests/conftest.py
+# La aplicación lee la configuración al importarse: base de datos SQLite y directorios temporales
+# propios de la sesión de tests antes de importar app.*. TEST_DATABASE_URL permite usar PostgreSQL
+# (una base vacía: los tests crean pacientes y no los borran)
+import itertools
+import os
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="historias_tests_")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_TMP}/tests.db")
+os.environ["AUDIT_SPILL_DIR"] = os.path.join(_TMP, "audit_spill")
+os.environ["JOBS_DIR"] = os.path.join(_TMP, "jobs")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app.main as main  # noqa: E402
+
+_documentos = itertools.count(700000)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def _login(client, role, username, password):
+    r = client.post(f"/token/{role}", data={"username": username, "password": password})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admision(client):
+    return _login(client, "admisionista", "admision", "admision123")
+
+
+@pytest.fixture(scope="session")
+def medico(client):
+    return _login(client, "medico", "gabriel", "medico123")
+
+
+@pytest.fixture
+def paciente(client, admision):
+    # Paciente nuevo en cada test: documento_id único dentro de la sesión
+    documento_id = str(next(_documentos))
+    r = client.post("/users", data={
+        "documento_id": documento_id, "nombre": "Ana", "apellido": "Paz",
+        "fecha_nacimiento": "1980-01-01", "role": "paciente",
+    }, headers=admision)
+    assert r.status_code == 200, r.text
+    return documento_id
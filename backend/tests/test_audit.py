@@ -0,0 +1,103 @@
+# tests/test_audit.py
+# Escritura en lote de los logs de login: volcado a disco cuando la base de datos falla y reintento posterior
+import asyncio
+import json
+import subprocess
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+import app.audit as audit
+import app.models as models
+from app.database import engine
+
+
+def _event(username):
+    return {"username": username, "role": "medico", "timestamp": datetime.now(), "ip_address": "10.0.0.1"}
+
+
+def _count(username):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(models.LoginLog).where(models.LoginLog.username == username))
+
+
+def _fail(events):
+    raise RuntimeError("base de datos caída")
+
+
+async def _wait_for(condition, timeout=5):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def spill_dir(client, tmp_path, monkeypatch):
+    # client: el arranque de la aplicación crea las tablas
+    monkeypatch.setattr(audit, "AUDIT_SPILL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_failed_batch_is_spilled_and_replayed(spill_dir, monkeypatch):
+    writer = audit.AuditWriter()
+    writer._replay_needed = False
+    insert = audit._insert
+    monkeypatch.setattr(audit, "_insert", _fail)
+    asyncio.run(writer._flush([_event("spill-a"), _event("spill-b")]))
+    assert (writer.failures, writer.spilled, writer.written) == (1, 2, 0)
+    assert len(list(spill_dir.glob("login_logs-*.jsonl"))) == 1
+
+    # La siguiente escritura correcta reintenta lo volcado
+    monkeypatch.setattr(audit, "_insert", insert)
+    asyncio.run(writer._flush([_event("spill-c")]))
+    assert writer.written == 3
+    assert list(spill_dir.iterdir()) == []
+    assert [_count(u) for u in ("spill-a", "spill-b", "spill-c")] == [1, 1, 1]
+
+
+def test_replay_takes_claimed_files_of_dead_processes(spill_dir):
+    finished = subprocess.Popen(["true"])
+    finished.wait()
+    line = json.dumps({**_event("claimed-dead"), "timestamp": datetime.now().isoformat()}) + "\n"
+    dead = spill_dir / f"login_logs-1.jsonl.{finished.pid}.claimed"
+    dead.write_text(line)
+    # Reclamado por un proceso vivo: lo está reintentando él
+    alive = spill_dir / f"login_logs-2.jsonl.{audit.os.getppid()}.claimed"
+    alive.write_text(line.replace("claimed-dead", "claimed-alive"))
+
+    writer = audit.AuditWriter()
+    writer._replay()
+    assert not dead.exists() and alive.exists()
+    assert (_count("claimed-dead"), _count("claimed-alive")) == (1, 0)
+
+
+def test_spill_failure_does_not_stop_the_writer(spill_dir, monkeypatch):
+    monkeypatch.setattr(audit, "AUDIT_FLUSH_INTERVAL", 0.01)
+    insert = audit._insert
+
+    def broken_disk(events):
+        raise OSError("disco lleno")
+
+    async def run():
+        writer = audit.AuditWriter()
+        writer._replay_needed = False
+        writer._spill = broken_disk
+        monkeypatch.setattr(audit, "_insert", _fail)
+        writer.start()
+        writer.record("lost-a", "medico", "10.0.0.1")
+        await _wait_for(lambda: writer.lost == 1)
+
+        # La tarea sigue viva y escribe en cuanto la base de datos vuelve
+        monkeypatch.setattr(audit, "_insert", insert)
+        writer.record("after-lost", "medico", "10.0.0.1")
+        await _wait_for(lambda: writer.written == 1)
+        assert not writer._task.done()
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["lost"], stats["written"], stats["failures"]) == (1, 1, 1)
+    assert _count("after-lost") == 1
@@ -0,0 +1,53 @@
+# tests/test_cursors.py
+# Paginación por cursor (fecha, id): recorre todo sin repetir y rechaza cursores mal formados
+import base64
+
+import pytest
+
+
+def _pages(client, headers, url, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        r = client.get(url, params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        items += page["items"]
+        cursor = page["next"]
+        if cursor is None:
+            return items
+
+
+def test_admissions_pages(client, admision, paciente):
+    # Dos admisiones con la misma fecha: el id desempata
+    for fecha in ("2024-01-01T08:00", "2024-01-01T08:00", "2024-01-02T09:30", "2023-12-31T23:59"):
+        assert client.post("/admission", json={"documento_id": paciente, "fecha_ingreso": fecha}, headers=admision).status_code == 200
+    items = _pages(client, admision, f"/paciente/{paciente}/admisiones", limit=1)
+    keys = [(a["fecha_ingreso"], a["id"]) for a in items]
+    assert len(keys) == 4 and keys == sorted(keys, reverse=True)
+
+
+def test_section_entries_pages(client, medico, paciente):
+    url = f"/paciente/{paciente}/secciones/notas_medico/entradas"
+    for i in range(3):
+        assert client.post(url, json={"content": f"nota {i}"}, headers=medico).status_code == 200
+    items = _pages(client, medico, url, limit=2)
+    assert [e["content"] for e in items] == ["nota 2", "nota 1", "nota 0"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    base64.urlsafe_b64encode(b"sin separador").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T00:00:00|abc").decode(),
+    base64.urlsafe_b64encode(b"ayer|3").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01|3|4").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|3").decode(),
+])
+def test_invalid_cursor(client, admision, medico, paciente, cursor):
+    for headers, url in (
+        (admision, f"/paciente/{paciente}/admisiones"),
+        (medico, f"/paciente/{paciente}/secciones/notas_medico/entradas"),
+        (admision, "/login_logs"),
+    ):
+        r = client.get(url, params={"cursor": cursor}, headers=headers)
+        assert (r.status_code, r.json()["detail"]) == (400, "Cursor inválido"), url
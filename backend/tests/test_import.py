@@ -0,0 +1,79 @@
+# tests/test_import.py
+# Importación masiva de pacientes: validación de filas y estado de las importaciones interrumpidas
+import json
+import os
+import subprocess
+import threading
+import time
+from types import SimpleNamespace
+
+import app.bulk_import as bulk_import
+from app.jobs import JobStore
+
+
+def _wait(client, headers, job_id):
+    for _ in range(200):
+        progress = client.get(f"/pacientes/importar/{job_id}", headers=headers).json()
+        if progress["status"] not in ("pendiente", "en_progreso"):
+            return progress
+        time.sleep(0.05)
+    raise AssertionError("La importación no terminó")
+
+
+def test_import_reports_invalid_rows(client, admision):
+    rows = [
+        {"documento_id": 810001, "nombre": "Ana", "apellido": "Paz", "fecha_nacimiento": "1980-01-01"},
+        {"documento_id": 810002, "nombre": "Luis", "apellido": "Gil", "fecha_nacimiento": "1975-05-05", "notas_medico": ["x"]},
+    ]
+    body = "\n".join(json.dumps(r) for r in rows)
+    r = client.post("/pacientes/importar", files={"archivo": ("p.ndjson", body, "application/x-ndjson")}, headers=admision)
+    assert r.status_code == 200
+    progress = _wait(client, admision, r.json()["job_id"])
+    assert (progress["status"], progress["imported"], progress["failed"]) == ("completado", 1, 1)
+
+
+def test_snapshot_of_dead_worker_is_reported_as_error(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.jobs.JOBS_DIR", str(tmp_path))
+    store = JobStore("prueba", maxsize=10, ttl=3600)
+    job = SimpleNamespace(id="a" * 32, owner="admision", progress=lambda: {"status": "en_progreso", "rows": 10})
+    store.publish(job, force=True)
+    # Otro worker lee la instantánea mientras el proceso que la escribió sigue vivo
+    store.local.clear()
+    assert store.get(job.id).progress()["status"] == "en_progreso"
+
+    finished = subprocess.Popen(["true"])
+    finished.wait()
+    path = tmp_path / f"prueba_{job.id}.json"
+    snapshot = json.loads(path.read_text())
+    path.write_text(json.dumps({**snapshot, "pid": finished.pid}))
+    progress = store.get(job.id).progress()
+    assert progress["status"] == "error" and progress["rows"] == 10
+
+
+def test_stopping_interrupts_running_import(tmp_path, monkeypatch):
+    path = tmp_path / "p.ndjson"
+    path.write_text(json.dumps({"documento_id": 820001, "nombre": "Ana", "apellido": "Paz", "fecha_nacimiento": "1980-01-01"}))
+    stopping = threading.Event()
+    stopping.set()
+    monkeypatch.setattr(bulk_import, "_stopping", stopping)
+    job = bulk_import.ImportJob("admision", str(path), "ndjson")
+    bulk_import.run_import(job)
+    assert job.status == "error" and job.imported == 0
+    assert "interrumpida" in job.errors[-1]["error"]
+    assert not os.path.exists(path)
+
+
+def test_validate_rejects_non_text_required_fields():
+    row = {"documento_id": 1, "nombre": "Ana", "apellido": "Paz", "fecha_nacimiento": "1980-01-01"}
+    assert bulk_import.validate(row) is None
+    assert "nombre" in bulk_import.validate({**row, "nombre": {"a": 1}})
+    assert "apellido" in bulk_import.validate({**row, "apellido": ["Paz"]})
+    assert "documento_id" in bulk_import.validate({**row, "documento_id": True})
+    assert bulk_import.validate({**row, "notas_medico": 5}).startswith("Secciones que no son texto")
+
+
+def test_validate_checks_birth_date():
+    row = {"documento_id": "1", "nombre": "Ana", "apellido": "Paz"}
+    for fecha in ("1", "1980-13-01", "01/02/1980", 1980):
+        assert bulk_import.validate({**row, "fecha_nacimiento": fecha}).startswith("Fecha de nacimiento inválida")
+    assert bulk_import.validate({**row, "fecha_nacimiento": " 1980-02-29 "}) is None
@@ -0,0 +1,33 @@
+# tests/test_patient_cache.py
+# Una lectura que empezó antes de una invalidación no deja en caché la historia anterior
+import asyncio
+
+import pytest
+
+from app.patient_cache import LocalBackend, PatientCache, RedisBackend
+
+
+def _stale_read(cache, writer):
+    async def run():
+        generation = await cache.generation("1")
+        await writer.invalidate("1")
+        await cache.set("1", {"version": 5}, generation)
+        stale = await cache.get("1")
+        await cache.set("1", {"version": 6}, await cache.generation("1"))
+        return stale, await writer.get("1")
+    return asyncio.run(run())
+
+
+def test_local_backend_skips_stale_set():
+    cache = PatientCache(LocalBackend())
+    assert _stale_read(cache, cache) == (None, {"version": 6})
+
+
+def test_redis_backend_generation_is_shared(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr("redis.asyncio.Redis.from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    # Dos workers con su propio cliente: la invalidación de uno impide que el otro guarde lo que leyó antes
+    worker, other = PatientCache(RedisBackend()), PatientCache(RedisBackend())
+    assert _stale_read(worker, other) == (None, {"version": 6})
@@ -0,0 +1,35 @@
+# tests/test_search.py
+# Búsqueda de pacientes: el límite de candidatas conserva las mejor puntuadas
+import itertools
+
+import app.search as search
+
+_documentos = itertools.count(830000)
+
+
+def _create(client, headers, **fields):
+    data = {"documento_id": str(next(_documentos)), "nombre": "Ana", "apellido": "Paz",
+            "fecha_nacimiento": "1980-01-01", "role": "paciente", **fields}
+    assert client.post("/users", data=data, headers=headers).status_code == 200
+    return data["documento_id"]
+
+
+def _search(client, headers, **params):
+    r = client.get("/pacientes/buscar", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return [item["documento_id"] for item in r.json()["items"]]
+
+
+def test_candidate_limit_keeps_best_ranked(client, admision, medico, monkeypatch):
+    for _ in range(6):
+        _create(client, admision, antecedentes_interes="alergia a la zarzamora")
+    # Coincidencia en el nombre (pesa más), indexada después de las demás
+    by_name = {_create(client, admision, nombre="Zarzamora"), _create(client, admision, apellido="Zarzamora")}
+
+    everything = _search(client, medico, q="zarzamora", limit=100)
+    assert set(everything[:2]) == by_name
+
+    monkeypatch.setattr(search, "SEARCH_MAX_CANDIDATES", 3)
+    assert set(_search(client, medico, q="zarzamora", limit=2)) == by_name
+    # Páginas estables: la segunda empieza donde termina la primera
+    assert _search(client, medico, q="zarzamora", limit=1, offset=1) == everything[1:2]
@@ -0,0 +1,113 @@
+# tests/test_version.py
+# Versión de la historia clínica: ETag de GET /paciente y de /exportar_pdf, If-Match de PATCH
+import asyncio
+
+import httpx
+
+import app.main as main
+
+
+def _version(client, headers, documento_id):
+    r = client.get(f"/paciente/{documento_id}", headers=headers)
+    assert r.status_code == 200
+    # Comprimida, la respuesta lleva el ETag débil
+    assert r.headers["etag"].removeprefix("W/") == f'"{r.json()["version"]}"'
+    return r.json()["version"]
+
+
+def test_admission_bumps_version(client, admision, paciente):
+    before = _version(client, admision, paciente)
+    r = client.post("/admission", json={"documento_id": paciente, "fecha_ingreso": "2024-01-02T10:00"}, headers=admision)
+    assert r.status_code == 200
+    assert _version(client, admision, paciente) == before + 1
+
+
+def test_admission_unknown_patient(client, admision):
+    r = client.post("/admission", json={"documento_id": "no-existe", "fecha_ingreso": "2024-01-02T10:00"}, headers=admision)
+    assert r.status_code == 404
+
+
+def test_concurrent_admissions_do_not_lose_bumps(client, admision, paciente):
+    before = _version(client, admision, paciente)
+
+    async def create(count):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*[
+                ac.post("/admission", json={"documento_id": paciente, "fecha_ingreso": f"2024-02-{i + 1:02d}T10:00"},
+                        headers=admision)
+                for i in range(count)
+            ])
+
+    responses = asyncio.run(create(20))
+    assert [r.status_code for r in responses] == [200] * 20
+    assert _version(client, admision, paciente) == before + 20
+
+
+def test_put_bumps_version(client, admision, paciente):
+    before = _version(client, admision, paciente)
+    r = client.put(f"/paciente/{paciente}", data={"datos_sociales": "vive sola"}, headers=admision)
+    assert r.status_code == 200
+    assert _version(client, admision, paciente) == before + 1
+
+
+def test_pdf_etag_and_304(client, admision, paciente):
+    r = client.get(f"/exportar_pdf/{paciente}", headers=admision)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/pdf"
+    etag = r.headers["etag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"otro", {etag}', "*"):
+        r = client.get(f"/exportar_pdf/{paciente}", headers={**admision, "If-None-Match": if_none_match})
+        assert r.status_code == 304, if_none_match
+    # Un ETag que contiene al actual como subcadena no coincide
+    r = client.get(f"/exportar_pdf/{paciente}", headers={**admision, "If-None-Match": f'"1{etag[1:]}'})
+    assert r.status_code == 200
+
+    # Una admisión cambia la versión: el PDF anterior deja de valer
+    client.post("/admission", json={"documento_id": paciente, "fecha_ingreso": "2024-03-01T09:00"}, headers=admision)
+    r = client.get(f"/exportar_pdf/{paciente}", headers={**admision, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_patch_if_match(client, admision, paciente):
+    version = _version(client, admision, paciente)
+    r = client.patch(f"/paciente/{paciente}", json={"datos_sociales": "uno"}, headers={**admision, "If-Match": f'"{version}"'})
+    assert r.status_code == 200
+    assert r.json()["version"] == version + 1
+    assert r.headers["etag"] == f'"{version + 1}"'
+
+    # Misma versión de partida: otro usuario ya la modificó
+    r = client.patch(f"/paciente/{paciente}", json={"datos_sociales": "dos"}, headers={**admision, "If-Match": f'"{version}"'})
+    assert r.status_code == 412
+    assert r.headers["etag"] == f'"{version + 1}"'
+    assert client.get(f"/paciente/{paciente}", headers=admision).json()["datos_sociales"] == "uno"
+
+
+def test_patch_requires_valid_if_match(client, admision, paciente):
+    r = client.patch(f"/paciente/{paciente}", json={"datos_sociales": "x"}, headers=admision)
+    assert r.status_code == 428
+    r = client.patch(f"/paciente/{paciente}", json={"datos_sociales": "x"}, headers={**admision, "If-Match": '"abc"'})
+    assert r.status_code == 400
+    r = client.patch("/paciente/no-existe", json={"datos_sociales": "x"}, headers={**admision, "If-Match": '"1"'})
+    assert r.status_code == 404
+
+
+def test_put_if_match(client, admision, paciente):
+    version = _version(client, admision, paciente)
+    r = client.put(f"/paciente/{paciente}", data={"datos_sociales": "uno"}, headers={**admision, "If-Match": f'"{version}"'})
+    assert r.status_code == 200
+    assert r.headers["etag"] == f'"{version + 1}"'
+
+    # Un PATCH entretanto: el PUT con la versión anterior no lo pisa
+    r = client.patch(f"/paciente/{paciente}", json={"datos_sociales": "dos"}, headers={**admision, "If-Match": f'"{version + 1}"'})
+    assert r.status_code == 200
+    r = client.put(f"/paciente/{paciente}", data={"datos_sociales": "tres"}, headers={**admision, "If-Match": f'"{version + 1}"'})
+    assert r.status_code == 412
+    assert r.headers["etag"] == f'"{version + 2}"'
+    data = client.get(f"/paciente/{paciente}", headers=admision).json()
+    assert (data["datos_sociales"], data["version"]) == ("dos", version + 2)
+
+    r = client.put("/paciente/no-existe", data={"datos_sociales": "x"}, headers={**admision, "If-Match": '"1"'})
+    assert r.status_code == 404